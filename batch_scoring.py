@@ -0,0 +1,227 @@
+"""
+Batch Scoring Engine for Hydraulic System Monitoring
+
+Scores all four TARGETS models over a dataset in fixed-size chunks:
+1. Input is streamed from Parquet (or CSV) in record batches, so memory stays bounded
+2. Chunks fan out to a process pool whose workers load every model once
+3. Results are written in input order to a Parquet file the dashboard reads
+
+Usage:
+    python batch_scoring.py                                   # score the dashboard dataset
+    python batch_scoring.py --source archive/ --output archive_scores.parquet
+"""
+
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import click
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pads
+import pyarrow.parquet as pq
+
+import model_store
+from config import CACHE_DIR, TARGETS
+from data_store import build_store, columns_key, source_fingerprint
+
+SCORES_DIR = os.path.join(CACHE_DIR, 'scores')
+
+# Rows per chunk sent to a worker
+DEFAULT_CHUNK_SIZE = 5000
+
+# Models loaded in each worker process by _init_worker
+_worker_models = {}
+
+
+def scores_path(fingerprint):
+    """Location of the batch scores for the dashboard dataset with this fingerprint"""
+    return os.path.join(SCORES_DIR, f'scores-{fingerprint}.parquet')
+
+
+def model_paths(variant='base'):
+    """Artifact path per target for a model variant ('base' or 'optimized')"""
+    path_for = model_store.optimized_model_path if variant == 'optimized' else model_store.model_path
+    return {target: path_for(target) for target in TARGETS if os.path.exists(path_for(target))}
+
+
+def _init_worker(paths):
+    """Load every model once per worker process"""
+    for target, path in paths.items():
+        _worker_models[target] = joblib.load(path)
+
+
+def _score_chunk(chunk_index, first_row, batch):
+    """Score one record batch with every loaded model"""
+    frame = batch.to_pandas()
+    result = pd.DataFrame({'row': np.arange(first_row, first_row + len(frame), dtype=np.int64)})
+    for target, model in _worker_models.items():
+        features = list(getattr(model, 'feature_names_in_', frame.columns))
+        X = frame[features]
+        result[f'{target}_pred'] = model.predict(X)
+        if hasattr(model, 'predict_proba'):
+            result[f'{target}_confidence'] = model.predict_proba(X).max(axis=1)
+    return chunk_index, result
+
+
+def required_columns(paths):
+    """Union of the feature columns the models expect, or None if any model lacks names"""
+    columns = []
+    for path in paths.values():
+        model = joblib.load(path)
+        if not hasattr(model, 'feature_names_in_'):
+            return None
+        columns.extend(c for c in model.feature_names_in_ if c not in columns)
+    return columns
+
+
+def score_dataset(source, output, paths, chunk_size=DEFAULT_CHUNK_SIZE, workers=None,
+                  metadata=None, progress=None):
+    """
+    Score every row of `source` with every model in `paths`, writing to `output`.
+
+    At most two chunks per worker are in flight or waiting to be written
+    (finished chunks are written strictly in input order), so memory is
+    bounded by the chunk size even when one chunk is slow.
+    `progress` is called with the number of rows written after each chunk.
+    """
+    source_format = 'csv' if str(source).endswith('.csv') else 'parquet'
+    dataset = pads.dataset(source, format=source_format)
+    batches = dataset.to_batches(columns=required_columns(paths), batch_size=chunk_size)
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp_path = f'{output}.tmp-{os.getpid()}'
+
+    writer = None
+    finished = {}
+    next_to_write = 0
+    first_row = 0
+    pending = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(paths,)) as executor:
+            chunk_index = 0
+            exhausted = False
+            while pending or not exhausted:
+                # Out-of-order results wait in `finished`; they count against the limit too
+                while not exhausted and len(pending) + len(finished) < max_pending:
+                    batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                        break
+                    if batch.num_rows == 0:
+                        continue
+                    pending.add(executor.submit(_score_chunk, chunk_index, first_row, batch))
+                    first_row += batch.num_rows
+                    chunk_index += 1
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, result = future.result()
+                    finished[index] = result
+
+                while next_to_write in finished:
+                    table = pa.Table.from_pandas(finished.pop(next_to_write), preserve_index=False)
+                    if writer is None:
+                        schema = table.schema.with_metadata(
+                            {b'scoring': json.dumps(metadata or {}).encode()})
+                        writer = pq.ParquetWriter(tmp_path, schema)
+                    writer.write_table(table.cast(writer.schema))
+                    next_to_write += 1
+                    if progress is not None:
+                        progress(table.num_rows)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            writer = None
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f"No rows to score in {source}")
+    os.replace(tmp_path, output)
+    return output
+
+
+def read_batch_scores(fingerprint, target, model_hash, columns):
+    """
+    Predictions for `target` from a batch scoring run over the dashboard dataset.
+
+    Returns a frame with 'prediction' (and 'confidence' when available), or
+    None if there is no run for this fingerprint made with this model version
+    on these feature `columns`.
+    """
+    path = scores_path(fingerprint)
+    if not os.path.exists(path):
+        return None
+    scoring = json.loads(pq.read_schema(path).metadata.get(b'scoring', b'{}'))
+    if scoring.get('model_hashes', {}).get(target) != model_hash:
+        return None
+    if scoring.get('columns_keys', {}).get(target) != columns_key(columns):
+        return None
+
+    columns = [c for c in (f'{target}_pred', f'{target}_confidence')
+               if c in pq.read_schema(path).names]
+    frame = pq.read_table(path, columns=columns).to_pandas()
+    return frame.rename(columns={f'{target}_pred': 'prediction',
+                                 f'{target}_confidence': 'confidence'})
+
+
+@click.command()
+@click.option('--source', default=None,
+              help='Parquet file/directory or CSV to score (default: the dashboard dataset).')
+@click.option('--output', default=None,
+              help='Output Parquet file (default: the dashboard scores cache).')
+@click.option('--variant', type=click.Choice(['base', 'optimized']), default='base',
+              help='Which model artifacts to score with.')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True,
+              help='Rows per chunk sent to a worker.')
+@click.option('--workers', default=None, type=int, help='Worker processes (default: all cores).')
+def main(source, output, variant, chunk_size, workers):
+    """Score all TARGETS models over a dataset in parallel chunks."""
+    paths = model_paths(variant)
+    if not paths:
+        raise click.ClickException(f"No {variant} models found for any of {TARGETS}")
+
+    fingerprint = None
+    if source is None:
+        fingerprint = source_fingerprint()
+        source = build_store()
+    if output is None:
+        if fingerprint is None:
+            raise click.ClickException("--output is required when --source is given")
+        output = scores_path(fingerprint)
+
+    # Feature set each model scored with, so cached scores are only reused for the same columns
+    columns_keys = {}
+    for target, path in paths.items():
+        names = getattr(joblib.load(path), 'feature_names_in_', None)
+        if names is not None:
+            columns_keys[target] = columns_key(names)
+    metadata = {
+        'fingerprint': fingerprint,
+        'variant': variant,
+        'model_hashes': {target: model_store.artifact_hash(path) for target, path in paths.items()},
+        'columns_keys': columns_keys,
+    }
+    source_format = 'csv' if str(source).endswith('.csv') else 'parquet'
+    total_rows = pads.dataset(source, format=source_format).count_rows()
+
+    with click.progressbar(length=total_rows, label=f'Scoring {len(paths)} targets') as bar:
+        score_dataset(source, output, paths, chunk_size=chunk_size, workers=workers,
+                      metadata=metadata, progress=bar.update)
+    click.echo(f"Wrote {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""
+Inference Benchmarks for Hydraulic System Monitoring
+
+Measures how fast every target's model serves predictions, per artifact variant:
+1. Variants are the trained pickle (base), the optimized pickle (optimized)
+   and the array-compiled form of the trained model (compiled)
+2. Each (target, variant) runs in a fresh process, so load time and peak RSS
+   include the libraries that variant needs (the compiled form loads without
+   scikit-learn)
+3. Single-row latency (p50/p95/p99) and throughput at several batch sizes are
+   timed on dataset rows, repeating each measurement for a minimum duration
+4. Results are recorded in the metrics store (kind 'benchmark'), and the
+   latest run of every metric is compared against the median of the runs
+   before it to surface regressions
+
+Metric names: load_seconds, latency_p50_ms, latency_p95_ms, latency_p99_ms,
+throughput_<batch size> (rows/s), peak_rss_mb, model_rss_mb.
+
+Usage:
+    python benchmark.py run
+    python benchmark.py run --target Cooler_Cond --batch-sizes 1,64,1024
+    python benchmark.py regressions --fail
+"""
+
+import itertools
+import multiprocessing
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+import numpy as np
+import pandas as pd
+
+import metrics_store
+import model_store
+from config import TARGETS
+
+VARIANTS = ['base', 'optimized', 'compiled']
+
+DEFAULT_BATCH_SIZES = [1, 32, 256, 2048]
+
+# Each latency / throughput measurement repeats for at least this long
+DEFAULT_MIN_SECONDS = 0.5
+
+# Upper bound on single-row predictions per latency measurement
+MAX_LATENCY_SAMPLES = 2000
+
+# Latest value is a regression when it is this much worse than the baseline median
+DEFAULT_TOLERANCE = 0.25
+
+# Previous runs whose median forms the baseline
+BASELINE_RUNS = 5
+
+# Metrics where a larger value is better; for all others smaller is better
+HIGHER_IS_BETTER = ('throughput_',)
+
+
+def variant_path(target, variant):
+    """Artifact benchmarked for `variant`, or None if it does not exist (or is stale, when compiled)"""
+    if variant == 'base':
+        path = model_store.model_path(target)
+    elif variant == 'optimized':
+        path = model_store.optimized_model_path(target)
+    elif variant == 'compiled':
+        import compiled_model
+        source = model_store.model_path(target)
+        path = model_store.compiled_path(source)
+        built_from = compiled_model.source_hash(path)
+        if built_from is None or built_from != model_store.artifact_hash(source):
+            return None
+    else:
+        raise ValueError(f"Unknown benchmark variant: {variant}")
+    return path if os.path.exists(path) else None
+
+
+def _max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1 << 20 if platform.system() == 'Darwin' else 1 << 10
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def _timed(call, min_seconds, max_repeats=None):
+    """Durations of repeated calls until `min_seconds` have passed (at least 3 calls)"""
+    call()  # warm-up
+    durations = []
+    deadline = time.perf_counter() + min_seconds
+    while len(durations) < 3 or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - start)
+        if max_repeats and len(durations) >= max_repeats:
+            break
+    return np.array(durations)
+
+
+def _rows(X, n):
+    """First `n` rows of `X`, repeating it when the dataset is smaller"""
+    if len(X) >= n:
+        return X.iloc[:n]
+    return pd.concat([X] * (n // len(X) + 1), ignore_index=True).iloc[:n]
+
+
+def run_benchmark(variant, path, batch_sizes=DEFAULT_BATCH_SIZES, min_seconds=DEFAULT_MIN_SECONDS):
+    """
+    Benchmark one artifact in the current process and return its metrics.
+
+    Meant to run in a fresh process (see benchmark_models); load time and
+    RSS are only meaningful there.
+    """
+    import data_store
+
+    rss_start = _max_rss_mb()
+    start = time.perf_counter()
+    if variant == 'compiled':
+        import compiled_model
+        model = compiled_model.load(path)
+    else:
+        import joblib
+        model = joblib.load(path)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = _max_rss_mb()
+
+    features = list(getattr(model, 'feature_names_in_', []))
+    if not features:
+        raise ValueError(f"{path} does not record feature_names_in_")
+    missing = [f for f in features if f not in data_store.store_columns()]
+    if missing:
+        raise ValueError(f"Dataset lacks features of {path}: {missing[:5]}")
+    # An in-memory copy, so the data is resident before the inference baseline is taken
+    X = data_store.load_columns(features).copy()
+    rss_data = _max_rss_mb()
+
+    single = itertools.cycle([X.iloc[[i]] for i in range(min(len(X), 100))])
+    latencies = _timed(lambda: model.predict(next(single)), min_seconds, MAX_LATENCY_SAMPLES) * 1000
+    metrics = {
+        'load_seconds': load_seconds,
+        'latency_p50_ms': np.percentile(latencies, 50),
+        'latency_p95_ms': np.percentile(latencies, 95),
+        'latency_p99_ms': np.percentile(latencies, 99),
+    }
+    for batch_size in batch_sizes:
+        batch = _rows(X, batch_size)
+        durations = _timed(lambda: model.predict(batch), min_seconds)
+        metrics[f'throughput_{batch_size}'] = batch_size * len(durations) / durations.sum()
+
+    rss_after = _max_rss_mb()
+    if rss_after is not None:
+        metrics['peak_rss_mb'] = rss_after
+        # The model load plus the inference working set, leaving out the data load in between
+        metrics['model_rss_mb'] = (rss_loaded - rss_start) + (rss_after - rss_data)
+    return metrics_store.model_name(model), metrics
+
+
+def _environment(batch_sizes, min_seconds):
+    import sklearn
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'batch_sizes': batch_sizes,
+        'min_seconds': min_seconds,
+    }
+
+
+def benchmark_models(targets=TARGETS, variants=VARIANTS, batch_sizes=DEFAULT_BATCH_SIZES,
+                     min_seconds=DEFAULT_MIN_SECONDS, store=None):
+    """
+    Benchmark every available (target, variant) artifact and record the results.
+
+    Yields (target, variant, metrics) as each finishes; metrics is None for
+    variants without an artifact, or an error message string when the
+    benchmark failed.
+    """
+    store = store or metrics_store.MetricsStore()
+    environment = _environment(batch_sizes, min_seconds)
+    for target in targets:
+        for variant in variants:
+            path = variant_path(target, variant)
+            if path is None:
+                yield target, variant, None
+                continue
+            # A fresh spawned interpreter per benchmark: cold loads, and RSS not shared between variants
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                    model, metrics = executor.submit(run_benchmark, variant, path, batch_sizes,
+                                                     min_seconds).result()
+            except Exception as e:
+                # e.g. an unreadable artifact, a MemoryError or a crashed worker (BrokenProcessPool)
+                yield target, variant, f"{type(e).__name__}: {e}"
+                continue
+            run_id = store.start_run('benchmark', target, {
+                **environment, 'artifact_hash': model_store.artifact_hash(
+                    model_store.model_path(target) if variant == 'compiled' else path)})
+            store.record(run_id, target, model, metrics, variant)
+            yield target, variant, metrics
+
+
+def benchmark_history(target=None, store=None):
+    """Every recorded benchmark metric, oldest first"""
+    return (store or metrics_store.MetricsStore()).records('benchmark', target)
+
+
+def _higher_is_better(metric):
+    return metric.startswith(HIGHER_IS_BETTER)
+
+
+def regressions(history, tolerance=DEFAULT_TOLERANCE, baseline_runs=BASELINE_RUNS):
+    """
+    Metrics whose latest value is worse than the median of the preceding runs.
+
+    `history` is benchmark_history() output. Returns Target, Variant, Metric,
+    Baseline, Latest and Change (relative, positive means worse) per regression.
+    """
+    rows = []
+    for (target, variant, metric), series in history.groupby(['target', 'variant', 'metric']):
+        values = series.sort_values('recorded_at')['value'].to_numpy()
+        if len(values) < 2:
+            continue
+        baseline = float(np.median(values[-baseline_runs - 1:-1]))
+        latest = float(values[-1])
+        if baseline == 0:
+            continue
+        change = (latest - baseline) / baseline
+        if _higher_is_better(metric):
+            change = -change
+        if change > tolerance:
+            rows.append({'Target': target, 'Variant': variant, 'Metric': metric,
+                         'Baseline': baseline, 'Latest': latest, 'Change': change})
+    return pd.DataFrame(rows, columns=['Target', 'Variant', 'Metric', 'Baseline', 'Latest', 'Change'])
+
+
+def latest_results(history):
+    """Latest value of every metric, one row per (target, variant)"""
+    latest = history.sort_values('recorded_at').groupby(['target', 'variant', 'metric']).last()
+    table = latest['value'].unstack('metric')
+    table['recorded_at'] = latest['recorded_at'].groupby(level=['target', 'variant']).max()
+    return table.reset_index()
+
+
+@click.group()
+def main():
+    """Benchmark model inference and report regressions."""
+
+
+@main.command('run')
+@click.option('--target', 'targets', multiple=True, type=click.Choice(TARGETS),
+              help='Targets to benchmark (default: all).')
+@click.option('--variant', 'variants', multiple=True, type=click.Choice(VARIANTS),
+              help='Artifact variants to benchmark (default: all).')
+@click.option('--batch-sizes', default=','.join(map(str, DEFAULT_BATCH_SIZES)), show_default=True,
+              help='Comma-separated batch sizes for the throughput measurements.')
+@click.option('--min-seconds', default=DEFAULT_MIN_SECONDS, show_default=True,
+              help='Minimum duration of each latency / throughput measurement.')
+def run_command(targets, variants, batch_sizes, min_seconds):
+    """Benchmark the model artifacts and record the results."""
+    batch_sizes = [int(size) for size in batch_sizes.split(',')]
+    measured = 0
+    for target, variant, metrics in benchmark_models(targets or TARGETS, variants or VARIANTS,
+                                                     batch_sizes, min_seconds):
+        if metrics is None:
+            continue
+        if isinstance(metrics, str):
+            click.echo(f"{target:<18} {variant:<9} skipped: {metrics}")
+            continue
+        measured += 1
+        throughput = '  '.join(f"{size}:{metrics[f'throughput_{size}']:,.0f}/s" for size in batch_sizes)
+        click.echo(f"{target:<18} {variant:<9} load {metrics['load_seconds'] * 1000:7.1f} ms  "
+                   f"p50 {metrics['latency_p50_ms']:6.2f} ms  p99 {metrics['latency_p99_ms']:6.2f} ms  "
+                   f"{throughput}  rss {metrics.get('peak_rss_mb', float('nan')):.0f} MB")
+    if not measured:
+        raise click.ClickException("No model artifacts to benchmark")
+
+
+@main.command('regressions')
+@click.option('--tolerance', default=DEFAULT_TOLERANCE, show_default=True,
+              help='Relative change beyond which a metric counts as regressed.')
+@click.option('--fail', is_flag=True, help='Exit with an error when regressions are found.')
+def regressions_command(tolerance, fail):
+    """Compare the latest benchmark run against the runs before it."""
+    found = regressions(benchmark_history(), tolerance)
+    if found.empty:
+        click.echo("No regressions")
+        return
+    click.echo(found.to_string(index=False, formatters={'Change': '{:+.0%}'.format}))
+    if fail:
+        raise click.ClickException(f"{len(found)} benchmark regressions")
+
+
+if __name__ == '__main__':
+    main()
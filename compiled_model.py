@@ -0,0 +1,357 @@
+"""
+Compiled Tree Models for Hydraulic System Monitoring
+
+Exports trained tree ensembles to a compact, array-backed inference format:
+1. Every tree's nodes are flattened into shared arrays (feature, threshold,
+   children, leaf values), one .npy file each in a '<model>.compiled' directory
+2. Loading memory-maps the arrays, so it is near-instant and needs neither
+   pickle nor scikit-learn
+3. Prediction walks all trees for a block of rows at once, one tree level per
+   vectorized NumPy step
+4. Export checks parity with the original model's predict and predict_proba
+   (also on inputs with missing values) and refuses to write an artifact that
+   disagrees or could not be checked; only checked artifacts are loaded
+5. Missing values (NaN) follow each split's learned direction, as in
+   scikit-learn >= 1.3 trees; models that reject NaN reject it here too
+
+Supported: RandomForest, ExtraTrees and DecisionTree classifiers, and
+GradientBoostingClassifier with its default prior init.
+
+The NumPy walk wins on load time and on small batches (single predictions,
+streaming micro-batches). On batches of thousands of rows scikit-learn's
+compiled predictor is faster, so bulk batch scoring keeps the pickles.
+
+Usage:
+    python compiled_model.py            # compile every base and optimized model
+"""
+
+import json
+import os
+
+import click
+import numpy as np
+
+# Leaf marker in the children arrays (as in scikit-learn)
+LEAF = -1
+
+# Rows walked through the trees per step; bounds the (rows x trees) work arrays
+PREDICT_BLOCK_ROWS = 4096
+
+# Rows of the dataset used to verify a compiled model against the original
+PARITY_ROWS = 2000
+
+# Every NaN-capable model is checked with this share of its parity cells set missing
+PARITY_MISSING_SHARE = 0.2
+
+# Bumped when the artifact layout changes; older artifacts are treated as not compiled
+FORMAT_VERSION = 2
+
+ARRAYS = ['feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots']
+
+
+class CompiledModel:
+    """
+    Array-backed tree ensemble with the estimator interface the dashboard uses.
+
+    `kind` is 'forest' (leaf values are class probabilities, averaged over
+    trees) or 'boosting' (leaf values are raw scores, summed per class on top
+    of `init` and passed through a sigmoid or softmax).
+    """
+
+    def __init__(self, kind, arrays, classes, feature_names=None, feature_importances=None,
+                 init=None, learning_rate=1.0, n_trees_per_class=None, source=None, allow_missing=False,
+                 parity_rows=None):
+        self.kind = kind
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.classes_ = np.asarray(classes)
+        self.n_classes_ = len(self.classes_)
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        if feature_importances is not None:
+            self.feature_importances_ = np.asarray(feature_importances)
+        self.n_features_in_ = int(self.feature.max()) + 1 if feature_names is None else len(feature_names)
+        self.init = None if init is None else np.asarray(init, dtype=np.float64)
+        self.learning_rate = learning_rate
+        self.n_trees_per_class = n_trees_per_class
+        self.source = source
+        self.allow_missing = allow_missing
+        self.parity_rows = parity_rows
+
+    def _matrix(self, X):
+        if hasattr(X, 'columns'):
+            if hasattr(self, 'feature_names_in_'):
+                X = X[list(self.feature_names_in_)]
+            X = X.to_numpy()
+        # Trees compare float32 inputs against float64 thresholds, as scikit-learn does
+        X = np.asarray(X, dtype=np.float32)
+        if not self.allow_missing and np.isnan(X).any():
+            raise ValueError("Input X contains NaN.")
+        return X
+
+    def _leaves(self, X):
+        """Leaf index reached in every tree, for each row: (rows x trees)"""
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        active = self.left[nodes] != LEAF
+        while active.any():
+            current = nodes[active]
+            values = X[np.nonzero(active)[0], self.feature[current]]
+            go_left = np.where(np.isnan(values), self.missing_left[current], values <= self.threshold[current])
+            nodes[active] = np.where(go_left, self.left[current], self.right[current])
+            active = self.left[nodes] != LEAF
+        return nodes
+
+    def _raw(self, X):
+        """Averaged probabilities (forest) or raw class scores (boosting) for a block of rows"""
+        leaves = self._leaves(X)
+        if self.kind == 'forest':
+            return self.value[leaves].mean(axis=1)
+        # Boosting: trees are stored stage-major, class-minor; leaf values are scalars
+        values = self.value[leaves, 0].reshape(len(X), -1, self.n_trees_per_class)
+        return self.init + self.learning_rate * values.sum(axis=1)
+
+    def predict_proba(self, X):
+        X = self._matrix(X)
+        blocks = [self._raw(X[start:start + PREDICT_BLOCK_ROWS])
+                  for start in range(0, len(X), PREDICT_BLOCK_ROWS)]
+        raw = np.concatenate(blocks) if blocks else np.empty((0, self.n_classes_))
+        if self.kind == 'forest':
+            return raw
+        if self.n_trees_per_class == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        raw = raw - raw.max(axis=1, keepdims=True)
+        exp = np.exp(raw)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def score(self, X, y):
+        return float((self.predict(X) == np.asarray(y)).mean())
+
+    def save(self, path):
+        """Write the arrays and metadata to directory `path`, replacing it atomically"""
+        tmp_path = f'{path}.tmp-{os.getpid()}'
+        os.makedirs(tmp_path)
+        for name in ARRAYS:
+            np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        np.save(os.path.join(tmp_path, 'classes.npy'), np.asarray(self.classes_.tolist()))
+        meta = {
+            'kind': self.kind,
+            'feature_names': list(map(str, getattr(self, 'feature_names_in_', []))) or None,
+            'feature_importances': getattr(self, 'feature_importances_', np.array([])).tolist() or None,
+            'init': None if self.init is None else self.init.tolist(),
+            'learning_rate': self.learning_rate,
+            'n_trees_per_class': self.n_trees_per_class,
+            'source': self.source,
+            'allow_missing': self.allow_missing,
+            'parity_rows': self.parity_rows,
+            'format': FORMAT_VERSION,
+        }
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        if os.path.isdir(path):
+            old_path = f'{path}.old-{os.getpid()}'
+            os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            for name in os.listdir(old_path):
+                os.remove(os.path.join(old_path, name))
+            os.rmdir(old_path)
+        else:
+            os.replace(tmp_path, path)
+        return path
+
+
+def load(path):
+    """Memory-map a compiled model directory"""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in ARRAYS}
+    classes = np.load(os.path.join(path, 'classes.npy'), allow_pickle=False)
+    return CompiledModel(meta['kind'], arrays, classes, meta['feature_names'], meta['feature_importances'],
+                         meta['init'], meta['learning_rate'], meta['n_trees_per_class'], meta['source'],
+                         meta['allow_missing'], meta['parity_rows'])
+
+
+def source_hash(path):
+    """
+    Hash of the artifact a compiled model was built from.
+
+    None if it is not compiled, was written by an older format, or its
+    parity with the original was never checked.
+    """
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    if meta.get('format') != FORMAT_VERSION or not meta.get('parity_rows'):
+        return None
+    return (meta.get('source') or {}).get('hash')
+
+
+def _flatten(trees, leaf_values):
+    """Concatenate sklearn Tree objects into shared node arrays with absolute child indices"""
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+    feature, threshold, left, right, missing_left, value = [], [], [], [], [], []
+    for offset, tree in zip(offsets, trees):
+        is_leaf = tree.children_left == -1
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        # Direction of NaN at each split (scikit-learn >= 1.3; older trees never see NaN)
+        missing_left.append(np.asarray(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count)), dtype=bool))
+        left.append(np.where(is_leaf, LEAF, tree.children_left + offset).astype(np.int32))
+        right.append(np.where(is_leaf, LEAF, tree.children_right + offset).astype(np.int32))
+        value.append(leaf_values(tree))
+    return {
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'missing_left': np.concatenate(missing_left),
+        'value': np.concatenate(value),
+        'roots': offsets[:-1].astype(np.int32),
+    }
+
+
+def _class_probabilities(tree):
+    values = tree.value[:, 0, :].astype(np.float64)
+    totals = values.sum(axis=1, keepdims=True)
+    return np.divide(values, totals, out=np.zeros_like(values), where=totals > 0)
+
+
+def _allows_missing(model):
+    """Whether the estimator accepts NaN inputs (routing them down each split) instead of rejecting them"""
+    try:
+        from sklearn.utils import get_tags  # scikit-learn >= 1.6
+    except ImportError:
+        return bool(model._get_tags().get('allow_nan', False))
+    return bool(get_tags(model).input_tags.allow_nan)
+
+
+def compile_model(model, source=None):
+    """
+    CompiledModel equivalent of a fitted tree-ensemble classifier.
+
+    Raises TypeError for estimators this format cannot represent.
+    """
+    from sklearn.dummy import DummyClassifier
+    from sklearn.ensemble import (ExtraTreesClassifier, GradientBoostingClassifier,
+                                  RandomForestClassifier)
+    from sklearn.tree import DecisionTreeClassifier
+
+    common = {
+        'classes': model.classes_,
+        'feature_names': getattr(model, 'feature_names_in_', None),
+        'feature_importances': getattr(model, 'feature_importances_', None),
+        'source': source,
+        'allow_missing': _allows_missing(model),
+    }
+    if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier, DecisionTreeClassifier)):
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise TypeError("Multi-output tree models cannot be compiled")
+        estimators = [model] if isinstance(model, DecisionTreeClassifier) else model.estimators_
+        arrays = _flatten([estimator.tree_ for estimator in estimators], _class_probabilities)
+        return CompiledModel('forest', arrays, **common)
+
+    if isinstance(model, GradientBoostingClassifier):
+        if not isinstance(model.init_, DummyClassifier) and model.init_ != 'zero':
+            raise TypeError("Only GradientBoostingClassifier with the default (prior) init can be compiled")
+        n_trees_per_class = model.estimators_.shape[1]
+        init = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0]
+        arrays = _flatten([tree.tree_ for tree in model.estimators_.ravel()],
+                          lambda tree: tree.value[:, 0, :1].astype(np.float64))
+        return CompiledModel('boosting', arrays, init=init, learning_rate=float(model.learning_rate),
+                             n_trees_per_class=n_trees_per_class, **common)
+
+    raise TypeError(f"Cannot compile {type(model).__name__}: only tree ensembles are supported")
+
+
+def with_missing(X, share=PARITY_MISSING_SHARE, seed=0):
+    """Copy of `X` with a reproducible random `share` of its cells set to NaN"""
+    X = X.copy()
+    mask = np.random.default_rng(seed).random(X.shape) < share
+    if hasattr(X, 'mask'):
+        return X.mask(mask)
+    X[mask] = np.nan
+    return X
+
+
+def check_parity(model, compiled, X):
+    """
+    Raise AssertionError unless `compiled` reproduces `model` on the rows of `X`.
+
+    Models that accept NaN are also checked on a copy of `X` with missing values.
+    """
+    proba_error = _check_rows(model, compiled, X)
+    if compiled.allow_missing:
+        proba_error = max(proba_error, _check_rows(model, compiled, with_missing(X)))
+    return proba_error
+
+
+def _check_rows(model, compiled, X):
+    expected = model.predict(X)
+    actual = compiled.predict(X)
+    mismatched = int((np.asarray(expected) != actual).sum())
+    if mismatched:
+        raise AssertionError(f"{mismatched} of {len(X)} predictions differ from the original model")
+    proba_error = float(np.abs(model.predict_proba(X) - compiled.predict_proba(X)).max(initial=0.0))
+    if proba_error > 1e-9:
+        raise AssertionError(f"predict_proba differs from the original model by up to {proba_error:.3g}")
+    return proba_error
+
+
+def export_model(path, X):
+    """
+    Compile the pickled model at `path` next to it ('<name>.compiled').
+
+    Parity with the original on the rows of `X` is verified before writing;
+    without rows to check (`X` None or empty) nothing is written.
+    Returns the compiled directory.
+    """
+    import joblib
+    import model_store
+
+    if X is None or len(X) == 0:
+        raise AssertionError("no dataset rows to check parity on")
+    model = joblib.load(path)
+    compiled = compile_model(model, source={'path': os.path.basename(path),
+                                            'hash': model_store.artifact_hash(path)})
+    check_parity(model, compiled, X)
+    compiled.parity_rows = len(X)
+    return compiled.save(model_store.compiled_path(path))
+
+
+@click.command()
+@click.option('--parity-rows', default=PARITY_ROWS, show_default=True, type=click.IntRange(min=1),
+              help='Dataset rows used to verify each compiled model.')
+def main(parity_rows):
+    """Compile every trained and optimized tree model to the array format."""
+    import data_store
+    import model_store
+    from config import TARGETS
+
+    paths = [path_for(target) for target in TARGETS
+             for path_for in (model_store.model_path, model_store.optimized_model_path)]
+    paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        raise click.ClickException("No trained models found")
+    import joblib
+
+    columns = data_store.store_columns()
+    for path in paths:
+        X = None
+        names = list(getattr(joblib.load(path), 'feature_names_in_', []))
+        if names and all(name in columns for name in names):
+            X = data_store.load_columns(names).iloc[:parity_rows]
+        try:
+            compiled_path = export_model(path, X)
+        except (TypeError, AssertionError) as e:
+            click.echo(f"skipped  {path}: {e}")
+            continue
+        click.echo(f"compiled {path} -> {compiled_path} (parity verified on {len(X)} rows)")
+
+
+if __name__ == '__main__':
+    main()
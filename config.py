@@ -0,0 +1,15 @@
+"""
+Shared Settings for Hydraulic System Monitoring
+
+Lightweight constants used by the dashboard and the data/model modules.
+Kept free of heavy imports so the dashboard can read them at startup.
+"""
+
+# TARGETS
+TARGETS = ['Cooler_Cond', 'Valve_Cond', 'Pump_Leak', 'Accumulator_Press']
+
+# Derived data (stores, caches, job results) lives here
+CACHE_DIR = '.cache'
+
+# Memory budget for loaded models shared by all dashboard sessions (see model_store.ModelCache)
+MODEL_CACHE_MB = 2048
@@ -0,0 +1,154 @@
+"""
+Correlation Engine for Hydraulic System Monitoring
+
+Computes Pearson correlation matrices with a single BLAS matrix product and
+keeps the running moments needed to fold in newly appended cycles:
+1. Moments (count, mean, co-moment) are merged with Chan's pairwise update
+2. States are persisted under .cache/correlation with the row hashes they cover
+3. When the dataset only grew, just the new rows are folded into the old state
+4. A partitioned dataset keeps one state per (columns, partition), so an
+   append only reads the new partition and merges the states
+"""
+
+import functools
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_store
+from config import CACHE_DIR
+from data_store import columns_key, row_hashes
+
+CORRELATION_DIR = os.path.join(CACHE_DIR, 'correlation')
+
+
+def _finite_rows(frame):
+    """Frame values as float64, skipping rows with missing or infinite values"""
+    values = frame.to_numpy(dtype=np.float64)
+    return values[np.isfinite(values).all(axis=1)]
+
+
+class CorrelationState:
+    """Running moments of a set of columns, enough to rebuild their correlation matrix"""
+
+    def __init__(self, columns, count, mean, comoment):
+        self.columns = list(columns)
+        self.count = int(count)
+        self.mean = mean
+        self.comoment = comoment
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Moments of `frame`: centre once, then one matrix product"""
+        values = _finite_rows(frame)
+        if len(values) == 0:
+            p = values.shape[1]
+            return cls(frame.columns, 0, np.zeros(p), np.zeros((p, p)))
+        mean = values.mean(axis=0)
+        centered = values - mean
+        return cls(frame.columns, len(values), mean, centered.T @ centered)
+
+    def merge(self, other):
+        """Combine two states over the same columns (Chan et al. pairwise update)"""
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge correlation states over different columns")
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            return other
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        mean = self.mean + delta * (other.count / count)
+        comoment = (self.comoment + other.comoment
+                    + np.outer(delta, delta) * (self.count * other.count / count))
+        return CorrelationState(self.columns, count, mean, comoment)
+
+    def update(self, frame):
+        """Fold newly appended rows into the state"""
+        return self.merge(CorrelationState.from_frame(frame[self.columns]))
+
+    def corr(self):
+        """Pearson correlation matrix; constant columns get NaN like pandas"""
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix = self.comoment / np.outer(std, std)
+        constant = std == 0
+        matrix[constant, :] = np.nan
+        matrix[:, constant] = np.nan
+        np.clip(matrix, -1.0, 1.0, out=matrix)
+        np.fill_diagonal(matrix, np.where(constant, np.nan, 1.0))
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+
+    def save(self, path, hashes):
+        """Persist the state together with the hashes of the rows it covers"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp-{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, columns=np.array(self.columns, dtype=object), count=self.count,
+                     mean=self.mean, comoment=self.comoment, row_hashes=hashes)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a persisted state and the row hashes it covers"""
+        with np.load(path, allow_pickle=True) as data:
+            state = cls(data['columns'].tolist(), data['count'], data['mean'], data['comoment'])
+            return state, data['row_hashes']
+
+
+def cached_state(frame, fingerprint):
+    """
+    Correlation state for `frame`, reusing persisted work where possible.
+
+    An exact match on (columns, fingerprint) is loaded as is. Otherwise the
+    newest state over the same columns whose rows are a prefix of `frame` is
+    updated with just the appended rows; only unrelated data is recomputed.
+    """
+    key = columns_key(frame.columns)
+    path = os.path.join(CORRELATION_DIR, f'{key}-{fingerprint}.npz')
+    if os.path.exists(path):
+        return CorrelationState.load(path)[0]
+
+    hashes = row_hashes(frame)
+    candidates = sorted(glob.glob(os.path.join(CORRELATION_DIR, f'{key}-*.npz')),
+                        key=os.path.getmtime, reverse=True)
+
+    state = None
+    for candidate in candidates:
+        previous, previous_hashes = CorrelationState.load(candidate)
+        covered = len(previous_hashes)
+        if covered <= len(hashes) and np.array_equal(previous_hashes, hashes[:covered]):
+            state = previous.update(frame.iloc[covered:]) if covered < len(hashes) else previous
+            break
+    if state is None:
+        state = CorrelationState.from_frame(frame)
+
+    state.save(path, hashes)
+    for candidate in candidates:
+        os.remove(candidate)
+    return state
+
+
+def partition_state(columns, entry):
+    """Correlation state of `columns` over one dataset partition, cached by partition content"""
+    path = os.path.join(CORRELATION_DIR, f"part-{entry['hash']}-{columns_key(columns)}.npz")
+    if os.path.exists(path):
+        return CorrelationState.load(path)[0]
+    state = CorrelationState.from_frame(data_store.partition_table(entry, columns).to_pandas(split_blocks=True))
+    state.save(path, np.empty(0, dtype=np.uint64))
+    return state
+
+
+def dataset_state(columns, fingerprint):
+    """
+    Correlation state of `columns` over the current dataset.
+
+    A partitioned dataset merges its per-partition states; a CSV source
+    goes through cached_state.
+    """
+    partitions = data_store.dataset_partitions()
+    if partitions is None:
+        return cached_state(data_store.load_columns(columns), fingerprint)
+    return functools.reduce(CorrelationState.merge, (partition_state(columns, entry) for entry in partitions))
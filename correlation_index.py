@@ -0,0 +1,254 @@
+"""
+Correlation Index for Hydraulic System Monitoring
+
+Precomputes what the correlation explorer asks, so wide feature sets (thousands
+of columns) are queried without building or shipping the full matrix:
+1. Features are clustered hierarchically (average linkage on 1 - |r|), and
+   the leaf order groups related features next to each other
+2. The strongest pairs overall and the nearest neighbours of every feature
+   are ranked once, block by block, into sorted arrays
+3. A block-aggregated overview of the clustered matrix fits the heatmap's
+   cell budget; the full matrix stays on disk (float32, memory-mapped) for
+   drilling into a block or cluster
+4. Indexes live under .cache/correlation_index, one per (columns, dataset
+   fingerprint), and are built from the incremental correlation state
+
+Queries (top pairs, neighbours of a feature, cluster members, the most
+strongly correlated features) are array slices and answer in milliseconds.
+"""
+
+import glob
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from config import CACHE_DIR
+from data_store import columns_key
+from downsampling import DEFAULT_MAX_CELLS, block_aggregate
+
+INDEX_DIR = os.path.join(CACHE_DIR, 'correlation_index')
+
+# Neighbours stored per feature
+NEIGHBOURS = 50
+
+# Strongest pairs stored overall
+TOP_PAIRS = 5000
+
+# Matrix rows ranked per step; bounds the working memory to ROW_BLOCK x features
+ROW_BLOCK = 256
+
+ARRAYS = ['corr', 'order', 'linkage', 'neighbour_index', 'neighbour_corr', 'pair_a', 'pair_b', 'pair_corr',
+          'overview_blocks']
+
+
+def _strength(corr):
+    """|r| for ranking; missing correlations (constant columns) rank last"""
+    return np.nan_to_num(np.abs(corr), nan=-1.0)
+
+
+def _neighbours(corr, k):
+    """(index, corr) of the `k` strongest correlations of every feature, strongest first"""
+    p = corr.shape[0]
+    k = min(k, p - 1)
+    if k < 1:
+        return np.empty((p, 0), dtype=np.int32), np.empty((p, 0), dtype=np.float32)
+    index = np.empty((p, k), dtype=np.int32)
+    values = np.empty((p, k), dtype=np.float32)
+    for start in range(0, p, ROW_BLOCK):
+        block = _strength(corr[start:start + ROW_BLOCK])
+        rows = np.arange(len(block))
+        block[rows, start + rows] = -np.inf  # a feature is not its own neighbour
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k] if k < p - 1 else np.argsort(-block, axis=1)[:, :k]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(block, top, axis=1), axis=1), axis=1)
+        index[start:start + len(block)] = top
+        values[start:start + len(block)] = np.take_along_axis(corr[start:start + len(block)], top, axis=1)
+    return index, values
+
+
+def _top_pairs(corr, n):
+    """(a, b, corr) of the `n` strongest pairs a < b, strongest first"""
+    p = corr.shape[0]
+    candidates_a, candidates_b, candidates_s = [], [], []
+    for start in range(0, p, ROW_BLOCK):
+        block = _strength(corr[start:start + ROW_BLOCK])
+        # Upper triangle only: each pair once, no diagonal
+        block[np.tril(np.ones(block.shape, dtype=bool), k=start)] = -np.inf
+        flat = block.ravel()
+        take = min(n, flat.size)
+        top = np.argpartition(-flat, take - 1)[:take] if take < flat.size else np.arange(flat.size)
+        top = top[np.isfinite(flat[top]) & (flat[top] >= 0)]
+        candidates_a.append(start + top // p)
+        candidates_b.append(top % p)
+        candidates_s.append(flat[top])
+    a, b, strength = (np.concatenate(c) for c in (candidates_a, candidates_b, candidates_s))
+    best = np.argsort(-strength, kind='stable')[:n]
+    a, b = a[best].astype(np.int32), b[best].astype(np.int32)
+    return a, b, corr[a, b].astype(np.float32)
+
+
+def _cluster(corr):
+    """Average-linkage tree on 1 - |r| and its leaf order"""
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    p = corr.shape[0]
+    if p < 2:
+        return np.empty((0, 4)), np.arange(p)
+    distance = 1.0 - np.nan_to_num(np.abs(corr.astype(np.float64)), nan=0.0)
+    np.fill_diagonal(distance, 0.0)
+    tree = linkage(squareform(distance, checks=False), method='average')
+    return tree, leaves_list(tree)
+
+
+def build_index(state, path, max_cells=DEFAULT_MAX_CELLS):
+    """Build the index of a correlation state (see correlation.py) into directory `path`"""
+    matrix = state.corr()
+    columns = list(matrix.columns)
+    corr = matrix.to_numpy(dtype=np.float32)
+    tree, order = _cluster(corr)
+    neighbour_index, neighbour_corr = _neighbours(corr, NEIGHBOURS)
+    pair_a, pair_b, pair_corr = _top_pairs(corr, TOP_PAIRS)
+    clustered = matrix.iloc[order, order]
+    overview, row_blocks, _ = block_aggregate(clustered, max_cells)
+    arrays = {
+        'corr': corr,
+        'order': order.astype(np.int32),
+        'linkage': tree,
+        'neighbour_index': neighbour_index,
+        'neighbour_corr': neighbour_corr,
+        'pair_a': pair_a,
+        'pair_b': pair_b,
+        'pair_corr': pair_corr,
+        'overview_blocks': overview.to_numpy(dtype=np.float32),
+    }
+    meta = {
+        'columns': columns,
+        'rows': state.count,
+        'block_labels': list(row_blocks),
+        'block_size': len(next(iter(row_blocks.values()))) if row_blocks else 1,
+    }
+
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    os.makedirs(tmp_path)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(values))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def cached_index(state, fingerprint):
+    """Path of the index for `state` on the dataset `fingerprint`, building it if needed"""
+    key = columns_key(state.columns)
+    path = os.path.join(INDEX_DIR, f'{key}-{fingerprint}')
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return path
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    build_index(state, path)
+    # Indexes of older dataset versions over the same columns are superseded
+    for previous in glob.glob(os.path.join(INDEX_DIR, f'{key}-*')):
+        if previous != path and os.path.isdir(previous) and '.tmp-' not in previous:
+            shutil.rmtree(previous, ignore_errors=True)
+    return path
+
+
+class CorrelationIndex:
+    """Read-only, memory-mapped correlation index"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+        self.path = path
+        self.columns = meta['columns']
+        self.rows = meta['rows']
+        self.block_labels = meta['block_labels']
+        self.block_size = meta['block_size']
+        self.positions = {name: i for i, name in enumerate(self.columns)}
+        self._negative_strength = -np.abs(np.asarray(self.pair_corr))
+
+    def __len__(self):
+        return len(self.columns)
+
+    def top_pairs(self, k=20, min_abs=0.0, sign=None):
+        """
+        The `k` most strongly correlated feature pairs with |r| >= min_abs.
+
+        `sign` restricts to 'positive' or 'negative' correlations. Only the
+        TOP_PAIRS strongest pairs are indexed.
+        """
+        end = int(np.searchsorted(self._negative_strength, -min_abs, side='right'))
+        values = np.asarray(self.pair_corr[:end])
+        selected = np.arange(end)
+        if sign == 'positive':
+            selected = selected[values > 0]
+        elif sign == 'negative':
+            selected = selected[values < 0]
+        selected = selected[:k]
+        columns = np.asarray(self.columns, dtype=object)
+        return pd.DataFrame({
+            'Feature_A': columns[np.asarray(self.pair_a)[selected]],
+            'Feature_B': columns[np.asarray(self.pair_b)[selected]],
+            'Correlation': values[selected],
+        })
+
+    def neighbours(self, feature, k=10):
+        """The `k` features most strongly correlated with `feature`"""
+        row = self.positions[feature]
+        k = min(k, self.neighbour_index.shape[1])
+        columns = np.asarray(self.columns, dtype=object)
+        return pd.DataFrame({
+            'Feature': columns[np.asarray(self.neighbour_index[row, :k])],
+            'Correlation': np.asarray(self.neighbour_corr[row, :k]),
+        })
+
+    def clusters(self, min_abs=0.7):
+        """Cluster id of every feature, cutting the tree where average |r| drops below `min_abs`"""
+        from scipy.cluster.hierarchy import fcluster
+
+        if len(self.columns) < 2:
+            return pd.Series(1, index=self.columns)
+        labels = fcluster(np.asarray(self.linkage), t=1.0 - min_abs, criterion='distance')
+        return pd.Series(labels, index=self.columns)
+
+    def cluster_members(self, feature, min_abs=0.7):
+        """Features in the same cluster as `feature`, in clustered order"""
+        labels = self.clusters(min_abs)
+        members = set(labels.index[labels == labels[feature]])
+        return [self.columns[i] for i in self.order if self.columns[i] in members]
+
+    def top_features(self, k=DEFAULT_MAX_CELLS):
+        """The `k` features with the strongest correlation to any other feature, in clustered order"""
+        if len(self.columns) <= k or self.neighbour_corr.shape[1] == 0:
+            return [self.columns[i] for i in self.order]
+        strength = _strength(np.asarray(self.neighbour_corr[:, 0]))
+        keep = set(np.argsort(-strength, kind='stable')[:k].tolist())
+        return [self.columns[i] for i in self.order if i in keep]
+
+    def submatrix(self, rows, columns=None):
+        """Correlations between `rows` and `columns` (default: `rows`), read from disk"""
+        columns = rows if columns is None else columns
+        row_index = np.array([self.positions[f] for f in rows])
+        column_index = np.array([self.positions[f] for f in columns])
+        values = np.asarray(self.corr[row_index][:, column_index])
+        return pd.DataFrame(values, index=list(rows), columns=list(columns))
+
+    def overview(self):
+        """Block-aggregated heatmap of the clustered matrix, and the features behind each block"""
+        ordered = [self.columns[i] for i in self.order]
+        blocks = {label: ordered[i * self.block_size:(i + 1) * self.block_size]
+                  for i, label in enumerate(self.block_labels)}
+        frame = pd.DataFrame(np.asarray(self.overview_blocks), index=self.block_labels, columns=self.block_labels)
+        return frame, blocks
+
+
+def load(path):
+    """Memory-map an index directory"""
+    return CorrelationIndex(path)
@@ -0,0 +1,460 @@
+"""
+Columnar Data Store for Hydraulic System Monitoring
+
+Keeps a Parquet copy of full_df.csv that is built once and reused until the
+source file changes:
+1. The CSV is fingerprinted by content hash (re-hashed only when size/mtime change)
+2. The Parquet store is written next to the fingerprint under .cache/store
+3. A dtype-downcast Arrow IPC copy of the store is memory-mapped read-only,
+   so every session and worker process shares the same pages zero-copy
+4. Readers project columns so pages only materialize what they use
+5. When a partitioned dataset exists (dataset/manifest.json), it replaces the
+   CSV: new cycles are appended as one Parquet partition each, existing
+   partitions are never rewritten, and every partition gets its own matrix,
+   keyed by content, so an append only builds the new partition's
+
+Readers concatenate the partitions' mapped matrices in manifest order; only
+columns whose downcast type differs between partitions are copied.
+
+Usage:
+    python data_store.py build
+    python data_store.py append full_df.csv
+    python data_store.py partitions
+"""
+
+import functools
+import hashlib
+import json
+import os
+import time
+
+import click
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from config import CACHE_DIR, TARGETS
+
+SOURCE_CSV = 'full_df.csv'
+DATASET_DIR = 'dataset'
+STORE_DIR = os.path.join(CACHE_DIR, 'store')
+MANIFEST = 'manifest.json'
+
+# float64 columns are stored as float32 unless a finite value exceeds this magnitude
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, read in fixed-size chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path, payload):
+    """Write JSON through a temporary file so readers never see partial output"""
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def default_source():
+    """The partitioned dataset when it exists, otherwise the monolithic CSV"""
+    return DATASET_DIR if os.path.exists(manifest_path(DATASET_DIR)) else SOURCE_CSV
+
+
+def is_partitioned(path):
+    """Whether `path` is a partitioned dataset directory rather than a CSV file"""
+    return os.path.isdir(path)
+
+
+def manifest_path(dataset_dir=DATASET_DIR):
+    """Location of a partitioned dataset's manifest"""
+    return os.path.join(dataset_dir, MANIFEST)
+
+
+def read_manifest(dataset_dir=DATASET_DIR):
+    """
+    Columns and partitions (oldest first) of a partitioned dataset.
+
+    Partition entries hold file, hash, rows, first_cycle, last_cycle and
+    created_at. A directory without a manifest is an empty dataset.
+    """
+    try:
+        with open(manifest_path(dataset_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'columns': [], 'partitions': []}
+
+
+def dataset_partitions(path=None):
+    """Manifest entries of a partitioned source with their file `path`, or None for a CSV source"""
+    path = path or default_source()
+    if not is_partitioned(path):
+        return None
+    return [dict(entry, path=os.path.join(path, entry['file']))
+            for entry in read_manifest(path)['partitions']]
+
+
+def source_fingerprint(path=None):
+    """
+    Fingerprint of the source (default: the partitioned dataset, else the CSV).
+
+    A CSV's content hash is cached in a sidecar keyed on size and mtime, so
+    the file is only re-read when it actually changes on disk. A partitioned
+    dataset is fingerprinted by its partition hashes, from the manifest alone.
+    Raises FileNotFoundError if the source does not exist or has no partitions.
+    """
+    path = path or default_source()
+    if is_partitioned(path):
+        partitions = read_manifest(path)['partitions']
+        if not partitions:
+            raise FileNotFoundError(f"No partitions in {path}")
+        hashes = ' '.join(entry['hash'] for entry in partitions)
+        return hashlib.sha256(hashes.encode()).hexdigest()[:16]
+
+    stat = os.stat(path)
+    os.makedirs(STORE_DIR, exist_ok=True)
+    sidecar = os.path.join(STORE_DIR, 'source.json')
+
+    if os.path.exists(sidecar):
+        with open(sidecar) as f:
+            meta = json.load(f)
+        if (meta.get('path') == os.path.abspath(path)
+                and meta.get('size') == stat.st_size
+                and meta.get('mtime_ns') == stat.st_mtime_ns):
+            return meta['fingerprint']
+
+    fingerprint = file_hash(path)[:16]
+    _write_json_atomic(sidecar, {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'fingerprint': fingerprint,
+    })
+    return fingerprint
+
+
+def store_path(fingerprint):
+    """Location of the Parquet store for a given source fingerprint"""
+    return os.path.join(STORE_DIR, f'full_df-{fingerprint}.parquet')
+
+
+def _read_source_csv(path):
+    """Parse the CSV with Arrow's multithreaded reader, naming blank headers like pandas"""
+    table = pv.read_csv(path)
+    names = [name if name else f'Unnamed: {i}' for i, name in enumerate(table.column_names)]
+    return table.rename_columns(names)
+
+
+def build_store(path=None):
+    """
+    Convert the CSV into a Parquet store (no-op if it is already current).
+
+    A partitioned source is already Parquet: its partition files are returned.
+    """
+    path = path or default_source()
+    if is_partitioned(path):
+        return [entry['path'] for entry in dataset_partitions(path)]
+    fingerprint = source_fingerprint(path)
+    target = store_path(fingerprint)
+    if os.path.exists(target):
+        return target
+
+    table = _read_source_csv(path)
+    tmp_path = f'{target}.tmp-{os.getpid()}'
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, target)
+
+    # Stores for older versions of the CSV are never read again
+    for name in os.listdir(STORE_DIR):
+        stale = os.path.join(STORE_DIR, name)
+        if name.startswith('full_df-') and name.endswith('.parquet') and stale != target:
+            os.remove(stale)
+    return target
+
+
+def store_columns(path=None):
+    """Column names available in the store, read from the Parquet schema (or manifest) only"""
+    path = path or default_source()
+    if is_partitioned(path):
+        return read_manifest(path)['columns']
+    return pq.read_schema(build_store(path)).names
+
+
+def matrix_path(fingerprint):
+    """Location of the memory-mappable feature matrix for a given source fingerprint"""
+    return os.path.join(STORE_DIR, f'matrix-{fingerprint}.arrow')
+
+
+def partition_matrix_path(partition_hash):
+    """Location of the memory-mappable matrix of one dataset partition"""
+    return os.path.join(STORE_DIR, f'matrix-part-{partition_hash}.arrow')
+
+
+def _smallest_int_type(column):
+    """Narrowest signed integer type that holds every value of `column`"""
+    bounds = pc.min_max(column)
+    low, high = bounds['min'].as_py(), bounds['max'].as_py()
+    if low is None:
+        return pa.int8()
+    for int_type, info in ((pa.int8(), np.iinfo(np.int8)),
+                           (pa.int16(), np.iinfo(np.int16)),
+                           (pa.int32(), np.iinfo(np.int32))):
+        if info.min <= low and high <= info.max:
+            return int_type
+    return pa.int64()
+
+
+def downcast_column(name, column):
+    """
+    Shrink one column for the shared matrix.
+
+    Targets become dictionary (categorical) columns with int8 codes, float64
+    columns become float32 and integers use the narrowest type that holds
+    their range. The float32 downcast is unconditional apart from overflow:
+    values are rounded to about 7 significant digits, the precision the tree
+    models split on anyway.
+    """
+    column = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+
+    if name in TARGETS:
+        encoded = column.dictionary_encode()
+        index_type = pa.int8() if len(encoded.dictionary) <= np.iinfo(np.int8).max else pa.int16()
+        return pa.DictionaryArray.from_arrays(encoded.indices.cast(index_type), encoded.dictionary)
+
+    if pa.types.is_float64(column.type):
+        values = column.to_numpy(zero_copy_only=False)
+        if np.any(np.isfinite(values) & (np.abs(values) > FLOAT32_MAX)):
+            return column
+        return column.cast(pa.float32(), safe=False)
+
+    if pa.types.is_integer(column.type):
+        return column.cast(_smallest_int_type(column))
+
+    return column
+
+
+def _write_matrix(source, target):
+    """Downcast the Parquet file `source` into an Arrow IPC matrix at `target`"""
+    table = pq.read_table(source)
+    columns = [downcast_column(name, table.column(name)) for name in table.column_names]
+    table = pa.Table.from_arrays(columns, names=table.column_names)
+
+    # Uncompressed, single-batch IPC so readers can map columns without copying
+    tmp_path = f'{target}.tmp-{os.getpid()}'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, target)
+
+
+def build_partition_matrix(entry):
+    """Write the matrix of one partition (an entry of dataset_partitions), if not built yet"""
+    target = partition_matrix_path(entry['hash'])
+    if not os.path.exists(target):
+        os.makedirs(STORE_DIR, exist_ok=True)
+        _write_matrix(entry['path'], target)
+    return target
+
+
+def build_matrix(path=None):
+    """
+    Write the downcast, uncompressed Arrow IPC matrix (no-op if already current).
+
+    A partitioned source gets one matrix per partition; the list is returned.
+    """
+    path = path or default_source()
+    if is_partitioned(path):
+        partitions = dataset_partitions(path)
+        if not partitions:
+            raise FileNotFoundError(f"No partitions in {path}")
+        return [build_partition_matrix(entry) for entry in partitions]
+
+    fingerprint = source_fingerprint(path)
+    target = matrix_path(fingerprint)
+    if os.path.exists(target):
+        return target
+    _write_matrix(build_store(path), target)
+
+    # Partition matrices are keyed by content and stay valid across appends
+    for name in os.listdir(STORE_DIR):
+        stale = os.path.join(STORE_DIR, name)
+        if (name.startswith('matrix-') and not name.startswith('matrix-part-')
+                and name.endswith('.arrow') and stale != target):
+            os.remove(stale)
+    return target
+
+
+@functools.lru_cache(maxsize=256)
+def _mapped_table(matrix_file):
+    """Open the matrix once per process; the OS page cache shares it between processes"""
+    return pa.ipc.open_file(pa.memory_map(matrix_file, 'r')).read_all()
+
+
+def partition_table(entry, columns=None):
+    """One partition as a memory-mapped Arrow table, projected to `columns` when given"""
+    table = _mapped_table(build_partition_matrix(entry))
+    return table.select(list(columns)) if columns is not None else table
+
+
+def _unified_schema(schemas):
+    """Schema every partition casts to: the narrowest types that hold all of them"""
+    return pa.unify_schemas(schemas, promote_options='permissive')
+
+
+def dataset_schema(path=None):
+    """Arrow schema of load_table() without reading any rows"""
+    matrix = build_matrix(path)
+    if isinstance(matrix, str):
+        return _mapped_table(matrix).schema
+    return _unified_schema([_mapped_table(part).schema for part in matrix])
+
+
+def load_table(columns=None, path=None):
+    """Load the dataset as a memory-mapped Arrow table, projected to `columns` when given"""
+    matrix = build_matrix(path)
+    if isinstance(matrix, str):
+        table = _mapped_table(matrix)
+        return table.select(list(columns)) if columns is not None else table
+
+    tables = [_mapped_table(part) for part in matrix]
+    if columns is not None:
+        tables = [table.select(list(columns)) for table in tables]
+    schema = _unified_schema([table.schema for table in tables])
+    return pa.concat_tables([table if table.schema.equals(schema) else table.cast(schema)
+                             for table in tables])
+
+
+def load_columns(columns=None, path=None):
+    """
+    Load the dataset as a read-only DataFrame, projected to `columns` when given.
+
+    Numeric columns without nulls stay backed by the memory-mapped file, so the
+    frame must be treated as immutable.
+    """
+    return load_table(columns, path).to_pandas(split_blocks=True)
+
+
+def columns_key(columns):
+    """Short stable key for a column list, used in derived cache file names"""
+    return hashlib.sha256('\x1f'.join(map(str, columns)).encode()).hexdigest()[:12]
+
+
+def row_hashes(frame):
+    """One uint64 hash per row, used to recognise rows a derived cache already covers"""
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def append_partition(frame, dataset_dir=DATASET_DIR):
+    """
+    Append `frame` to the partitioned dataset as one new Parquet partition.
+
+    Columns must match the dataset's, and values are cast to the types of the
+    first partition. A frame indexed by 'cycle' gives the partition's cycle
+    range, which must follow the cycles already stored; otherwise cycles
+    continue the count. Appending the same rows twice is rejected.
+
+    Existing partitions are never rewritten and the manifest is replaced
+    atomically; appends must come from one writer at a time. Returns the
+    new manifest entry.
+    """
+    if frame.empty:
+        raise ValueError("No rows to append")
+    manifest = read_manifest(dataset_dir)
+    partitions = manifest['partitions']
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    if partitions:
+        if table.column_names != manifest['columns']:
+            missing = [c for c in manifest['columns'] if c not in table.column_names]
+            extra = [c for c in table.column_names if c not in manifest['columns']]
+            raise ValueError(f"Columns differ from the dataset's "
+                             f"(missing {missing[:5]}, extra {extra[:5]})")
+        schema = pq.read_schema(os.path.join(dataset_dir, partitions[0]['file'])).remove_metadata()
+        try:
+            table = table.cast(schema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(f"Rows do not fit the dataset's column types: {e}") from e
+
+    previous = partitions[-1]['last_cycle'] if partitions else -1
+    if frame.index.name == 'cycle':
+        first_cycle, last_cycle = int(frame.index.min()), int(frame.index.max())
+        if first_cycle <= previous:
+            raise ValueError(f"Cycle {first_cycle} is not after the last stored cycle ({previous})")
+    else:
+        first_cycle, last_cycle = previous + 1, previous + len(frame)
+
+    os.makedirs(dataset_dir, exist_ok=True)
+    tmp_path = os.path.join(dataset_dir, f'.partition.tmp-{os.getpid()}')
+    pq.write_table(table, tmp_path)
+    partition_hash = file_hash(tmp_path)[:16]
+    if any(entry['hash'] == partition_hash for entry in partitions):
+        os.remove(tmp_path)
+        raise ValueError("These rows are already a partition of the dataset")
+    name = f'part-{len(partitions):05d}-{partition_hash}.parquet'
+    os.replace(tmp_path, os.path.join(dataset_dir, name))
+
+    entry = {'file': name, 'hash': partition_hash, 'rows': table.num_rows,
+             'first_cycle': first_cycle, 'last_cycle': last_cycle, 'created_at': time.time()}
+    _write_json_atomic(manifest_path(dataset_dir),
+                       {'columns': table.column_names, 'partitions': partitions + [entry]})
+    return entry
+
+
+@click.group()
+def main():
+    """Build the columnar store and manage the partitioned dataset."""
+
+
+@main.command('build')
+def build_command():
+    """Build the memory-mappable matrix of the current source."""
+    matrix = build_matrix()
+    click.echo('\n'.join(matrix) if isinstance(matrix, list) else matrix)
+
+
+@main.command('append')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--dataset', 'dataset_dir', default=DATASET_DIR, show_default=True,
+              help='Partitioned dataset directory to append to.')
+def append_command(source, dataset_dir):
+    """Append the rows of a feature table (.csv or .parquet) as one new partition."""
+    if source.endswith('.parquet'):
+        table = pq.read_table(source)
+    else:
+        table = _read_source_csv(source)
+        # The unnamed row-number column features.py writes is positional, not data
+        if table.column_names and table.column_names[0] == 'Unnamed: 0':
+            table = table.drop(['Unnamed: 0'])
+    try:
+        entry = append_partition(table.to_pandas(), dataset_dir)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Appended {entry['rows']} rows "
+               f"(cycles {entry['first_cycle']}-{entry['last_cycle']}) "
+               f"as {os.path.join(dataset_dir, entry['file'])}")
+
+
+@main.command('partitions')
+@click.option('--dataset', 'dataset_dir', default=DATASET_DIR, show_default=True,
+              help='Partitioned dataset directory.')
+def partitions_command(dataset_dir):
+    """List the partitions of the dataset."""
+    partitions = read_manifest(dataset_dir)['partitions']
+    if not partitions:
+        raise click.ClickException(f"No partitions in {dataset_dir}")
+    for entry in partitions:
+        click.echo(f"{entry['file']}  {entry['rows']:>8,} rows  "
+                   f"cycles {entry['first_cycle']}-{entry['last_cycle']}  "
+                   f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['created_at']))}")
+    click.echo(f"fingerprint {source_fingerprint(dataset_dir)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+Dataset Profile for Hydraulic System Monitoring
+
+Summarizes the dataset once per source fingerprint, so the Overview page never
+touches the data to draw its cards:
+1. One pass over the memory-mapped Arrow matrix collects, per column, the
+   dtype, null and NaN counts, min / max / mean and in-memory size
+2. Class counts of every target column are collected in the same pass
+3. The profile is stored as a small JSON sidecar next to the store
+   (.cache/store/profile-<fingerprint>.json) and reused until the CSV changes
+4. A partitioned dataset is profiled partition by partition
+   (.cache/store/profile-part-<hash>.json); after an append only the new
+   partition is read, and the partition profiles are merged
+
+Missing values count both nulls and NaN; data quality is the share of cells
+that hold a value.
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import data_store
+from config import TARGETS
+
+# Bumped when the profile layout changes, so old sidecars are rebuilt
+PROFILE_VERSION = 2
+
+
+def profile_path(fingerprint):
+    """Location of the profile sidecar for a given source fingerprint"""
+    return os.path.join(data_store.STORE_DIR, f'profile-{fingerprint}.json')
+
+
+def _scalar(value):
+    """Arrow scalar as a JSON-safe Python value (NaN becomes None)"""
+    value = value.as_py() if isinstance(value, pa.Scalar) else value
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _dtype(arrow_type):
+    """The pandas dtype name load_columns gives a column of this Arrow type"""
+    if pa.types.is_dictionary(arrow_type):
+        return 'category'
+    try:
+        return str(np.dtype(arrow_type.to_pandas_dtype()))
+    except NotImplementedError:
+        return 'object'
+
+
+def _column_profile(name, column):
+    column = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    numeric = pa.types.is_integer(column.type) or pa.types.is_floating(column.type)
+    nans = int(pc.sum(pc.is_nan(column)).as_py() or 0) if pa.types.is_floating(column.type) else 0
+    profile = {
+        'name': name,
+        'dtype': _dtype(column.type),
+        'numeric': numeric,
+        'nulls': column.null_count + nans,
+        'count': len(column) - column.null_count - nans,
+        'bytes': column.nbytes,
+        'min': None, 'max': None, 'mean': None,
+    }
+    if numeric:
+        values = pc.drop_null(column)
+        if nans:
+            values = values.filter(pc.invert(pc.is_nan(values)))
+        bounds = pc.min_max(values)
+        profile.update(min=_scalar(bounds['min']), max=_scalar(bounds['max']), mean=_scalar(pc.mean(values)))
+    if name in TARGETS:
+        decoded = column.dictionary_decode() if pa.types.is_dictionary(column.type) else column
+        counts = pc.value_counts(pc.drop_null(decoded))
+        classes = sorted(zip(counts.field('values').to_pylist(), counts.field('counts').to_pylist()),
+                         key=lambda item: -item[1])
+        profile['classes'] = [{'value': value, 'count': count} for value, count in classes]
+    return profile
+
+
+def _summarize(columns, rows):
+    """Table-level profile from per-column profiles"""
+    missing = sum(column['nulls'] for column in columns)
+    cells = rows * len(columns)
+    dtype_counts = {}
+    for column in columns:
+        dtype_counts[column['dtype']] = dtype_counts.get(column['dtype'], 0) + 1
+    return {
+        'version': PROFILE_VERSION,
+        'rows': rows,
+        'columns': columns,
+        'numeric_columns': [column['name'] for column in columns if column['numeric']],
+        'dtype_counts': dtype_counts,
+        'memory_bytes': sum(column['bytes'] for column in columns),
+        'missing_values': missing,
+        'data_quality': 1.0 - missing / cells if cells else 1.0,
+        'targets': {column['name']: column['classes'] for column in columns if 'classes' in column},
+    }
+
+
+def profile_table(table):
+    """Profile of an Arrow table: shape, per-column statistics, dtype counts and target classes"""
+    return _summarize([_column_profile(name, table.column(name)) for name in table.column_names], table.num_rows)
+
+
+def _merge_columns(name, dtype, parts):
+    """Profile of one column over several partitions, from its per-partition profiles"""
+    merged = {
+        'name': name,
+        'dtype': dtype,
+        'numeric': all(part['numeric'] for part in parts),
+        'nulls': sum(part['nulls'] for part in parts),
+        'count': sum(part['count'] for part in parts),
+        'bytes': sum(part['bytes'] for part in parts),
+        'min': None, 'max': None, 'mean': None,
+    }
+    valued = [part for part in parts if part['mean'] is not None and part['count']]
+    if merged['numeric'] and valued:
+        merged.update(min=min(part['min'] for part in valued), max=max(part['max'] for part in valued),
+                      mean=sum(part['mean'] * part['count'] for part in valued) / sum(part['count'] for part in valued))
+    if 'classes' in parts[0]:
+        counts = {}
+        for part in parts:
+            for item in part['classes']:
+                counts[item['value']] = counts.get(item['value'], 0) + item['count']
+        merged['classes'] = [{'value': value, 'count': count}
+                             for value, count in sorted(counts.items(), key=lambda item: -item[1])]
+    return merged
+
+
+def merge_profiles(profiles, schema):
+    """Profile of the concatenated partitions; `schema` is the dataset's unified Arrow schema"""
+    columns = [_merge_columns(name, _dtype(schema.field(name).type), [p['columns'][i] for p in profiles])
+               for i, name in enumerate(schema.names)]
+    return _summarize(columns, sum(p['rows'] for p in profiles))
+
+
+def _read_profile(sidecar):
+    try:
+        with open(sidecar) as f:
+            profile = json.load(f)
+    except FileNotFoundError:
+        return None
+    return profile if profile.get('version') == PROFILE_VERSION else None
+
+
+def _write_profile(sidecar, profile):
+    tmp_path = f'{sidecar}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(profile, f)
+    os.replace(tmp_path, sidecar)
+
+
+def partition_profile(entry):
+    """Profile of one dataset partition, cached by partition content"""
+    sidecar = os.path.join(data_store.STORE_DIR, f"profile-part-{entry['hash']}.json")
+    profile = _read_profile(sidecar)
+    if profile is None:
+        profile = profile_table(data_store.partition_table(entry))
+        _write_profile(sidecar, profile)
+    return profile
+
+
+def cached_profile(path=None):
+    """Profile of the dataset, read from its sidecar or computed once and stored there"""
+    fingerprint = data_store.source_fingerprint(path)
+    sidecar = profile_path(fingerprint)
+    profile = _read_profile(sidecar)
+    if profile is not None:
+        return profile
+
+    partitions = data_store.dataset_partitions(path)
+    if partitions is None:
+        profile = profile_table(data_store.load_table(path=path))
+    else:
+        profile = merge_profiles([partition_profile(entry) for entry in partitions],
+                                 data_store.dataset_schema(path))
+    _write_profile(sidecar, profile)
+
+    # Profiles of older versions of the dataset are never read again; partition profiles stay valid
+    for name in os.listdir(data_store.STORE_DIR):
+        stale = os.path.join(data_store.STORE_DIR, name)
+        if (name.startswith('profile-') and not name.startswith('profile-part-')
+                and name.endswith('.json') and stale != sidecar):
+            os.remove(stale)
+    return profile
+
+
+if __name__ == '__main__':
+    summary = cached_profile()
+    print(f"{summary['rows']:,} rows x {len(summary['columns'])} columns, "
+          f"{summary['missing_values']:,} missing values, {summary['memory_bytes'] / 1024**2:.2f} MB")
@@ -0,0 +1,134 @@
+"""
+Chart Downsampling for Hydraulic System Monitoring
+
+Reduces what a chart ships to the browser to what its pixels can show:
+1. Signals and other per-sample series are downsampled with LTTB
+   (Largest-Triangle-Three-Buckets, keeps the visual shape) or min-max
+   buckets (keeps every spike), per series, to a point budget
+2. Matrices (correlation heatmaps) are reduced to a cell budget by block
+   aggregation
+3. Block reductions keep the feature labels of every block, so a page can
+   drill down into one block at full resolution on demand
+
+Series and matrices already within budget are returned unchanged.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Points per series: about one per horizontal pixel of a full-width chart
+DEFAULT_MAX_POINTS = 1200
+
+# Cells per heatmap side: keeps cells a few pixels wide on a full-width chart
+DEFAULT_MAX_CELLS = 120
+
+SERIES_METHODS = ['lttb', 'minmax']
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the `n_out` points LTTB keeps from the series (x, y); x must be sorted"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # First and last points are always kept; the rest are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Third vertex: the average point of the next bucket (the last point for the final bucket)
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(areas.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """Indices of the minimum and maximum of each of n_out / 2 equal buckets, in order"""
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    n_buckets = n_out // 2
+    size = math.ceil(n / n_buckets)
+    n_buckets = math.ceil(n / size)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = np.asarray(y, dtype=np.float64)
+    buckets = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lows = offsets + np.nanargmin(buckets, axis=1)
+    highs = offsets + np.nanargmax(buckets, axis=1)
+    return np.unique(np.concatenate([lows, highs]))
+
+
+def downsample_series(frame, x, y, max_points=DEFAULT_MAX_POINTS, method='lttb', group=None):
+    """
+    Rows of `frame` kept when plotting `y` against `x` with at most `max_points` per series.
+
+    With `group`, every group (a line or color of the chart) is downsampled
+    on its own. Rows where `y` is missing are dropped from oversized series.
+    All columns are kept, so hover data still works.
+    """
+    if method not in SERIES_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    if group is not None:
+        parts = [downsample_series(part, x, y, max_points, method) for _, part in frame.groupby(group, sort=False)]
+        return pd.concat(parts) if parts else frame
+    if len(frame) <= max_points:
+        return frame
+    series = frame.dropna(subset=[y]).sort_values(x, kind='stable')
+    values = pd.to_numeric(series[y], errors='coerce').to_numpy(dtype=np.float64)
+    if method == 'lttb':
+        positions = np.asarray(series[x], dtype=np.float64) if np.issubdtype(series[x].dtype, np.number) \
+            else np.arange(len(series), dtype=np.float64)
+        keep = lttb_indices(positions, values, max_points)
+    else:
+        keep = minmax_indices(values, max_points)
+    return series.iloc[keep]
+
+
+def _block_label(labels):
+    labels = [str(label) for label in labels]
+    return labels[0] if len(labels) == 1 else f"{labels[0]} … {labels[-1]} ({len(labels)})"
+
+
+def _absmax(blocks, axis):
+    """Signed value of largest magnitude along `axis`, ignoring NaN padding"""
+    magnitude = np.where(np.isnan(blocks), -np.inf, np.abs(blocks))
+    index = np.expand_dims(magnitude.argmax(axis=axis), axis)
+    return np.take_along_axis(blocks, index, axis=axis).squeeze(axis)
+
+
+def block_aggregate(matrix, max_cells=DEFAULT_MAX_CELLS, agg='absmax'):
+    """
+    Reduce `matrix` (a labelled DataFrame) to at most max_cells x max_cells by aggregating blocks.
+
+    `agg` is 'mean', or 'absmax' (the strongest signed value of each block,
+    so strong correlations are not averaged away). Returns (reduced frame,
+    {block label: row labels}, {block label: column labels}).
+    """
+    row_size = math.ceil(matrix.shape[0] / max_cells)
+    col_size = math.ceil(matrix.shape[1] / max_cells)
+    if row_size == 1 and col_size == 1:
+        return (matrix, {str(r): [r] for r in matrix.index}, {str(c): [c] for c in matrix.columns})
+    n_rows, n_cols = math.ceil(matrix.shape[0] / row_size), math.ceil(matrix.shape[1] / col_size)
+    padded = np.full((n_rows * row_size, n_cols * col_size), np.nan)
+    padded[:matrix.shape[0], :matrix.shape[1]] = matrix.to_numpy(dtype=np.float64)
+    blocks = padded.reshape(n_rows, row_size, n_cols, col_size).transpose(0, 2, 1, 3).reshape(n_rows, n_cols, -1)
+    values = np.nanmean(blocks, axis=2) if agg == 'mean' else _absmax(blocks, axis=2)
+
+    row_blocks = {_block_label(matrix.index[i:i + row_size]): list(matrix.index[i:i + row_size])
+                  for i in range(0, matrix.shape[0], row_size)}
+    col_blocks = {_block_label(matrix.columns[i:i + col_size]): list(matrix.columns[i:i + col_size])
+                  for i in range(0, matrix.shape[1], col_size)}
+    return pd.DataFrame(values, index=list(row_blocks), columns=list(col_blocks)), row_blocks, col_blocks
+
@@ -0,0 +1,122 @@
+"""
+Feature-Target Ranking for Hydraulic System Monitoring
+
+Scores every feature against a categorical target in one vectorized pass:
+1. Pearson correlation with the target's category codes
+2. ANOVA F statistic from per-class sums (one matrix product)
+3. Mutual information from quantile-binned features (one bincount)
+
+Rankings are cached under .cache/ranking per target and dataset fingerprint.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import CACHE_DIR
+from data_store import columns_key
+
+RANKING_DIR = os.path.join(CACHE_DIR, 'ranking')
+
+# Quantile bins per feature for the mutual information estimate
+MI_BINS = 16
+
+
+def _feature_matrix(X):
+    """Features as float64, with missing values replaced by the column mean"""
+    values = X.to_numpy(dtype=np.float64)
+    missing = ~np.isfinite(values)
+    if missing.any():
+        values = values.copy()
+        values[missing] = np.nan
+        column_means = np.nan_to_num(np.nanmean(values, axis=0))
+        values[missing] = np.take(column_means, np.nonzero(missing)[1])
+    return values
+
+
+def pearson_scores(values, codes):
+    """Pearson correlation of every column of `values` with `codes`"""
+    centered = values - values.mean(axis=0)
+    codes_centered = codes - codes.mean()
+    numerator = codes_centered @ centered
+    denominator = np.sqrt(np.einsum('ij,ij->j', centered, centered) * (codes_centered @ codes_centered))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return numerator / denominator
+
+
+def anova_f_scores(values, codes, n_classes):
+    """One-way ANOVA F statistic of every column across the target classes"""
+    n_samples = len(values)
+    one_hot = np.zeros((n_samples, n_classes))
+    one_hot[np.arange(n_samples), codes] = 1.0
+    class_counts = one_hot.sum(axis=0)
+
+    grand_mean = values.mean(axis=0)
+    class_means = (one_hot.T @ values) / class_counts[:, None]
+    between = class_counts @ (class_means - grand_mean) ** 2
+    total = np.einsum('ij,ij->j', values - grand_mean, values - grand_mean)
+    within = total - between
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (between / (n_classes - 1)) / (within / (n_samples - n_classes))
+
+
+def mutual_info_scores(values, codes, n_classes, n_bins=MI_BINS):
+    """Mutual information (nats) between quantile-binned columns and the target"""
+    n_samples, n_features = values.shape
+    ranks = values.argsort(axis=0, kind='stable').argsort(axis=0, kind='stable')
+    bins = ranks * n_bins // n_samples
+
+    # Joint (feature, bin, class) counts for all features in a single bincount
+    offsets = np.arange(n_features) * (n_bins * n_classes)
+    cells = offsets + bins * n_classes + codes[:, None]
+    joint = np.bincount(cells.ravel(), minlength=n_features * n_bins * n_classes)
+    joint = joint.reshape(n_features, n_bins, n_classes) / n_samples
+
+    bin_marginal = joint.sum(axis=2, keepdims=True)
+    class_marginal = joint.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = joint * np.log(joint / (bin_marginal * class_marginal))
+    return np.nansum(terms, axis=(1, 2))
+
+
+def rank_features(X, y):
+    """
+    Rank all features of `X` against the categorical target `y`.
+
+    Returns a frame with Feature, Correlation (absolute Pearson), Pearson,
+    F_Score and Mutual_Info, sorted by Correlation. Rows with a missing
+    target are left out.
+    """
+    categories = pd.Categorical(y)
+    labelled = categories.codes >= 0
+    if not labelled.all():
+        X, categories = X.iloc[np.flatnonzero(labelled)], categories[labelled]
+    codes = categories.codes.astype(np.int64)
+    n_classes = len(categories.categories)
+    values = _feature_matrix(X)
+
+    pearson = pearson_scores(values, codes.astype(np.float64))
+    ranking = pd.DataFrame({
+        'Feature': X.columns,
+        'Correlation': np.abs(pearson),
+        'Pearson': pearson,
+        'F_Score': anova_f_scores(values, codes, n_classes),
+        'Mutual_Info': mutual_info_scores(values, codes, n_classes),
+    })
+    return ranking.sort_values('Correlation', ascending=False, na_position='last').reset_index(drop=True)
+
+
+def cached_ranking(X, y, target, fingerprint):
+    """Feature ranking for `target`, persisted per dataset fingerprint and feature set"""
+    path = os.path.join(RANKING_DIR, f'{target}-{fingerprint}-{columns_key(X.columns)}.parquet')
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+
+    ranking = rank_features(X, y)
+    os.makedirs(RANKING_DIR, exist_ok=True)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    ranking.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return ranking
@@ -0,0 +1,316 @@
+"""
+Per-Cycle Feature Extraction for Hydraulic System Monitoring
+
+Turns raw (cycles x samples) sensor traces into model features with batched
+NumPy operations, one sensor array at a time:
+1. Statistics: mean, std, min, max, median, ptp, rms, skew, kurtosis, slope
+2. Rolling windows: roll<W>_<mean|std>_<mean|std|min|max>, e.g. PS1_roll100_mean_max
+3. Spectral: fft_peak_freq, fft_peak_power, fft_centroid, fft_band<lo>_<hi>hz
+4. Batches of cycles are extracted in parallel worker processes
+
+Feature names are '<SENSOR>_<feature>', so the exact columns recorded in a
+model's feature_names_in_ can be parsed and produced in the same order.
+
+Usage:
+    python features.py --store data/cycles.parquet --output full_df.csv
+    python features.py --store data/cycles.parquet --append-to dataset
+"""
+
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import click
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import data_store
+import model_store
+from config import TARGETS
+from ingestion import (CYCLE_SECONDS, CYCLE_STORE, DEFAULT_CHUNK_CYCLES, PROFILE_COLUMNS, iter_cycle_batches,
+                       store_rates)
+
+STATISTICS = ['mean', 'std', 'min', 'max', 'median', 'ptp', 'rms', 'skew', 'kurtosis', 'slope']
+SPECTRAL = ['fft_peak_freq', 'fft_peak_power', 'fft_centroid']
+
+# Default rolling windows, in seconds, and spectral bands (Hz) used when no model dictates features
+DEFAULT_ROLLING_SECONDS = [1, 10]
+DEFAULT_BANDS = [(0, 1), (1, 5), (5, 20), (20, 50)]
+
+ROLLING_PATTERN = re.compile(r'roll(\d+)_(mean|std)_(mean|std|min|max)$')
+BAND_PATTERN = re.compile(r'fft_band(\d+)_(\d+)hz$')
+
+
+def parse_feature(name, sensors):
+    """Split '<SENSOR>_<feature>' into (sensor, feature), or None if it is not a known feature"""
+    for sensor in sorted(sensors, key=len, reverse=True):
+        if not name.startswith(f'{sensor}_'):
+            continue
+        feature = name[len(sensor) + 1:]
+        if feature in STATISTICS or feature in SPECTRAL or ROLLING_PATTERN.match(feature) \
+                or BAND_PATTERN.match(feature):
+            return sensor, feature
+    return None
+
+
+def default_feature_names(rates):
+    """Feature set extracted when no model dictates one"""
+    names = []
+    for sensor, rate in rates.items():
+        names.extend(f'{sensor}_{stat}' for stat in STATISTICS)
+        for seconds in DEFAULT_ROLLING_SECONDS:
+            window = seconds * rate
+            if 1 < window < rate * CYCLE_SECONDS:
+                names.extend(f'{sensor}_roll{window}_{inner}_{outer}'
+                             for inner, outer in [('mean', 'std'), ('mean', 'min'), ('mean', 'max'),
+                                                  ('std', 'mean')])
+        if rate > 1:
+            names.extend(f'{sensor}_{spectral}' for spectral in SPECTRAL)
+            names.extend(f'{sensor}_fft_band{lo}_{hi}hz' for lo, hi in DEFAULT_BANDS if lo < rate / 2)
+    return names
+
+
+def _statistics(values, wanted, rate):
+    """Requested per-cycle statistics of a (cycles x samples) float64 array"""
+    out = {}
+    mean = values.mean(axis=1)
+    centered = values - mean[:, None]
+    variance = np.einsum('ij,ij->i', centered, centered) / values.shape[1]
+    std = np.sqrt(variance)
+
+    if 'mean' in wanted:
+        out['mean'] = mean
+    if 'std' in wanted:
+        out['std'] = std
+    if 'min' in wanted or 'ptp' in wanted:
+        minimum = values.min(axis=1)
+        out['min'] = minimum
+    if 'max' in wanted or 'ptp' in wanted:
+        maximum = values.max(axis=1)
+        out['max'] = maximum
+    if 'ptp' in wanted:
+        out['ptp'] = maximum - minimum
+    if 'median' in wanted:
+        out['median'] = np.median(values, axis=1)
+    if 'rms' in wanted:
+        out['rms'] = np.sqrt(np.einsum('ij,ij->i', values, values) / values.shape[1])
+    if 'skew' in wanted or 'kurtosis' in wanted:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            standardized = centered / std[:, None]
+            if 'skew' in wanted:
+                out['skew'] = (standardized ** 3).mean(axis=1)
+            if 'kurtosis' in wanted:
+                out['kurtosis'] = (standardized ** 4).mean(axis=1) - 3.0
+    if 'slope' in wanted:
+        t = np.arange(values.shape[1]) / rate
+        t_centered = t - t.mean()
+        out['slope'] = centered @ t_centered / (t_centered @ t_centered)
+    return out
+
+
+def _rolling(values, window, inner, outer):
+    """
+    Sliding-window mean or std (from cumulative sums), reduced per cycle.
+
+    NaN when the window is longer than the traces (e.g. resampled to a low rate).
+    """
+    if window > values.shape[1]:
+        return np.full(values.shape[0], np.nan)
+    zeros = np.zeros((values.shape[0], 1))
+    sums = np.concatenate([zeros, np.cumsum(values, axis=1)], axis=1)
+    window_mean = (sums[:, window:] - sums[:, :-window]) / window
+    if inner == 'mean':
+        windows = window_mean
+    else:
+        squares = np.concatenate([zeros, np.cumsum(values * values, axis=1)], axis=1)
+        window_square = (squares[:, window:] - squares[:, :-window]) / window
+        windows = np.sqrt(np.maximum(window_square - window_mean ** 2, 0.0))
+    return getattr(windows, outer)(axis=1)
+
+
+def _spectral(values, features, rate):
+    """Requested spectral features from one real FFT of the mean-removed traces"""
+    out = {}
+    power = np.abs(np.fft.rfft(values - values.mean(axis=1, keepdims=True), axis=1)) ** 2 / values.shape[1]
+    freqs = np.fft.rfftfreq(values.shape[1], d=1.0 / rate)
+
+    if 'fft_peak_freq' in features or 'fft_peak_power' in features:
+        # Skip the DC bin, which is zero after mean removal
+        peak = power[:, 1:].argmax(axis=1) + 1
+        out['fft_peak_freq'] = freqs[peak]
+        out['fft_peak_power'] = power[np.arange(len(power)), peak]
+    if 'fft_centroid' in features:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['fft_centroid'] = power @ freqs / power.sum(axis=1)
+    for feature in features:
+        band = BAND_PATTERN.match(feature)
+        if band:
+            lo, hi = int(band.group(1)), int(band.group(2))
+            out[feature] = power[:, (freqs >= lo) & (freqs < hi)].sum(axis=1)
+    return out
+
+
+def extract_features(signals, rates, feature_names):
+    """
+    Compute `feature_names` for a batch of cycles.
+
+    `signals` maps sensor -> (cycles x samples) array and `rates` maps
+    sensor -> Hz. Returns a frame with exactly `feature_names` as columns, in
+    order. Raises ValueError for names that are not '<SENSOR>_<feature>'.
+    """
+    parsed = {name: parse_feature(name, signals) for name in feature_names}
+    unknown = [name for name, spec in parsed.items() if spec is None]
+    if unknown:
+        raise ValueError(f"Cannot extract features from raw signals: {unknown}")
+
+    by_sensor = {}
+    for name, (sensor, feature) in parsed.items():
+        by_sensor.setdefault(sensor, set()).add(feature)
+
+    columns = {}
+    for sensor, features in by_sensor.items():
+        values = np.asarray(signals[sensor], dtype=np.float64)
+        rate = rates[sensor]
+        computed = _statistics(values, features & set(STATISTICS), rate)
+        spectral = {f for f in features if f in SPECTRAL or BAND_PATTERN.match(f)}
+        if spectral:
+            computed.update(_spectral(values, spectral, rate))
+        for feature in features:
+            rolling = ROLLING_PATTERN.match(feature)
+            if rolling:
+                computed[feature] = _rolling(values, int(rolling.group(1)), rolling.group(2), rolling.group(3))
+        for feature in features:
+            columns[f'{sensor}_{feature}'] = computed[feature]
+
+    return pd.DataFrame({name: columns[name] for name in feature_names})
+
+
+def features_for_model(model, signals, rates):
+    """Exactly the columns in `model.feature_names_in_`, extracted from raw signals"""
+    return extract_features(signals, rates, list(model.feature_names_in_))
+
+
+def _extract_batch(index, cycles, signals, labels, rates, feature_names):
+    frame = extract_features(signals, rates, feature_names)
+    frame.index = pd.Index(cycles, name='cycle')
+    for column in labels.columns:
+        frame[column] = labels[column].to_numpy()
+    return index, frame
+
+
+def model_feature_names(paths=None):
+    """Union of feature_names_in_ over the models at `paths` (default: every TARGETS base model)"""
+    paths = paths or [model_store.model_path(t) for t in TARGETS if os.path.exists(model_store.model_path(t))]
+    names = []
+    for path in paths:
+        model = joblib.load(path)
+        names.extend(name for name in getattr(model, 'feature_names_in_', []) if name not in names)
+    return names
+
+
+def build_feature_frame(store=CYCLE_STORE, feature_names=None, workers=None,
+                        batch_cycles=DEFAULT_CHUNK_CYCLES, progress=None, after_cycle=None):
+    """
+    Extract features for every cycle in the store, in parallel batches.
+
+    Returns a frame indexed by cycle with the feature columns followed by the
+    label columns. At most two batches per worker are in flight. With
+    `after_cycle`, only later cycles are extracted.
+    """
+    rates = store_rates(store)
+    feature_names = feature_names or default_feature_names(rates)
+    unknown = [name for name in feature_names if parse_feature(name, rates) is None]
+    if unknown:
+        raise ValueError(f"Cannot extract features from raw signals: {unknown}")
+    workers = workers or os.cpu_count() or 1
+
+    batches = iter_cycle_batches(store, batch_cycles=batch_cycles)
+    finished = {}
+    pending = set()
+    index = 0
+    exhausted = False
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * 2:
+                batch = next(batches, None)
+                if batch is None:
+                    exhausted = True
+                    break
+                cycles, signals, labels = batch
+                if after_cycle is not None:
+                    keep = cycles > after_cycle
+                    if not keep.any():
+                        continue
+                    cycles, labels = cycles[keep], labels[keep].reset_index(drop=True)
+                    signals = {sensor: values[keep] for sensor, values in signals.items()}
+                pending.add(executor.submit(_extract_batch, index, cycles, signals, labels,
+                                            rates, feature_names))
+                index += 1
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch_index, frame = future.result()
+                finished[batch_index] = frame
+                if progress is not None:
+                    progress(len(frame))
+
+    if not finished:
+        raise ValueError(f"No cycles in {store}")
+    return pd.concat([finished[i] for i in range(len(finished))])
+
+
+@click.command()
+@click.option('--store', default=CYCLE_STORE, show_default=True, help='Per-cycle store written by ingestion.py.')
+@click.option('--output', default='full_df.csv', show_default=True, help='Feature table to write (.csv or .parquet).')
+@click.option('--append-to', default=None,
+              help='Partitioned dataset directory: append the cycles it lacks as one new partition '
+                   'instead of writing --output.')
+@click.option('--model', 'models', multiple=True,
+              help='Model whose feature_names_in_ to produce (repeatable; default: all base models).')
+@click.option('--workers', default=None, type=int, help='Worker processes (default: all cores).')
+@click.option('--batch-cycles', default=DEFAULT_CHUNK_CYCLES, show_default=True, help='Cycles per batch.')
+def main(store, output, append_to, models, workers, batch_cycles):
+    """Rebuild the feature table (full_df) from the per-cycle raw signal store."""
+    feature_names = model_feature_names(list(models)) or None
+
+    after_cycle = None
+    n_cycles = pq.ParquetFile(store).metadata.num_rows
+    if append_to:
+        manifest = data_store.read_manifest(append_to)
+        if manifest['partitions']:
+            after_cycle = manifest['partitions'][-1]['last_cycle']
+            # Append with the dataset's columns, whatever the models currently use
+            feature_names = [c for c in manifest['columns'] if c not in PROFILE_COLUMNS]
+            cycles = pq.read_table(store, columns=['cycle']).column('cycle').to_numpy()
+            n_cycles = int((cycles > after_cycle).sum())
+        if not n_cycles:
+            click.echo(f"No new cycles for {append_to}")
+            return
+
+    with click.progressbar(length=n_cycles, label='Extracting features') as bar:
+        frame = build_feature_frame(store, feature_names, workers=workers,
+                                    batch_cycles=batch_cycles, progress=bar.update, after_cycle=after_cycle)
+
+    if append_to:
+        try:
+            entry = data_store.append_partition(frame, append_to)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Appended cycles {entry['first_cycle']}-{entry['last_cycle']} "
+                   f"as {os.path.join(append_to, entry['file'])}")
+        return
+
+    tmp_path = f'{output}.tmp-{os.getpid()}'
+    if output.endswith('.parquet'):
+        frame.to_parquet(tmp_path)
+    else:
+        frame.reset_index(drop=True).to_csv(tmp_path)
+    os.replace(tmp_path, output)
+    click.echo(f"Wrote {frame.shape[0]} cycles x {frame.shape[1]} columns to {output}")
+
+
+if __name__ == '__main__':
+    main()
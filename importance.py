@@ -0,0 +1,103 @@
+"""
+Feature Importance for Hydraulic System Monitoring
+
+Reports what a trained model actually relies on:
+1. Native importances (feature_importances_ or coefficient magnitudes) when available
+2. Otherwise permutation importance, with features scored in parallel across cores
+   (slow on the full dataset, so the dashboard runs it as a background job)
+
+Results are cached under .cache/importance per model artifact hash (and per
+dataset fingerprint for permutation importance, which depends on the data).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import CACHE_DIR
+
+IMPORTANCE_DIR = os.path.join(CACHE_DIR, 'importance')
+
+# Shuffles per feature for permutation importance
+PERMUTATION_REPEATS = 5
+
+
+def native_importances(model, n_features):
+    """Importances the estimator exposes itself, or None if it has none for these features"""
+    estimator = model.steps[-1][1] if hasattr(model, 'steps') else model
+
+    if hasattr(estimator, 'feature_importances_'):
+        importances = np.asarray(estimator.feature_importances_, dtype=np.float64)
+    elif hasattr(estimator, 'coef_'):
+        importances = np.abs(np.atleast_2d(estimator.coef_)).mean(axis=0)
+    else:
+        return None
+
+    # A pipeline that selects or expands features no longer maps 1:1 to its inputs
+    if importances.shape != (n_features,):
+        return None
+    return importances
+
+
+def permutation_importances(model, X, y, random_state=0):
+    """Mean drop in score when each feature is shuffled, computed on all cores"""
+    from sklearn.inspection import permutation_importance
+
+    result = permutation_importance(model, X, y, n_repeats=PERMUTATION_REPEATS,
+                                    random_state=random_state, n_jobs=-1)
+    return result.importances_mean
+
+
+def _read_cached(path):
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+def _write_cached(path, frame):
+    os.makedirs(IMPORTANCE_DIR, exist_ok=True)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _frame(features, importances, method):
+    frame = pd.DataFrame({'Feature': features, 'Importance': importances, 'Method': method})
+    return frame.sort_values('Importance', ascending=False).reset_index(drop=True)
+
+
+def quick_importance(model, columns, model_hash, fingerprint):
+    """
+    Cached or native importances of `model`, or None when only an uncached
+    permutation importance would do. Reads no data, so it is cheap to call inline.
+    """
+    native_path = os.path.join(IMPORTANCE_DIR, f'{model_hash}.parquet')
+    permutation_path = os.path.join(IMPORTANCE_DIR, f'{model_hash}-{fingerprint}.parquet')
+    for path in (native_path, permutation_path):
+        cached = _read_cached(path)
+        if cached is not None:
+            return cached
+
+    features = list(getattr(model, 'feature_names_in_', columns))
+    importances = native_importances(model, len(features))
+    if importances is None:
+        return None
+    frame = _frame(features, importances, 'native')
+    _write_cached(native_path, frame)
+    return frame
+
+
+def feature_importance(model, X, y, model_hash, fingerprint):
+    """
+    Importance of every feature in `X` for `model`, sorted descending.
+
+    Returns a frame with Feature, Importance and Method ('native' or
+    'permutation'). Native importances depend only on the artifact; permutation
+    importances are also keyed on the dataset fingerprint.
+    """
+    frame = quick_importance(model, X.columns, model_hash, fingerprint)
+    if frame is not None:
+        return frame
+
+    frame = _frame(list(X.columns), permutation_importances(model, X, y), 'permutation')
+    _write_cached(os.path.join(IMPORTANCE_DIR, f'{model_hash}-{fingerprint}.parquet'), frame)
+    return frame
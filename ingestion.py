@@ -0,0 +1,217 @@
+"""
+Raw Signal Ingestion for Hydraulic System Monitoring
+
+Streams the raw per-sensor cycle files of the test rig into a compact
+columnar per-cycle store:
+1. Each sensor file (PS1.txt, FS1.txt, ...) holds one tab-separated 60 s cycle per line
+2. All files are read in lockstep, a chunk of cycles at a time (bounded memory)
+3. Sample counts are validated against each sensor's rate, and traces can be
+   resampled onto one common rate so all sensors share a time axis
+4. Every chunk becomes a Parquet row group: one row per cycle, one fixed-size
+   float32 list column per sensor, plus the condition labels from profile.txt
+
+Usage:
+    python ingestion.py --raw-dir data/raw --output data/cycles.parquet
+"""
+
+import json
+import os
+
+import click
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import TARGETS
+
+RAW_DIR = os.path.join('data', 'raw')
+CYCLE_STORE = os.path.join('data', 'cycles.parquet')
+
+CYCLE_SECONDS = 60
+
+# Sampling rate (Hz) per sensor file
+SENSOR_RATES = {
+    'PS1': 100, 'PS2': 100, 'PS3': 100, 'PS4': 100, 'PS5': 100, 'PS6': 100,
+    'EPS1': 100,
+    'FS1': 10, 'FS2': 10,
+    'TS1': 1, 'TS2': 1, 'TS3': 1, 'TS4': 1,
+    'VS1': 1,
+    'CE': 1, 'CP': 1,
+    'SE': 1,
+}
+
+# Columns of profile.txt: the four condition targets plus the stable-flag
+PROFILE_COLUMNS = TARGETS + ['Stable_Flag']
+
+# Cycles read from every file per chunk
+DEFAULT_CHUNK_CYCLES = 256
+
+
+def available_sensors(raw_dir=RAW_DIR):
+    """Sensors whose raw file exists in `raw_dir`, in SENSOR_RATES order"""
+    return [sensor for sensor in SENSOR_RATES if os.path.exists(os.path.join(raw_dir, f'{sensor}.txt'))]
+
+
+def resample(values, from_hz, to_hz):
+    """
+    Resample (cycles x samples) traces between integer-ratio rates.
+
+    Downsampling averages each block of samples; upsampling repeats samples.
+    """
+    if to_hz == from_hz:
+        return values
+    if from_hz % to_hz == 0:
+        factor = from_hz // to_hz
+        return values.reshape(values.shape[0], -1, factor).mean(axis=2, dtype=np.float32)
+    if to_hz % from_hz == 0:
+        return np.repeat(values, to_hz // from_hz, axis=1)
+    raise ValueError(f"Cannot resample {from_hz} Hz to {to_hz} Hz: rates must divide evenly")
+
+
+def _read_chunks(path, chunk_cycles, dtype):
+    """Iterate a tab-separated cycle file as 2-D arrays of `chunk_cycles` rows"""
+    reader = pd.read_csv(path, sep='\t', header=None, dtype=dtype, chunksize=chunk_cycles,
+                         engine='c')
+    for chunk in reader:
+        yield chunk.to_numpy()
+
+
+def _fixed_size_list(values):
+    """(cycles x samples) float32 array as an Arrow fixed-size list column, without copying"""
+    flat = pa.array(np.ascontiguousarray(values, dtype=np.float32).ravel())
+    return pa.FixedSizeListArray.from_arrays(flat, values.shape[1])
+
+
+def ingest(raw_dir=RAW_DIR, output=CYCLE_STORE, sensors=None, align_hz=None,
+           chunk_cycles=DEFAULT_CHUNK_CYCLES, progress=None):
+    """
+    Build the per-cycle store from raw sensor files.
+
+    `align_hz` resamples every sensor onto one rate (e.g. 10); None keeps
+    native rates. `progress` is called with the number of cycles written per
+    chunk. Returns the number of cycles ingested.
+    """
+    sensors = sensors or available_sensors(raw_dir)
+    if not sensors:
+        raise FileNotFoundError(f"No raw sensor files found in {raw_dir}")
+
+    readers = {sensor: _read_chunks(os.path.join(raw_dir, f'{sensor}.txt'), chunk_cycles, np.float32)
+               for sensor in sensors}
+    profile_path = os.path.join(raw_dir, 'profile.txt')
+    profile = _read_chunks(profile_path, chunk_cycles, np.int32) if os.path.exists(profile_path) else None
+
+    rates = {sensor: align_hz or SENSOR_RATES[sensor] for sensor in sensors}
+    metadata = {b'ingestion': json.dumps({
+        'cycle_seconds': CYCLE_SECONDS,
+        'native_rates': {sensor: SENSOR_RATES[sensor] for sensor in sensors},
+        'rates': rates,
+    }).encode()}
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp_path = f'{output}.tmp-{os.getpid()}'
+    writer = None
+    first_cycle = 0
+    try:
+        while True:
+            chunks = {sensor: next(reader, None) for sensor, reader in readers.items()}
+            if all(chunk is None for chunk in chunks.values()):
+                break
+            n_cycles = {sensor: (0 if chunk is None else len(chunk)) for sensor, chunk in chunks.items()}
+            if len(set(n_cycles.values())) != 1:
+                raise ValueError(f"Sensor files disagree on cycle count near cycle {first_cycle}: {n_cycles}")
+            n = next(iter(n_cycles.values()))
+
+            columns = {'cycle': pa.array(np.arange(first_cycle, first_cycle + n, dtype=np.int32))}
+            for sensor, values in chunks.items():
+                expected = SENSOR_RATES[sensor] * CYCLE_SECONDS
+                if values.shape[1] != expected:
+                    raise ValueError(f"{sensor}: expected {expected} samples per cycle, got {values.shape[1]}")
+                columns[sensor] = _fixed_size_list(resample(values, SENSOR_RATES[sensor], rates[sensor]))
+
+            if profile is not None:
+                labels = next(profile, None)
+                if labels is None or len(labels) != n:
+                    raise ValueError(f"profile.txt does not cover cycles {first_cycle}-{first_cycle + n - 1}")
+                for i, name in enumerate(PROFILE_COLUMNS[:labels.shape[1]]):
+                    columns[name] = pa.array(labels[:, i])
+
+            table = pa.table(columns)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema.with_metadata(metadata))
+            writer.write_table(table)
+            first_cycle += n
+            if progress is not None:
+                progress(n)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            writer = None
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f"Raw sensor files in {raw_dir} contain no cycles")
+    os.replace(tmp_path, output)
+    return first_cycle
+
+
+def store_rates(store=CYCLE_STORE):
+    """Sampling rate (Hz) of each sensor column in the store"""
+    return json.loads(pq.read_schema(store).metadata[b'ingestion'])['rates']
+
+
+def sensor_matrix(column):
+    """A fixed-size list column as a (cycles x samples) float32 array, zero-copy when possible"""
+    column = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    return column.flatten().to_numpy(zero_copy_only=False).reshape(len(column), column.type.list_size)
+
+
+def iter_cycle_batches(store=CYCLE_STORE, sensors=None, batch_cycles=DEFAULT_CHUNK_CYCLES):
+    """
+    Stream the store in batches of cycles.
+
+    Yields (cycles, {sensor: (cycles x samples) array}, labels frame) tuples;
+    labels hold whichever profile columns the store has.
+    """
+    parquet = pq.ParquetFile(store)
+    names = parquet.schema_arrow.names
+    sensors = sensors or [name for name in names if name in SENSOR_RATES]
+    label_columns = [name for name in PROFILE_COLUMNS if name in names]
+    for batch in parquet.iter_batches(batch_size=batch_cycles, columns=['cycle'] + sensors + label_columns):
+        signals = {sensor: sensor_matrix(batch.column(sensor)) for sensor in sensors}
+        labels = pa.Table.from_batches([batch]).select(label_columns).to_pandas()
+        yield batch.column('cycle').to_numpy(), signals, labels
+
+
+@click.command()
+@click.option('--raw-dir', default=RAW_DIR, show_default=True, help='Directory with PS1.txt, FS1.txt, ...')
+@click.option('--output', default=CYCLE_STORE, show_default=True, help='Per-cycle Parquet store to write.')
+@click.option('--align-hz', default=None, type=int,
+              help='Resample every sensor to this rate (1, 10 or 100); default keeps native rates.')
+@click.option('--chunk-cycles', default=DEFAULT_CHUNK_CYCLES, show_default=True,
+              help='Cycles read from every file at a time.')
+def main(raw_dir, output, align_hz, chunk_cycles):
+    """Ingest raw hydraulic sensor files into a per-cycle columnar store."""
+    sensors = available_sensors(raw_dir)
+    if not sensors:
+        raise click.ClickException(f"No raw sensor files found in {raw_dir}")
+    click.echo(f"Sensors: {', '.join(sensors)}")
+
+    # Cycle count from the smallest (1 Hz) file, for the progress bar
+    smallest = min(sensors, key=lambda sensor: SENSOR_RATES[sensor])
+    with open(os.path.join(raw_dir, f'{smallest}.txt')) as f:
+        total_cycles = sum(1 for _ in f)
+
+    with click.progressbar(label='Ingesting cycles', length=total_cycles, show_pos=True) as bar:
+        cycles = ingest(raw_dir, output, sensors=sensors, align_hz=align_hz,
+                        chunk_cycles=chunk_cycles, progress=bar.update)
+    click.echo(f"Wrote {cycles} cycles to {output}")
+
+
+if __name__ == '__main__':
+    main()
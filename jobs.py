@@ -0,0 +1,358 @@
+"""
+Background Job Queue for Hydraulic System Monitoring
+
+Runs expensive work outside the Streamlit script thread:
+1. Jobs are recorded in a SQLite table (.cache/jobs/jobs.sqlite) with their status
+2. A process pool executes them; reruns and other sessions never block on them
+3. Results are persisted to disk, and progress events are appended as jobs run
+4. Pages submit (or join an identical queued job), poll status, and can cancel
+"""
+
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+
+from config import CACHE_DIR
+
+JOBS_DIR = os.path.join(CACHE_DIR, 'jobs')
+DB_PATH = os.path.join(JOBS_DIR, 'jobs.sqlite')
+
+# Finished jobs kept in the table (oldest are pruned first)
+MAX_FINISHED_JOBS = 200
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+# Job kinds: name -> 'module:function'; functions take (context, **params)
+JOB_KINDS = {
+    'optimization': 'jobs:optimization_job',
+    'predictions': 'jobs:predictions_job',
+    'correlation_index': 'jobs:correlation_index_job',
+    'importance': 'jobs:importance_job',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    params_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    owner_pid INTEGER,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result_path TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_lookup ON jobs (kind, params_key, status);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq);
+"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested"""
+
+
+def _connect(db_path):
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA journal_mode=WAL')
+    return connection
+
+
+def _params_key(kind, params):
+    return hashlib.sha256(json.dumps([kind, params], sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _placeholders(values):
+    return ','.join('?' * len(values))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _orphaned(row):
+    """Whether an active job row belongs to a server process that has exited"""
+    return (row['status'] in ACTIVE_STATUSES and row['owner_pid'] != os.getpid()
+            and not _pid_alive(row['owner_pid']))
+
+
+def _interrupt(connection, job_id):
+    connection.execute('UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?',
+                       ('failed', time.time(), 'Interrupted: the server running this job exited', job_id))
+
+
+class JobContext:
+    """Handle a running job uses to report progress and honour cancellation"""
+
+    def __init__(self, db_path, job_id):
+        self.db_path = db_path
+        self.job_id = job_id
+
+    def progress(self, fraction, message=None):
+        """Record progress in [0, 1], raising JobCancelled if cancellation was requested"""
+        with _connect(self.db_path) as connection:
+            connection.execute('UPDATE jobs SET progress = ?, message = ? WHERE id = ?',
+                               (float(fraction), message, self.job_id))
+        self.check_cancelled()
+
+    def report(self, payload):
+        """Append a JSON event (e.g. one finished trial) for pages to stream"""
+        with _connect(self.db_path) as connection:
+            connection.execute('INSERT INTO job_events (job_id, created_at, payload) VALUES (?, ?, ?)',
+                               (self.job_id, time.time(), json.dumps(payload, default=str)))
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        with _connect(self.db_path) as connection:
+            row = connection.execute('SELECT cancel_requested FROM jobs WHERE id = ?',
+                                     (self.job_id,)).fetchone()
+        if row is not None and row['cancel_requested']:
+            raise JobCancelled(self.job_id)
+
+
+def _finish(db_path, job_id, status, result_path=None, error=None):
+    with _connect(db_path) as connection:
+        connection.execute(
+            'UPDATE jobs SET status = ?, finished_at = ?, result_path = ?, error = ? WHERE id = ?',
+            (status, time.time(), result_path, error, job_id))
+
+
+def run_job(db_path, job_id):
+    """Execute one job in a worker process and persist its outcome"""
+    with _connect(db_path) as connection:
+        row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None or row['status'] != 'queued':
+            return
+        if row['cancel_requested']:
+            _finish(db_path, job_id, 'cancelled')
+            return
+        connection.execute('UPDATE jobs SET status = ?, started_at = ? WHERE id = ?',
+                           ('running', time.time(), job_id))
+
+    module_name, function_name = JOB_KINDS[row['kind']].split(':')
+    function = getattr(importlib.import_module(module_name), function_name)
+    context = JobContext(db_path, job_id)
+    try:
+        result = function(context, **json.loads(row['params']))
+        result_path = os.path.join(os.path.dirname(db_path), f'{job_id}.pkl')
+        tmp_path = f'{result_path}.tmp-{os.getpid()}'
+        joblib.dump(result, tmp_path)
+        os.replace(tmp_path, result_path)
+        with _connect(db_path) as connection:
+            connection.execute('UPDATE jobs SET progress = 1 WHERE id = ?', (job_id,))
+        _finish(db_path, job_id, 'succeeded', result_path=result_path)
+    except JobCancelled:
+        _finish(db_path, job_id, 'cancelled')
+    except Exception as e:
+        _finish(db_path, job_id, 'failed', error=f"{e}\n\n{traceback.format_exc()}")
+
+
+class JobQueue:
+    """Local job queue: a SQLite job table plus a process pool that runs the jobs"""
+
+    def __init__(self, db_path=DB_PATH, max_workers=None):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with _connect(db_path) as connection:
+            connection.executescript(SCHEMA)
+        self._recover_orphans()
+        self._prune()
+        # Leave a core for the Streamlit server itself
+        self._max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        # Spawned workers: forking the multithreaded Streamlit server is not safe
+        self._executor = ProcessPoolExecutor(max_workers=self._max_workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        self._futures = {}
+
+    def _recover_orphans(self):
+        """Fail active jobs whose owning server process has exited"""
+        with _connect(self.db_path) as connection:
+            rows = connection.execute(
+                'SELECT id, status, owner_pid FROM jobs '
+                f'WHERE status IN ({_placeholders(ACTIVE_STATUSES)})', ACTIVE_STATUSES).fetchall()
+            for row in rows:
+                if _orphaned(row):
+                    _interrupt(connection, row['id'])
+
+    def _prune(self):
+        """Drop the oldest finished jobs (and their results) beyond MAX_FINISHED_JOBS"""
+        with _connect(self.db_path) as connection:
+            rows = connection.execute(
+                f'SELECT id, result_path FROM jobs WHERE status IN ({_placeholders(FINISHED_STATUSES)}) '
+                'ORDER BY finished_at DESC LIMIT -1 OFFSET ?',
+                FINISHED_STATUSES + (MAX_FINISHED_JOBS,)).fetchall()
+            for row in rows:
+                if row['result_path'] and os.path.exists(row['result_path']):
+                    os.remove(row['result_path'])
+                connection.execute('DELETE FROM job_events WHERE job_id = ?', (row['id'],))
+                connection.execute('DELETE FROM jobs WHERE id = ?', (row['id'],))
+
+    def _insert(self, connection, kind, params):
+        job_id = uuid.uuid4().hex[:12]
+        connection.execute(
+            'INSERT INTO jobs (id, kind, params, params_key, status, owner_pid, submitted_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (job_id, kind, json.dumps(params, sort_keys=True), _params_key(kind, params),
+             'queued', os.getpid(), time.time()))
+        return job_id
+
+    def submit(self, kind, **params):
+        """Queue a new job and return its id"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with _connect(self.db_path) as connection:
+            job_id = self._insert(connection, kind, params)
+        self._futures[job_id] = self._executor.submit(run_job, self.db_path, job_id)
+        return job_id
+
+    def find_or_submit(self, kind, **params):
+        """
+        Id of the latest job with identical parameters, submitting one if none exists.
+
+        Sessions asking for the same work therefore share a single job. Failed
+        jobs are returned too, so a failure is reported instead of retried on
+        every rerun; use submit() to retry explicitly. An active job whose
+        server process has exited is marked interrupted and replaced.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with _connect(self.db_path) as connection:
+            # Take the write lock before looking, so two sessions cannot both miss and insert
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                "SELECT id, status, owner_pid FROM jobs WHERE kind = ? AND params_key = ? "
+                "AND status != 'cancelled' ORDER BY submitted_at DESC LIMIT 1",
+                (kind, _params_key(kind, params))).fetchone()
+            if row is not None and not _orphaned(row):
+                return row['id']
+            if row is not None:
+                _interrupt(connection, row['id'])
+            job_id = self._insert(connection, kind, params)
+        self._futures[job_id] = self._executor.submit(run_job, self.db_path, job_id)
+        return job_id
+
+    def status(self, job_id):
+        """Job row as a dict, or None for an unknown id"""
+        with _connect(self.db_path) as connection:
+            row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def events(self, job_id, after=0):
+        """Progress events reported by a job, oldest first, as (seq, payload) pairs"""
+        with _connect(self.db_path) as connection:
+            rows = connection.execute(
+                'SELECT seq, payload FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq',
+                (job_id, after)).fetchall()
+        return [(row['seq'], json.loads(row['payload'])) for row in rows]
+
+    def list_jobs(self, limit=20):
+        """Most recently submitted jobs"""
+        with _connect(self.db_path) as connection:
+            rows = connection.execute('SELECT * FROM jobs ORDER BY submitted_at DESC LIMIT ?',
+                                      (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs stop immediately, running ones at their next checkpoint"""
+        with _connect(self.db_path) as connection:
+            connection.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            _finish(self.db_path, job_id, 'cancelled')
+
+    def result(self, job_id):
+        """Persisted result of a succeeded job"""
+        job = self.status(job_id)
+        if job is None or job['status'] != 'succeeded':
+            raise ValueError(f"Job {job_id} has no result (status: {job and job['status']})")
+        return joblib.load(job['result_path'])
+
+
+def optimization_job(context, target, strategy, cv_folds):
+    """Tune models for a target, reporting each trial as it finishes"""
+    import optimization
+
+    X, y = optimization.load_training_data(target)
+    trials = []
+    n_expected = len(optimization.build_trials(strategy, X.shape[1])) + (strategy in ('all', 'ensemble'))
+    runner = optimization.run_optimization(X, y, target, strategy=strategy, cv_folds=cv_folds)
+    try:
+        for trial in runner:
+            if 'winner' in trial:
+                winner = {k: v for k, v in trial['winner'].items() if k != 'estimator'}
+                return {'winner': winner, 'path': trial['path'], 'trials': trials}
+            row = {k: v for k, v in trial.items() if k != 'estimator'}
+            trials.append(row)
+            context.report(row)
+            context.progress(len(trials) / (n_expected + 1), f"{len(trials)}/{n_expected} trials finished")
+    finally:
+        runner.close()
+
+
+def predictions_job(context, target, model_hash, fingerprint, columns):
+    """Score the dataset with a target's model, filling the prediction cache"""
+    import data_store
+    import model_store
+    import prediction_cache
+
+    model = joblib.load(model_store.model_path(target))
+    if model_store.artifact_hash(model_store.model_path(target)) != model_hash:
+        raise ValueError(f"The model for {target} changed on disk while the job was queued")
+    context.progress(0.1, "Loading data")
+    df = data_store.load_columns(columns + [target])
+    context.progress(0.3, "Scoring")
+    return prediction_cache.cached_predictions(model, df[columns], df[target],
+                                               model_hash, fingerprint, target=target)
+
+
+def importance_job(context, target, model_hash, fingerprint, columns):
+    """Permutation importance of a target's model on the dataset, filling the importance cache"""
+    import data_store
+    import importance
+    import model_store
+
+    model = joblib.load(model_store.model_path(target))
+    if model_store.artifact_hash(model_store.model_path(target)) != model_hash:
+        raise ValueError(f"The model for {target} changed on disk while the job was queued")
+    context.progress(0.1, "Loading data")
+    df = data_store.load_columns(columns + [target])
+    context.progress(0.3, "Shuffling features")
+    return importance.feature_importance(model, df[columns], df[target], model_hash, fingerprint)
+
+
+def correlation_index_job(context, fingerprint, columns):
+    """Build the clustered correlation index of the given columns; returns its directory"""
+    import correlation
+    import correlation_index
+
+    context.progress(0.1, "Computing correlations")
+    state = correlation.dataset_state(columns, fingerprint)
+    context.progress(0.6, "Clustering and indexing")
+    return correlation_index.cached_index(state, fingerprint)
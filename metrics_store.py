@@ -0,0 +1,259 @@
+"""
+Metrics Store for Hydraulic System Monitoring
+
+Records measured model metrics so the dashboard charts reflect real runs:
+1. Evaluation, optimization and scoring paths append metric values
+   (accuracy, F1, CV scores, train/predict timings) to a SQLite table
+   (.cache/metrics/metrics.sqlite), grouped into runs
+2. The latest value per (target, model, variant, kind, metric) is kept in its own
+   keyed table, so the dashboard's queries read one row per model however
+   long the indexed history grows
+3. `python metrics_store.py evaluate` refits and cross-validates every
+   trained model's configuration on the dataset and records its metrics
+
+Metric names: accuracy, f1_macro, cv_mean, cv_std, train_seconds,
+predict_seconds, rows.
+
+Usage:
+    python metrics_store.py evaluate --cv 5
+    python metrics_store.py show
+"""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+import click
+import pandas as pd
+
+from config import CACHE_DIR, TARGETS
+
+METRICS_DIR = os.path.join(CACHE_DIR, 'metrics')
+DB_PATH = os.path.join(METRICS_DIR, 'metrics.sqlite')
+
+# Run kinds written by the different paths
+KINDS = ['evaluation', 'optimization', 'scoring', 'benchmark']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    params TEXT
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id TEXT NOT NULL,
+    target TEXT NOT NULL,
+    model TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS metrics_lookup ON metrics (target, metric, model, recorded_at);
+CREATE INDEX IF NOT EXISTS metrics_run ON metrics (run_id);
+CREATE INDEX IF NOT EXISTS metrics_kind ON metrics (kind, target, recorded_at);
+CREATE TABLE IF NOT EXISTS latest_metrics (
+    target TEXT NOT NULL,
+    model TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    value REAL NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (target, model, variant, kind, metric)
+);
+"""
+
+
+def _connect(db_path):
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute('PRAGMA journal_mode=WAL')
+    return connection
+
+
+class MetricsStore:
+    """Append-only metric history, queried for the latest value per (target, model, variant, kind, metric)"""
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with _connect(db_path) as connection:
+            connection.executescript(SCHEMA)
+
+    def start_run(self, kind, target, params=None):
+        """New run id; metrics recorded under it are grouped together"""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown metrics run kind: {kind}")
+        run_id = uuid.uuid4().hex
+        with _connect(self.db_path) as connection:
+            connection.execute('INSERT INTO runs VALUES (?, ?, ?, ?, ?)',
+                               (run_id, kind, target, time.time(), json.dumps(params or {}, default=str)))
+        return run_id
+
+    def record(self, run_id, target, model, metrics, variant='base'):
+        """Append `metrics` ({name: value}) for one model; None values are skipped"""
+        now = time.time()
+        with _connect(self.db_path) as connection:
+            kind = connection.execute('SELECT kind FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+            if kind is None:
+                raise KeyError(f"Unknown metrics run: {run_id}")
+            values = [(name, float(value)) for name, value in metrics.items() if value is not None]
+            connection.executemany(
+                'INSERT INTO metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(run_id, target, model, variant, kind[0], name, value, now) for name, value in values])
+            connection.executemany(
+                'INSERT OR REPLACE INTO latest_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(target, model, variant, name, kind[0], run_id, value, now) for name, value in values])
+
+    def latest(self, target=None, kind=None, variant=None):
+        """
+        Latest value of every metric per (target, model, variant, kind), one row each.
+
+        `kind` is one run kind or a list of them. Columns: Target, Model,
+        Variant, Kind, Recorded_At and one column per metric.
+        """
+        filters, params = [], []
+        for column, value in (('target', target), ('kind', kind), ('variant', variant)):
+            if isinstance(value, (list, tuple)):
+                filters.append(f"{column} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif value is not None:
+                filters.append(f'{column} = ?')
+                params.append(value)
+        where = f"WHERE {' AND '.join(filters)}" if filters else ''
+        query = f"SELECT target, model, variant, kind, metric, value, recorded_at FROM latest_metrics {where}"
+        with _connect(self.db_path) as connection:
+            long = pd.read_sql_query(query, connection, params=params)
+        if long.empty:
+            return pd.DataFrame(columns=['Target', 'Model', 'Variant', 'Kind', 'Recorded_At'])
+        keys = ['target', 'model', 'variant', 'kind']
+        wide = long.pivot_table(index=keys, columns='metric', values='value', aggfunc='last')
+        wide = long.groupby(keys)[['recorded_at']].max().join(wide).reset_index()
+        wide['recorded_at'] = pd.to_datetime(wide['recorded_at'], unit='s')
+        wide.columns.name = None
+        return wide.rename(columns={'target': 'Target', 'model': 'Model', 'variant': 'Variant',
+                                    'kind': 'Kind', 'recorded_at': 'Recorded_At'})
+
+    def history(self, target, metric, model=None):
+        """Every recorded value of `metric` for `target` (optionally one model), oldest first"""
+        query = 'SELECT model, variant, kind, value, recorded_at FROM metrics WHERE target = ? AND metric = ?'
+        params = [target, metric]
+        if model is not None:
+            query += ' AND model = ?'
+            params.append(model)
+        with _connect(self.db_path) as connection:
+            frame = pd.read_sql_query(query + ' ORDER BY recorded_at', connection, params=params)
+        frame['recorded_at'] = pd.to_datetime(frame['recorded_at'], unit='s')
+        return frame
+
+    def records(self, kind, target=None):
+        """Every metric recorded by runs of `kind` (optionally for one target), oldest first"""
+        query = ('SELECT run_id, target, model, variant, metric, value, recorded_at FROM metrics '
+                 'WHERE kind = ?')
+        params = [kind]
+        if target is not None:
+            query += ' AND target = ?'
+            params.append(target)
+        with _connect(self.db_path) as connection:
+            frame = pd.read_sql_query(query + ' ORDER BY recorded_at', connection, params=params)
+        frame['recorded_at'] = pd.to_datetime(frame['recorded_at'], unit='s')
+        return frame
+
+
+def model_name(model):
+    """Display name of a model: the class of its final estimator"""
+    final = model.steps[-1][1] if hasattr(model, 'steps') else model
+    return type(final).__name__.replace('Classifier', '')
+
+
+def evaluate_model(model, X, y, cv_folds=5, random_state=42):
+    """
+    Measured metrics of `model`'s configuration on (X, y), the way optimization scores trials.
+
+    A clone is fit on a stratified 80% split (train_seconds) and scored on the
+    held-out 20% (accuracy, f1_macro, predict_seconds); cv_mean and cv_std
+    are macro-F1 cross-validation scores on the training split.
+    """
+    from sklearn.base import clone
+    from sklearn.metrics import accuracy_score, f1_score
+    from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y,
+                                                        random_state=random_state)
+    cv = StratifiedKFold(cv_folds, shuffle=True, random_state=random_state)
+    cv_scores = cross_val_score(clone(model), X_train, y_train, cv=cv, scoring='f1_macro')
+
+    start = time.perf_counter()
+    fitted = clone(model).fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    y_pred = fitted.predict(X_test)
+    predict_seconds = time.perf_counter() - start
+    return {
+        'accuracy': accuracy_score(y_test, y_pred),
+        'f1_macro': f1_score(y_test, y_pred, average='macro'),
+        'cv_mean': cv_scores.mean(),
+        'cv_std': cv_scores.std(),
+        'train_seconds': train_seconds,
+        'predict_seconds': predict_seconds,
+        'rows': len(X_test),
+    }
+
+
+@click.group()
+def main():
+    """Measure and inspect model metrics."""
+
+
+@main.command('evaluate')
+@click.option('--cv', 'cv_folds', default=5, show_default=True, help='Cross-validation folds.')
+@click.option('--optimized', is_flag=True, help='Also evaluate the optimized models.')
+def evaluate_command(cv_folds, optimized):
+    """Refit and cross-validate every trained model on the dataset and record its metrics."""
+    import joblib
+    import numpy as np
+
+    import data_store
+    import model_store
+
+    store = MetricsStore()
+    columns = data_store.store_columns()
+    variants = [('base', model_store.model_path)]
+    if optimized:
+        variants.append(('optimized', model_store.optimized_model_path))
+
+    for target in TARGETS:
+        for variant, path_for in variants:
+            path = path_for(target)
+            if not os.path.exists(path):
+                continue
+            model = joblib.load(path)
+            # Without recorded features, every non-target column (no other target leaks in)
+            features = getattr(model, 'feature_names_in_', [c for c in columns if c not in TARGETS])
+            features = [f for f in features if f in columns and f != target]
+            df = data_store.load_columns(features + [target])
+            X = df[features].select_dtypes(include=[np.number])
+            metrics = evaluate_model(model, X, df[target], cv_folds)
+            run_id = store.start_run('evaluation', target, {'artifact_hash': model_store.artifact_hash(path),
+                                                            'cv_folds': cv_folds})
+            store.record(run_id, target, model_name(model), metrics, variant)
+            click.echo(f"{target:<18} {variant:<9} accuracy {metrics['accuracy']:.4f}  "
+                       f"f1 {metrics['f1_macro']:.4f}  fit {metrics['train_seconds']:.2f}s")
+
+
+@main.command('show')
+@click.option('--target', default=None, type=click.Choice(TARGETS))
+def show_command(target):
+    """Latest metrics per model."""
+    table = MetricsStore().latest(target)
+    click.echo(table.to_string(index=False) if len(table) else "No metrics recorded yet")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Model Artifacts for Hydraulic System Monitoring
+
+Locates trained model artifacts on disk and fingerprints them by content, so
+results derived from a model can be cached per artifact version. Artifacts
+are loaded from their compiled form (see compiled_model.py) when one exists
+and was built from the current pickle. ModelCache keeps loaded models in
+memory within a budget, reloading them when their artifact changes.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from data_store import file_hash
+
+MODEL_DIR = 'models'
+OPTIMIZED_MODEL_DIR = 'optimized_models'
+
+# (path, size, mtime) -> content hash, so unchanged artifacts are hashed once per process
+_hash_cache = {}
+
+
+def model_path(target):
+    """Path of the trained model for a specific target"""
+    return os.path.join(MODEL_DIR, f'best_model_{target.lower()}.pkl')
+
+
+def optimized_model_path(target):
+    """Path of the optimized model for a specific target"""
+    return os.path.join(OPTIMIZED_MODEL_DIR, f'optimized_model_{target.lower()}.pkl')
+
+
+def artifact_hash(path):
+    """Content hash of a model artifact, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _hash_cache:
+        _hash_cache[key] = file_hash(path)[:16]
+    return _hash_cache[key]
+
+
+def compiled_path(path):
+    """Directory holding the compiled form of the model artifact at `path`"""
+    return f'{os.path.splitext(path)[0]}.compiled'
+
+
+def load_artifact(path):
+    """
+    Load the model at `path`, preferring its compiled form.
+
+    The compiled form is only used while it matches the pickle's content
+    hash, so retraining or re-optimizing a model never serves stale trees.
+    """
+    if _compiled_is_current(path):
+        import compiled_model
+        return compiled_model.load(compiled_path(path))
+    import joblib
+    return joblib.load(path)
+
+
+def _compiled_is_current(path):
+    import compiled_model
+
+    built_from = compiled_model.source_hash(compiled_path(path))
+    return built_from is not None and built_from == artifact_hash(path)
+
+
+def artifact_size(path):
+    """On-disk size of the form load_artifact reads, the cache's estimate of its memory"""
+    if _compiled_is_current(path):
+        compiled = compiled_path(path)
+        return sum(os.path.getsize(os.path.join(compiled, name)) for name in os.listdir(compiled))
+    return os.path.getsize(path)
+
+
+class ModelCache:
+    """
+    Loaded models keyed on (path, content hash), with LRU eviction under a memory budget.
+
+    Any variant (base, optimized, registry, ...) can share one cache. When an
+    artifact is replaced on disk its hash changes: the next get() loads the
+    new version and drops the old one. Sizes are estimated from the artifact
+    on disk. The newest entry is always kept, even if it alone exceeds the budget.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, path, variant='base', loader=load_artifact):
+        """The model at `path`, loading it on a miss; None if the artifact does not exist"""
+        path = os.path.abspath(path)
+        content_hash = artifact_hash(path)
+        with self._lock:
+            if content_hash is None:
+                self._drop_path(path)
+                return None
+            key = (path, content_hash)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]['model']
+
+        # Load outside the lock so other artifacts stay available meanwhile
+        start = time.perf_counter()
+        model = loader(path)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.misses += 1
+            self.load_seconds += elapsed
+            if self._drop_path(path):
+                self.reloads += 1
+            self._entries[key] = {'model': model, 'variant': variant, 'bytes': artifact_size(path),
+                                  'load_seconds': elapsed, 'loaded_at': time.time()}
+            while len(self._entries) > 1 and self.total_bytes() > self.max_bytes:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return model
+
+    def _drop_path(self, path):
+        """Remove every cached version of `path`; whether any was cached"""
+        stale = [key for key in self._entries if key[0] == path]
+        for key in stale:
+            del self._entries[key]
+        return bool(stale)
+
+    def total_bytes(self):
+        return sum(entry['bytes'] for entry in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters and current contents, for display"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'reloads': self.reloads,
+                'evictions': self.evictions,
+                'load_seconds': self.load_seconds,
+                'bytes': self.total_bytes(),
+                'max_bytes': self.max_bytes,
+                'entries': [{'path': os.path.relpath(path), 'hash': content_hash, 'variant': entry['variant'],
+                             'bytes': entry['bytes'], 'load_seconds': entry['load_seconds']}
+                            for (path, content_hash), entry in self._entries.items()],
+            }
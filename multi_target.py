@@ -0,0 +1,131 @@
+"""
+Multi-Target Inference for Hydraulic System Monitoring
+
+Evaluates cycles against every condition target in one pass:
+1. The union of the models' feature_names_in_ is validated and converted to
+   one matrix, once per call (float32 when every model is a tree ensemble)
+2. Each model receives a column view of that matrix (no copy when its
+   features are a contiguous, in-order run of the union)
+3. The models run in parallel threads; tree ensembles release the GIL while predicting
+4. Predictions and confidences come back as one table, one row per cycle
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import model_store
+from compiled_model import CompiledModel
+from config import TARGETS
+
+
+def _tree_based(model):
+    """
+    Whether the model computes on float32 internally end to end.
+
+    sklearn trees and tree ensembles do. A pipeline qualifies only when every
+    step is one or 'passthrough'; a scaler, say, would compute differently on
+    float32 input than the float64 it was fitted on.
+    """
+    if model is None or isinstance(model, str):
+        return model in (None, 'passthrough')
+    if isinstance(model, CompiledModel) or hasattr(model, 'tree_'):
+        return True
+    if hasattr(model, 'steps'):
+        return all(_tree_based(step) for _, step in model.steps)
+    if hasattr(model, 'estimators_'):
+        # Forests and boosting hold trees (a 2-D array for boosting); voting and stacking hold any estimator
+        members = model.estimators_
+        members = members.ravel() if isinstance(members, np.ndarray) else members
+        final = getattr(model, 'final_estimator_', None)
+        return all(_tree_based(member) for member in members) and (final is None or _tree_based(final))
+    return False
+
+
+def load_models(targets=TARGETS, optimized=False, stage=None, tracking_uri=None):
+    """
+    {target: model} for every target with a saved artifact.
+
+    With `stage`, the MLflow registry versions serving that stage (or alias)
+    are loaded instead of the files in models/ or optimized_models/.
+    """
+    if stage is not None:
+        import registry
+        paths = registry.model_paths(stage, tracking_uri or registry.DEFAULT_TRACKING_URI, targets)
+        return {target: model_store.load_artifact(path) for target, path in paths.items()}
+    path_for = model_store.optimized_model_path if optimized else model_store.model_path
+    return {target: model_store.load_artifact(path_for(target))
+            for target in targets if os.path.exists(path_for(target))}
+
+
+class MultiTargetPredictor:
+    """
+    Predicts every target from one shared feature matrix.
+
+    `models` maps target -> fitted classifier recording feature_names_in_.
+    """
+
+    def __init__(self, models, threads=None):
+        if not models:
+            raise ValueError("MultiTargetPredictor needs at least one model")
+        self.models = dict(models)
+        self.feature_names = []
+        self.columns = {}
+        for target, model in self.models.items():
+            if not hasattr(model, 'feature_names_in_'):
+                raise ValueError(f"Model for {target} does not record feature_names_in_")
+            self.feature_names.extend(f for f in model.feature_names_in_ if f not in self.feature_names)
+        positions = {name: i for i, name in enumerate(self.feature_names)}
+        for target, model in self.models.items():
+            index = np.array([positions[f] for f in model.feature_names_in_])
+            # A contiguous, in-order run of the union can be sliced without copying
+            if len(index) and np.array_equal(index, np.arange(index[0], index[0] + len(index))):
+                index = slice(index[0], index[0] + len(index))
+            self.columns[target] = index
+        # Trees predict in float32 anyway; anything else keeps full precision
+        self.dtype = np.float32 if all(_tree_based(m) for m in self.models.values()) else np.float64
+        self.executor = ThreadPoolExecutor(max_workers=threads or min(len(self.models), os.cpu_count() or 1))
+
+    @classmethod
+    def from_artifacts(cls, targets=TARGETS, optimized=False, threads=None):
+        models = load_models(targets, optimized)
+        if not models:
+            raise FileNotFoundError(f"No trained models found for {list(targets)}")
+        return cls(models, threads)
+
+    def feature_matrix(self, X):
+        """Validate `X` once and return the union features as one C-contiguous array"""
+        missing = [f for f in self.feature_names if f not in X.columns]
+        if missing:
+            raise ValueError(f"Missing features: {missing[:10]}{' ...' if len(missing) > 10 else ''}")
+        return np.ascontiguousarray(X[self.feature_names].to_numpy(dtype=self.dtype))
+
+    def _predict_one(self, target, matrix):
+        model = self.models[target]
+        X = pd.DataFrame(matrix[:, self.columns[target]], columns=model.feature_names_in_, copy=False)
+        if hasattr(model, 'predict_proba'):
+            proba = model.predict_proba(X)
+            return model.classes_[proba.argmax(axis=1)], proba.max(axis=1)
+        return model.predict(X), None
+
+    def predict(self, X):
+        """
+        Predict every target for the rows of `X`.
+
+        Returns a frame indexed like `X` with one prediction column per target
+        and a '<target>_confidence' column for models with predict_proba.
+        """
+        matrix = self.feature_matrix(X)
+        futures = {target: self.executor.submit(self._predict_one, target, matrix) for target in self.models}
+        result = pd.DataFrame(index=X.index)
+        for target, future in futures.items():
+            predictions, confidences = future.result()
+            result[target] = predictions
+            if confidences is not None:
+                result[f'{target}_confidence'] = confidences
+        return result
+
+    def close(self):
+        self.executor.shutdown(wait=False)
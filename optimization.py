@@ -0,0 +1,250 @@
+"""
+Optimization Runner for Hydraulic System Monitoring
+
+Tunes models for one target with successive halving:
+1. Each (strategy, model family) search is an independent trial run in a process pool
+2. HalvingRandomSearchCV drops weak candidates early, on growing sample budgets
+3. Trial results are yielded as soon as they complete
+4. The winner is refit on all rows and saved to optimized_models/optimized_model_<target>.pkl
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import (ExtraTreesClassifier, GradientBoostingClassifier,
+                              RandomForestClassifier, VotingClassifier)
+import sklearn.experimental.enable_halving_search_cv  # enables HalvingRandomSearchCV
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.feature_selection import SelectKBest, VarianceThreshold, f_classif, mutual_info_classif
+from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+import data_store
+import metrics_store
+import model_store
+from config import TARGETS
+
+STRATEGIES = ['hyperparams', 'features', 'ensemble', 'preprocessing']
+
+# Candidates sampled per search; successive halving keeps a third each round
+N_CANDIDATES = 27
+HALVING_FACTOR = 3
+
+SCORING = 'f1_macro'
+
+MODEL_FAMILIES = {
+    'RandomForest': (RandomForestClassifier, {
+        'n_estimators': [100, 200, 400],
+        'max_depth': [None, 10, 20, 30],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4],
+        'max_features': ['sqrt', 'log2'],
+    }),
+    'GradientBoosting': (GradientBoostingClassifier, {
+        'n_estimators': [100, 200],
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_depth': [2, 3, 5],
+        'subsample': [0.8, 1.0],
+    }),
+    'ExtraTrees': (ExtraTreesClassifier, {
+        'n_estimators': [100, 200, 400],
+        'max_depth': [None, 10, 20, 30],
+        'min_samples_split': [2, 5, 10],
+        'max_features': ['sqrt', 'log2'],
+    }),
+}
+
+
+def _selection_sizes(n_features):
+    """Candidate k values for SelectKBest, limited to the available features"""
+    return sorted({k for k in (10, 20, 50, 100, 200) if k < n_features} | {n_features})
+
+
+def build_trials(strategy, n_features, random_state=42):
+    """(name, strategy, estimator, param distributions) for every search a strategy runs"""
+    trials = []
+    if strategy in ('all', 'hyperparams', 'ensemble'):
+        for name, (estimator_class, params) in MODEL_FAMILIES.items():
+            trials.append((name, 'hyperparams', estimator_class(random_state=random_state), params))
+
+    if strategy in ('all', 'features'):
+        pipeline = Pipeline([('select', SelectKBest(f_classif)),
+                             ('model', RandomForestClassifier(random_state=random_state))])
+        params = {'select__k': _selection_sizes(n_features),
+                  'select__score_func': [f_classif, mutual_info_classif],
+                  'model__n_estimators': [100, 200]}
+        trials.append(('SelectKBest+RandomForest', 'features', pipeline, params))
+
+    if strategy in ('all', 'preprocessing'):
+        pipeline = Pipeline([('variance', VarianceThreshold()),
+                             ('scale', StandardScaler()),
+                             ('model', ExtraTreesClassifier(random_state=random_state))])
+        params = {'variance__threshold': [0.0, 1e-4, 1e-2],
+                  'scale': [StandardScaler(), 'passthrough'],
+                  'model__n_estimators': [100, 200]}
+        trials.append(('Scaled+ExtraTrees', 'preprocessing', pipeline, params))
+    return trials
+
+
+def _test_scores(estimator, X_test, y_test):
+    """Held-out accuracy, macro F1 and prediction time of a fitted estimator"""
+    start = time.perf_counter()
+    y_pred = estimator.predict(X_test)
+    return {
+        'Test_Accuracy': accuracy_score(y_test, y_pred),
+        'Test_F1': f1_score(y_test, y_pred, average='macro'),
+        'Predict_Time': time.perf_counter() - start,
+    }
+
+
+def _run_trial(name, strategy, estimator, params, X_train, y_train, X_test, y_test,
+               cv_folds, random_state):
+    """Successive-halving search for one trial, scored on the held-out split"""
+    start = time.perf_counter()
+    search = sklearn.model_selection.HalvingRandomSearchCV(
+        estimator, params, n_candidates=N_CANDIDATES, factor=HALVING_FACTOR,
+        resource='n_samples', cv=StratifiedKFold(cv_folds, shuffle=True, random_state=random_state),
+        scoring=SCORING, random_state=random_state, n_jobs=1)
+    search.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    return {
+        'Model': name,
+        'Strategy': strategy,
+        'CV_Score': search.best_score_,
+        'Fit_Time': fit_time,
+        'Refit_Time': search.refit_time_,
+        'Params': {k: str(v) for k, v in search.best_params_.items()},
+        'estimator': search.best_estimator_,
+        **_test_scores(search.best_estimator_, X_test, y_test),
+    }
+
+
+def _run_ensemble(members, X_train, y_train, X_test, y_test, cv_folds, random_state):
+    """Soft-voting ensemble of the best estimator from each hyperparameter search"""
+    start = time.perf_counter()
+    ensemble = VotingClassifier([(name, estimator) for name, estimator in members], voting='soft')
+    cv = StratifiedKFold(cv_folds, shuffle=True, random_state=random_state)
+    scores = cross_val_score(ensemble, X_train, y_train, cv=cv, scoring=SCORING)
+    refit_start = time.perf_counter()
+    ensemble.fit(X_train, y_train)
+    refit_time = time.perf_counter() - refit_start
+    return {
+        'Model': 'Ensemble',
+        'Strategy': 'ensemble',
+        'CV_Score': scores.mean(),
+        'Fit_Time': time.perf_counter() - start,
+        'Refit_Time': refit_time,
+        'Params': {'members': ', '.join(name for name, _ in members)},
+        'estimator': ensemble,
+        **_test_scores(ensemble, X_test, y_test),
+    }
+
+
+def _baseline_score(X_train, y_train, cv_folds, random_state):
+    """CV score of a default RandomForest, the reference for reported improvements"""
+    cv = StratifiedKFold(cv_folds, shuffle=True, random_state=random_state)
+    return cross_val_score(RandomForestClassifier(random_state=random_state),
+                           X_train, y_train, cv=cv, scoring=SCORING).mean()
+
+
+def load_training_data(target):
+    """
+    Features and labels for tuning `target`.
+
+    Uses the base model's feature set when it records one, so the optimized
+    model stays a drop-in replacement; otherwise every numeric non-target column.
+    """
+    columns = data_store.store_columns()
+    base_path = model_store.model_path(target)
+    base_model = joblib.load(base_path) if os.path.exists(base_path) else None
+    if base_model is not None and hasattr(base_model, 'feature_names_in_'):
+        features = [f for f in base_model.feature_names_in_ if f in columns and f != target]
+    else:
+        features = [c for c in columns if c not in TARGETS]
+
+    df = data_store.load_columns(features + [target])
+    X = df[features].select_dtypes(include=[np.number])
+    return X, df[target]
+
+
+def save_optimized_model(target, model):
+    """Write the model where load_optimized_model expects it, atomically"""
+    path = model_store.optimized_model_path(target)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def run_optimization(X, y, target, strategy='all', cv_folds=5, max_workers=None, random_state=42):
+    """
+    Tune models for `target`, yielding each trial's result as it completes.
+
+    Every yielded dict has Model, Strategy, CV_Score, Test_Accuracy, Test_F1,
+    Fit_Time, Refit_Time, Predict_Time, Params and Improvement (CV gain over
+    a default RandomForest). Each trial is also recorded in the metrics store.
+    The last item is a summary dict with 'winner' (the best trial) and 'path'
+    (where the refit winner was saved).
+    """
+    if strategy != 'all' and strategy not in STRATEGIES:
+        raise ValueError(f"Unknown optimization strategy: {strategy}")
+
+    y = np.asarray(y)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, stratify=y, random_state=random_state)
+    trials = build_trials(strategy, X.shape[1], random_state)
+    max_workers = max_workers or min(len(trials) + 1, os.cpu_count() or 1)
+
+    store = metrics_store.MetricsStore()
+    run_id = store.start_run('optimization', target, {'strategy': strategy, 'cv_folds': cv_folds})
+
+    def record(result):
+        store.record(run_id, target, result['Model'], {
+            'cv_mean': result['CV_Score'],
+            'accuracy': result['Test_Accuracy'],
+            'f1_macro': result['Test_F1'],
+            'train_seconds': result['Refit_Time'],
+            'predict_seconds': result['Predict_Time'],
+            'rows': len(y_test),
+        }, variant='optimization')
+
+    results = []
+    completed = False
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        baseline_future = executor.submit(_baseline_score, X_train, y_train, cv_folds, random_state)
+        futures = [executor.submit(_run_trial, name, trial_strategy, estimator, params,
+                                   X_train, y_train, X_test, y_test, cv_folds, random_state)
+                   for name, trial_strategy, estimator, params in trials]
+        baseline = baseline_future.result()
+
+        for future in as_completed(futures):
+            result = future.result()
+            result['Improvement'] = f"{(result['CV_Score'] - baseline) * 100:+.2f}%"
+            results.append(result)
+            record(result)
+            yield result
+
+        if strategy in ('all', 'ensemble'):
+            members = [(r['Model'], r['estimator']) for r in results if r['Strategy'] == 'hyperparams']
+            result = executor.submit(_run_ensemble, members, X_train, y_train, X_test, y_test,
+                                     cv_folds, random_state).result()
+            result['Improvement'] = f"{(result['CV_Score'] - baseline) * 100:+.2f}%"
+            results.append(result)
+            record(result)
+            yield result
+        completed = True
+    finally:
+        # Closing the generator early (e.g. a cancelled job) drops trials that have not started
+        # and returns without waiting for the running ones
+        executor.shutdown(wait=completed, cancel_futures=True)
+
+    winner = max(results, key=lambda r: (r['CV_Score'], r['Test_Accuracy']))
+    final_model = clone(winner['estimator']).fit(X, y)
+    yield {'winner': winner, 'path': save_optimized_model(target, final_model)}
@@ -0,0 +1,125 @@
+"""
+Prediction Cache for Hydraulic System Monitoring
+
+Stores batch predictions so a model never scores the same cycle twice:
+1. Results for a (model hash, dataset fingerprint) pair are stored whole,
+   together with the confusion matrix and classification report
+2. Per-row predictions are also kept by row hash, so when the dataset changes
+   only rows the model has not seen before are scored
+3. Freshly computed metrics of a target's model are recorded in the metrics store
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from batch_scoring import read_batch_scores
+from config import CACHE_DIR
+from data_store import columns_key, row_hashes
+
+PREDICTION_DIR = os.path.join(CACHE_DIR, 'predictions')
+
+
+def predict_frame(model, X):
+    """Predictions (and class probabilities when available) for every row of `X`"""
+    result = pd.DataFrame({'prediction': model.predict(X)})
+    if hasattr(model, 'predict_proba'):
+        probabilities = model.predict_proba(X)
+        for i, label in enumerate(model.classes_):
+            result[f'proba_{label}'] = probabilities[:, i]
+    return result
+
+
+def prediction_metrics(y, y_pred):
+    """Confusion matrix and classification report, in JSON-serialisable form"""
+    from sklearn.metrics import classification_report, confusion_matrix
+
+    y = np.asarray(y)
+    labels = np.union1d(y, y_pred)
+    return {
+        'labels': labels.tolist(),
+        'confusion_matrix': confusion_matrix(y, y_pred, labels=labels).tolist(),
+        'report': classification_report(y, y_pred, output_dict=True),
+    }
+
+
+def _write_parquet(path, frame):
+    os.makedirs(PREDICTION_DIR, exist_ok=True)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def score_new_rows(model, X, model_hash):
+    """
+    Predictions for `X`, scoring only rows whose hash this model has not seen.
+
+    Known rows are looked up in the model's row-hash table, which is extended
+    with the newly scored rows.
+    """
+    table_path = os.path.join(PREDICTION_DIR, f'{model_hash}-{columns_key(X.columns)}-rows.parquet')
+    hashes = row_hashes(X)
+
+    known = pd.read_parquet(table_path) if os.path.exists(table_path) else None
+    if known is not None:
+        positions = pd.Index(known['row_hash']).get_indexer(hashes)
+    else:
+        positions = np.full(len(hashes), -1)
+
+    missing = positions < 0
+    if missing.any():
+        scored = predict_frame(model, X[missing])
+        scored.insert(0, 'row_hash', hashes[missing])
+        scored = scored.drop_duplicates('row_hash')
+        known = scored if known is None else pd.concat([known, scored], ignore_index=True)
+        _write_parquet(table_path, known)
+        positions = pd.Index(known['row_hash']).get_indexer(hashes)
+
+    return known.iloc[positions].drop(columns='row_hash').reset_index(drop=True)
+
+
+def cached_predictions(model, X, y, model_hash, fingerprint, target=None):
+    """
+    Predictions and metrics for `model` on the dataset identified by `fingerprint`.
+
+    Returns (predictions frame, metrics dict); revisiting the same model and
+    dataset reads both straight from disk. When `target` is given, a matching
+    batch scoring run (see batch_scoring.py) is reused instead of predicting,
+    and the measured accuracy is recorded in the metrics store.
+    """
+    key = f'{model_hash}-{fingerprint}-{columns_key(X.columns)}'
+    predictions_path = os.path.join(PREDICTION_DIR, f'{key}.parquet')
+    metrics_path = os.path.join(PREDICTION_DIR, f'{key}.json')
+    if os.path.exists(predictions_path) and os.path.exists(metrics_path):
+        with open(metrics_path) as f:
+            return pd.read_parquet(predictions_path), json.load(f)
+
+    predictions = read_batch_scores(fingerprint, target, model_hash, X.columns) if target else None
+    if predictions is None or len(predictions) != len(X):
+        predictions = score_new_rows(model, X, model_hash)
+    metrics = prediction_metrics(y, predictions['prediction'].to_numpy())
+
+    _write_parquet(predictions_path, predictions)
+    tmp_path = f'{metrics_path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(metrics, f)
+    os.replace(tmp_path, metrics_path)
+    if target:
+        record_scoring_metrics(model, target, metrics, model_hash, fingerprint)
+    return predictions, metrics
+
+
+def record_scoring_metrics(model, target, metrics, model_hash, fingerprint):
+    """Record accuracy and macro F1 of a scoring pass over the dataset"""
+    import metrics_store
+
+    store = metrics_store.MetricsStore()
+    run_id = store.start_run('scoring', target, {'model_hash': model_hash, 'fingerprint': fingerprint})
+    report = metrics['report']
+    store.record(run_id, target, metrics_store.model_name(model), {
+        'accuracy': report['accuracy'],
+        'f1_macro': report['macro avg']['f1-score'],
+        'rows': report['macro avg']['support'],
+    })
@@ -0,0 +1,429 @@
+"""
+Prediction Service for Hydraulic System Monitoring
+
+A local HTTP service (plain asyncio, no web framework) that serves the
+trained models with low latency:
+1. Every TARGETS model is loaded once at startup and kept warm
+2. POST /predict/<target> accepts one or many feature vectors as JSON, or an
+   Arrow IPC stream (Content-Type: application/vnd.apache.arrow.stream)
+3. Concurrent requests for a target are micro-batched into one predict call,
+   which runs off the event loop
+4. GET /metrics reports request count and p50/p99 latency per target
+
+Endpoints:
+    GET  /health             models loaded and their feature counts
+    GET  /models/<target>    feature names the model expects, in order
+    POST /predict/<target>   {"instances": [{"PS1_mean": ..., ...}, ...]}
+                             or {"instances": [[...], ...]} in feature order
+    POST /predict            every target at once (features: GET /models)
+    GET  /metrics            latency percentiles
+
+Usage:
+    python prediction_service.py --port 8600
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+import click
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import model_store
+from config import TARGETS
+from multi_target import MultiTargetPredictor, load_models
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8600
+DEFAULT_URL = f'http://{DEFAULT_HOST}:{DEFAULT_PORT}'
+
+# Micro-batching: rows per predict call, and how long the first request waits for company
+DEFAULT_MAX_BATCH_ROWS = 256
+DEFAULT_MAX_WAIT_MS = 2
+
+# Latencies kept per target for the percentiles
+LATENCY_WINDOW = 10000
+
+# Largest request body accepted
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+# Endpoint key for POST /predict (every target at once)
+ALL_TARGETS = 'all'
+
+
+class RequestError(Exception):
+    """A client error, answered with `status` and the message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_instances(body, content_type, feature_names):
+    """Feature frame (columns in `feature_names` order) from a JSON or Arrow request body"""
+    if content_type.startswith(ARROW_STREAM):
+        try:
+            frame = pa.ipc.open_stream(body).read_all().to_pandas()
+        except pa.ArrowInvalid as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid Arrow stream: {e}")
+    else:
+        try:
+            payload = json.loads(body or b'{}')
+        except json.JSONDecodeError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+        instances = payload.get('instances') if isinstance(payload, dict) else None
+        if instances is None and isinstance(payload, dict) and 'features' in payload:
+            instances = [payload['features']]
+        if not instances or not isinstance(instances, list):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Body needs 'instances' (a list) or 'features'")
+        if all(isinstance(instance, dict) for instance in instances):
+            frame = pd.DataFrame.from_records(instances)
+        else:
+            try:
+                rows = np.asarray(instances, dtype=np.float64)
+            except (ValueError, TypeError):
+                rows = None
+            if rows is None or rows.ndim != 2 or rows.shape[1] != len(feature_names):
+                raise RequestError(HTTPStatus.BAD_REQUEST,
+                                   f"Expected rows of {len(feature_names)} values in model feature order")
+            frame = pd.DataFrame(rows, columns=feature_names)
+
+    missing = [name for name in feature_names if name not in frame.columns]
+    if missing:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"Missing features: {missing[:10]}"
+                                                   f"{' ...' if len(missing) > 10 else ''}")
+    try:
+        return frame[feature_names].astype(np.float64)
+    except (ValueError, TypeError) as e:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"Feature values must be numbers: {e}")
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent predict requests for one endpoint.
+
+    The first queued request waits up to `max_wait_ms` for others; the rows
+    of all collected requests (up to `max_batch_rows`) go through a single
+    `predict` call in a worker thread. `predict` maps a feature frame to a
+    result frame with one row per input row. When a batch fails, its requests
+    are retried one by one, so an error only fails the request that caused it.
+    """
+
+    def __init__(self, predict, executor, max_batch_rows=DEFAULT_MAX_BATCH_ROWS,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self._predict = predict
+        self.executor = executor
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    async def predict(self, frame):
+        """(result rows for `frame`, number of requests in its batch)"""
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((frame, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            rows = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_batch_rows:
+                try:
+                    item = self.queue.get_nowait() if loop.time() >= deadline else \
+                        await asyncio.wait_for(self.queue.get(), deadline - loop.time())
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            try:
+                await self._predict_batch(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    _, future = batch[0]
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+                for item in batch:
+                    try:
+                        await self._predict_batch([item])
+                    except Exception as item_error:
+                        if not item[1].done():
+                            item[1].set_exception(item_error)
+
+    async def _predict_batch(self, batch):
+        """Predict the rows of every (frame, future) in `batch` in one call and resolve the futures"""
+        frames = [frame for frame, _ in batch]
+        results = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._predict, pd.concat(frames, ignore_index=True))
+        start = 0
+        for frame, future in batch:
+            end = start + len(frame)
+            if not future.done():
+                future.set_result((results.iloc[start:end], len(batch)))
+            start = end
+
+
+def _single_target(model):
+    """Predict function for one model: 'prediction' and (with predict_proba) 'confidence' columns"""
+    def predict(frame):
+        if hasattr(model, 'predict_proba'):
+            proba = model.predict_proba(frame)
+            return pd.DataFrame({'prediction': model.classes_[proba.argmax(axis=1)],
+                                 'confidence': proba.max(axis=1)})
+        return pd.DataFrame({'prediction': model.predict(frame)})
+    return predict
+
+
+class PredictionService:
+    """Warm models, one micro-batcher per endpoint, and latency bookkeeping"""
+
+    def __init__(self, targets=TARGETS, max_batch_rows=DEFAULT_MAX_BATCH_ROWS,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, threads=None, stage=None, tracking_uri=None):
+        self.executor = ThreadPoolExecutor(max_workers=threads or min(len(targets), os.cpu_count() or 1))
+        self.models = load_models(targets, stage=stage, tracking_uri=tracking_uri)
+        if not self.models:
+            source = f"registry stage {stage!r}" if stage else model_store.MODEL_DIR
+            raise FileNotFoundError(f"No trained models found in {source}")
+        self.stage = stage
+        self.batchers = {target: MicroBatcher(_single_target(model), self.executor, max_batch_rows, max_wait_ms)
+                         for target, model in self.models.items()}
+        # POST /predict scores every target from one shared feature matrix
+        self.predictor = None
+        if all(hasattr(model, 'feature_names_in_') for model in self.models.values()):
+            self.predictor = MultiTargetPredictor(self.models)
+            self.batchers[ALL_TARGETS] = MicroBatcher(self.predictor.predict, self.executor,
+                                                      max_batch_rows, max_wait_ms)
+        self.latencies = {name: deque(maxlen=LATENCY_WINDOW) for name in self.batchers}
+        self.started_at = time.time()
+
+    def feature_names(self, target):
+        if target == ALL_TARGETS:
+            return self.predictor.feature_names if self.predictor else []
+        return list(getattr(self.models[target], 'feature_names_in_', []))
+
+    def _model(self, target):
+        if target not in self.models:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"No model for target {target!r}; "
+                                                     f"available: {list(self.models)}")
+        return self.models[target]
+
+    def metrics(self):
+        """Request count and latency percentiles (ms) per endpoint"""
+        out = {}
+        for target, latencies in self.latencies.items():
+            values = np.fromiter(latencies, dtype=np.float64)
+            out[target] = {
+                'requests': len(values),
+                'p50_ms': float(np.percentile(values, 50)) if len(values) else None,
+                'p99_ms': float(np.percentile(values, 99)) if len(values) else None,
+            }
+        return {'uptime_s': time.time() - self.started_at, 'targets': out}
+
+    async def handle(self, method, path, headers, body):
+        """(status, JSON-serializable response) for one request"""
+        parts = [part for part in path.split('?')[0].split('/') if part]
+        if method == 'GET' and parts == ['health']:
+            return HTTPStatus.OK, {'status': 'ok', 'stage': self.stage, 'models': {
+                target: len(self.feature_names(target)) for target in self.models}}
+        if method == 'GET' and parts == ['metrics']:
+            return HTTPStatus.OK, self.metrics()
+        if method == 'GET' and parts == ['models']:
+            return HTTPStatus.OK, {'target': ALL_TARGETS, 'features': self.feature_names(ALL_TARGETS)}
+        if method == 'GET' and len(parts) == 2 and parts[0] == 'models':
+            self._model(parts[1])
+            return HTTPStatus.OK, {'target': parts[1], 'features': self.feature_names(parts[1])}
+        if parts and parts[0] == 'predict' and len(parts) <= 2:
+            if method != 'POST':
+                raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST to predict")
+            if len(parts) == 1:
+                return HTTPStatus.OK, await self.predict_all(headers, body)
+            return HTTPStatus.OK, await self.predict(parts[1], headers, body)
+        raise RequestError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+    async def predict(self, target, headers, body):
+        start = time.perf_counter()
+        model = self._model(target)
+        feature_names = self.feature_names(target) or None
+        if feature_names is None:
+            raise RequestError(HTTPStatus.CONFLICT, f"Model for {target} does not record its features")
+        frame = parse_instances(body, headers.get('content-type', 'application/json'), feature_names)
+        results, batched = await self.batchers[target].predict(frame)
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.latencies[target].append(latency_ms)
+        return {
+            'target': target,
+            'model': type(model).__name__,
+            'predictions': results['prediction'].tolist(),
+            'confidence': results['confidence'].tolist() if 'confidence' in results else None,
+            'latency_ms': latency_ms,
+            'batched_requests': batched,
+        }
+
+    async def predict_all(self, headers, body):
+        """Every target for each instance, from one shared, once-validated feature matrix"""
+        start = time.perf_counter()
+        if self.predictor is None:
+            raise RequestError(HTTPStatus.CONFLICT, "Not every model records its features")
+        frame = parse_instances(body, headers.get('content-type', 'application/json'),
+                                self.predictor.feature_names)
+        results, batched = await self.batchers[ALL_TARGETS].predict(frame)
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.latencies[ALL_TARGETS].append(latency_ms)
+        return {
+            'targets': list(self.models),
+            'predictions': {target: results[target].tolist() for target in self.models},
+            'confidence': {target: results[f'{target}_confidence'].tolist() for target in self.models
+                           if f'{target}_confidence' in results},
+            'latency_ms': latency_ms,
+            'batched_requests': batched,
+        }
+
+
+async def _read_request(reader):
+    """(method, path, headers, body) of the next HTTP/1.1 request, or None at end of stream"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_BYTES:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path, headers, body
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, default=str).encode()
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+async def _handle_connection(service, reader, writer):
+    """Serve requests on one connection, keeping it open between requests (HTTP/1.1)"""
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            except (RequestError, ValueError) as e:
+                status = e.status if isinstance(e, RequestError) else HTTPStatus.BAD_REQUEST
+                writer.write(_response(status, {'error': str(e)}, keep_alive=False))
+                await writer.drain()
+                break
+            if request is None:
+                break
+            method, path, headers, body = request
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            try:
+                status, payload = await service.handle(method, path, headers, body)
+            except RequestError as e:
+                status, payload = e.status, {'error': str(e)}
+            except Exception as e:
+                status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(e).__name__}: {e}"}
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, **service_options):
+    """Run the service until cancelled"""
+    service = PredictionService(**service_options)
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle_connection(service, reader, writer), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+# Client helpers (standard library only), used by the Deployment page
+
+def _call(url, data=None, content_type='application/json', timeout=10):
+    request = Request(url, data=data, headers={'Content-Type': content_type},
+                      method='POST' if data is not None else 'GET')
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except HTTPError as e:
+        raise RuntimeError(json.loads(e.read() or b'{}').get('error', str(e)))
+    except URLError as e:
+        raise ConnectionError(f"Prediction service unreachable at {url}: {e.reason}")
+
+
+def model_features(target, url=DEFAULT_URL, timeout=10):
+    """Feature names the served model for `target` expects"""
+    return _call(f'{url}/models/{target}', timeout=timeout)['features']
+
+
+def request_predictions(target, frame, url=DEFAULT_URL, arrow=False, timeout=10):
+    """
+    Predictions for the rows of `frame` from the service, sent as JSON records or an Arrow stream.
+
+    `target` None asks for every target at once.
+    """
+    endpoint = f'{url}/predict' if target is None else f'{url}/predict/{target}'
+    if arrow:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return _call(endpoint, sink.getvalue().to_pybytes(), ARROW_STREAM, timeout)
+    body = json.dumps({'instances': frame.to_dict(orient='records')}).encode()
+    return _call(endpoint, body, timeout=timeout)
+
+
+def service_metrics(url=DEFAULT_URL, timeout=10):
+    """The service's latency percentiles per target"""
+    return _call(f'{url}/metrics', timeout=timeout)
+
+
+@click.command()
+@click.option('--host', default=DEFAULT_HOST, show_default=True)
+@click.option('--port', default=DEFAULT_PORT, show_default=True)
+@click.option('--max-batch-rows', default=DEFAULT_MAX_BATCH_ROWS, show_default=True,
+              help='Most rows coalesced into one predict call.')
+@click.option('--max-wait-ms', default=DEFAULT_MAX_WAIT_MS, show_default=True,
+              help='How long a request waits for others to batch with.')
+@click.option('--stage', default=None,
+              help='Serve the MLflow registry versions in this stage or alias (default: files in models/).')
+@click.option('--tracking-uri', default=None, help='MLflow tracking store holding the registry.')
+def main(host, port, max_batch_rows, max_wait_ms, stage, tracking_uri):
+    """Serve the trained models over HTTP."""
+    click.echo(f"Serving predictions on http://{host}:{port}")
+    try:
+        asyncio.run(serve(host, port, max_batch_rows=max_batch_rows, max_wait_ms=max_wait_ms,
+                          stage=stage, tracking_uri=tracking_uri))
+    except KeyboardInterrupt:
+        click.echo("Stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Render Profiler for Hydraulic System Monitoring
+
+Times what each dashboard rerun spends its time on:
+1. A page render opens a trace; named stages inside it (data loading,
+   dtype selection, correlation, prediction, chart serialization, ...) are
+   recorded as nested spans with their wall time
+2. Streamlit cached loaders wrapped with `cache()` are recorded as spans too,
+   marked as a hit or a miss (the loader body only runs on a miss), and
+   counted per process
+3. A trace summarizes into a per-stage breakdown and exports to the Chrome
+   trace-event format (open it in chrome://tracing or ui.perfetto.dev)
+
+Only the standard library is used, so importing it costs the dashboard nothing
+at startup; stages outside a render are not recorded.
+"""
+
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-thread state: Streamlit runs every session's script in its own thread
+_local = threading.local()
+
+# loader name -> {'hits': n, 'misses': n, 'seconds': s}, for the whole server process
+_cache_counters = {}
+_counters_lock = threading.Lock()
+
+
+class Trace:
+    """Spans recorded during one page render"""
+
+    def __init__(self, page):
+        self.page = page
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.duration = None
+        self._depth = 0
+
+    def summary(self):
+        """
+        Per-stage breakdown, slowest first.
+
+        Rows have Stage, Kind, Calls, Total_ms, Self_ms (excluding nested
+        stages), Share (of the whole render) and Hits / Misses for loaders.
+        """
+        rows = {}
+        for i, span in enumerate(self.spans):
+            children = sum(child['duration'] for child in self._children(i))
+            row = rows.setdefault(span['name'], {'Stage': span['name'], 'Kind': span['kind'], 'Calls': 0,
+                                                 'Total_ms': 0.0, 'Self_ms': 0.0, 'Hits': 0, 'Misses': 0})
+            row['Calls'] += 1
+            row['Total_ms'] += span['duration'] * 1000
+            row['Self_ms'] += (span['duration'] - children) * 1000
+            if span.get('hit') is not None:
+                row['Hits' if span['hit'] else 'Misses'] += 1
+        total_ms = (self.duration or 0) * 1000
+        for row in rows.values():
+            row['Share'] = row['Total_ms'] / total_ms if total_ms else 0.0
+        return sorted(rows.values(), key=lambda row: -row['Total_ms'])
+
+    def _children(self, index):
+        """Spans directly nested in span `index`"""
+        parent = self.spans[index]
+        end = parent['start'] + parent['duration']
+        return [span for span in self.spans[index + 1:]
+                if span['depth'] == parent['depth'] + 1 and parent['start'] <= span['start'] < end]
+
+    def to_chrome_trace(self):
+        """The trace as Chrome trace-event JSON"""
+        events = [{'name': self.page, 'cat': 'render', 'ph': 'X', 'ts': 0,
+                   'dur': round((self.duration or 0) * 1e6), 'pid': 1, 'tid': 1}]
+        for span in self.spans:
+            event = {'name': span['name'], 'cat': span['kind'], 'ph': 'X', 'pid': 1, 'tid': 1,
+                     'ts': round(span['start'] * 1e6), 'dur': round(span['duration'] * 1e6)}
+            if span.get('hit') is not None:
+                event['args'] = {'cache': 'hit' if span['hit'] else 'miss'}
+            events.append(event)
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms',
+                           'otherData': {'page': self.page, 'started_at': self.started_at}})
+
+
+def current_trace():
+    """Trace of the render in progress on this thread, or None"""
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def render(page):
+    """Record a trace for one page render; yields the Trace"""
+    trace = Trace(page)
+    previous, _local.trace = current_trace(), trace
+    try:
+        yield trace
+    finally:
+        trace.duration = time.perf_counter() - trace.origin
+        _local.trace = previous
+
+
+@contextmanager
+def stage(name, kind='stage'):
+    """Time the enclosed block as a span named `name` of the current render"""
+    trace = current_trace()
+    if trace is None:
+        yield {}
+        return
+    span = {'name': name, 'kind': kind, 'depth': trace._depth, 'start': time.perf_counter() - trace.origin}
+    trace.spans.append(span)
+    trace._depth += 1
+    try:
+        yield span
+    finally:
+        trace._depth -= 1
+        span['duration'] = time.perf_counter() - trace.origin - span['start']
+
+
+def cache(cache_decorator, **options):
+    """
+    Wrap a loader with a Streamlit cache decorator, recording hits and misses.
+
+        @profiler.cache(st.cache_data, ttl=30)
+        def load_something(...): ...
+
+    The loader keeps its name, docstring and cache `clear()`.
+    """
+    def decorate(function):
+        name = function.__name__
+
+        @functools.wraps(function)
+        def body(*args, **kwargs):
+            # Only runs when the cache misses
+            calls = getattr(_local, 'loader_calls', None)
+            if calls:
+                calls[-1]['hit'] = False
+            return function(*args, **kwargs)
+
+        cached = cache_decorator(**options)(body) if options else cache_decorator(body)
+
+        @functools.wraps(function)
+        def call(*args, **kwargs):
+            calls = _local.__dict__.setdefault('loader_calls', [])
+            marker = {'hit': True}
+            calls.append(marker)
+            start = time.perf_counter()
+            try:
+                with stage(name, kind='cache') as span:
+                    result = cached(*args, **kwargs)
+                    span['hit'] = marker['hit']
+            finally:
+                calls.pop()
+                _count(name, marker['hit'], time.perf_counter() - start)
+            return result
+
+        call.clear = cached.clear
+        return call
+    return decorate
+
+
+def _count(name, hit, seconds):
+    with _counters_lock:
+        counter = _cache_counters.setdefault(name, {'hits': 0, 'misses': 0, 'seconds': 0.0})
+        counter['hits' if hit else 'misses'] += 1
+        counter['seconds'] += seconds
+
+
+def cache_counters():
+    """{loader: {'hits', 'misses', 'seconds'}} since the server process started"""
+    with _counters_lock:
+        return {name: dict(counter) for name, counter in _cache_counters.items()}
@@ -0,0 +1,258 @@
+"""
+MLflow Model Registry for Hydraulic System Monitoring
+
+Reads the registered condition models from a real MLflow backend (a local
+SQLite or file tracking store works) and resolves models by registry stage:
+1. All model versions are fetched with one paged search, and their runs'
+   metrics with batched run searches (not one request per model or run)
+2. Results are held in a process-wide TTL cache, so pages and services stay
+   fast with hundreds of runs
+3. A stage (or alias) resolves to the newest matching version per target,
+   whose artifact is loaded through model_store like any other model
+4. `python registry.py register` logs the trained models in models/ as
+   registered versions, to seed a local registry
+
+Usage:
+    python registry.py register --stage Production
+    python registry.py show
+"""
+
+import os
+import threading
+import time
+
+import click
+import mlflow
+import pandas as pd
+from mlflow.tracking import MlflowClient
+
+import model_store
+from config import CACHE_DIR, TARGETS
+
+DEFAULT_TRACKING_URI = 'file:./mlruns'
+EXPERIMENT_NAME = 'hydraulic_condition_models'
+MODEL_NAME_PREFIX = 'hydraulic_condition_model_'
+
+STAGES = ['Production', 'Staging', 'None', 'Archived']
+
+# Seconds registry metadata is reused before MLflow is queried again
+REGISTRY_TTL_SECONDS = 30
+
+# Run ids per batched run search (keeps the filter string bounded)
+RUN_BATCH_SIZE = 100
+
+# Artifacts of versions stored remotely are downloaded here, once per version
+DOWNLOAD_DIR = os.path.join(CACHE_DIR, 'registry')
+
+# (tracking uri, query) -> (expires at, value)
+_ttl_cache = {}
+_ttl_lock = threading.Lock()
+
+
+def _cached(key, compute, ttl=REGISTRY_TTL_SECONDS):
+    now = time.monotonic()
+    with _ttl_lock:
+        entry = _ttl_cache.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+    value = compute()
+    with _ttl_lock:
+        _ttl_cache[key] = (now + ttl, value)
+    return value
+
+
+def clear_cache():
+    """Forget cached registry metadata, e.g. after registering or transitioning a version"""
+    with _ttl_lock:
+        _ttl_cache.clear()
+
+
+def registered_model_name(target):
+    return f'{MODEL_NAME_PREFIX}{target}'
+
+
+def _client(tracking_uri):
+    return MlflowClient(tracking_uri=tracking_uri, registry_uri=tracking_uri)
+
+
+def _model_versions(client):
+    """Every version of every condition model, in one paged search"""
+    versions = []
+    page_token = None
+    while True:
+        page = client.search_model_versions(f"name LIKE '{MODEL_NAME_PREFIX}%'", page_token=page_token)
+        versions.extend(page)
+        page_token = page.token
+        if not page_token:
+            return versions
+
+
+def _run_metrics(client, run_ids):
+    """{run id: metrics} for `run_ids`, fetched in batches of RUN_BATCH_SIZE"""
+    run_ids = sorted(set(filter(None, run_ids)))
+    if not run_ids:
+        return {}
+    experiment_ids = [e.experiment_id for e in client.search_experiments()]
+    metrics = {}
+    for start in range(0, len(run_ids), RUN_BATCH_SIZE):
+        batch = run_ids[start:start + RUN_BATCH_SIZE]
+        quoted = ', '.join(f"'{run_id}'" for run_id in batch)
+        runs = client.search_runs(experiment_ids, filter_string=f"attributes.run_id IN ({quoted})",
+                                  max_results=len(batch))
+        metrics.update({run.info.run_id: dict(run.data.metrics) for run in runs})
+    return metrics
+
+
+def experiment_summary(tracking_uri=DEFAULT_TRACKING_URI):
+    """Number of experiments and runs in the tracking store"""
+    def compute():
+        client = _client(tracking_uri)
+        experiments = client.search_experiments()
+        runs = 0
+        page_token = None
+        while True:
+            page = client.search_runs([e.experiment_id for e in experiments], max_results=1000,
+                                      page_token=page_token)
+            runs += len(page)
+            page_token = page.token
+            if not page_token:
+                break
+        return {'experiments': len(experiments), 'runs': runs}
+    return _cached((tracking_uri, 'summary'), compute)
+
+
+def registry_table(tracking_uri=DEFAULT_TRACKING_URI):
+    """
+    One row per registered condition model version.
+
+    Columns: Model_Name, Target, Version, Stage, Aliases, Accuracy, Run_ID,
+    Source and Last_Updated, newest versions first.
+    """
+    def compute():
+        client = _client(tracking_uri)
+        versions = _model_versions(client)
+        metrics = _run_metrics(client, [v.run_id for v in versions])
+        rows = []
+        for v in versions:
+            run_metrics = metrics.get(v.run_id, {})
+            rows.append({
+                'Model_Name': v.name,
+                'Target': v.name[len(MODEL_NAME_PREFIX):],
+                'Version': int(v.version),
+                'Stage': v.current_stage,
+                'Aliases': ', '.join(getattr(v, 'aliases', []) or []),
+                'Accuracy': run_metrics.get('accuracy', run_metrics.get('test_accuracy')),
+                'Run_ID': v.run_id,
+                'Source': v.source,
+                'Last_Updated': pd.to_datetime(v.last_updated_timestamp, unit='ms'),
+            })
+        columns = ['Model_Name', 'Target', 'Version', 'Stage', 'Aliases', 'Accuracy', 'Run_ID',
+                   'Source', 'Last_Updated']
+        table = pd.DataFrame(rows, columns=columns)
+        return table.sort_values(['Target', 'Version'], ascending=[True, False], ignore_index=True)
+    return _cached((tracking_uri, 'versions'), compute)
+
+
+def resolve_versions(stage='Production', tracking_uri=DEFAULT_TRACKING_URI):
+    """Newest version per target in `stage` (or carrying `stage` as an alias)"""
+    table = registry_table(tracking_uri)
+    aliases = table['Aliases'].str.split(', ')
+    matching = table[(table['Stage'] == stage) | aliases.apply(lambda names: stage in names)]
+    return matching.drop_duplicates('Target').set_index('Target')
+
+
+def _artifact_path(tracking_uri, name, version):
+    """Local path of a version's pickled model, downloading it once if it is stored remotely"""
+    client = _client(tracking_uri)
+    uri = client.get_model_version_download_uri(name, str(version))
+    local = uri[len('file://'):] if uri.startswith('file://') else uri
+    if os.path.isdir(local):
+        return os.path.join(local, 'model.pkl')
+    target_dir = os.path.join(DOWNLOAD_DIR, name, str(version))
+    if not os.path.exists(os.path.join(target_dir, 'model.pkl')):
+        os.makedirs(target_dir, exist_ok=True)
+        mlflow.artifacts.download_artifacts(artifact_uri=uri, dst_path=target_dir, tracking_uri=tracking_uri)
+    return os.path.join(target_dir, 'model.pkl')
+
+
+def model_paths(stage='Production', tracking_uri=DEFAULT_TRACKING_URI, targets=TARGETS):
+    """{target: local model.pkl path} for the versions serving `stage`"""
+    versions = resolve_versions(stage, tracking_uri)
+    return {target: _cached((tracking_uri, 'path', row['Model_Name'], row['Version']),
+                            lambda row=row: _artifact_path(tracking_uri, row['Model_Name'], row['Version']),
+                            ttl=float('inf'))
+            for target, row in versions.iterrows() if target in targets}
+
+
+def register_models(tracking_uri=DEFAULT_TRACKING_URI, stage='Production', optimized=False):
+    """
+    Log the trained model of every target as a new registered version.
+
+    Accuracy on the dashboard dataset is logged when the model's features
+    are available there. Returns {target: version}.
+    """
+    import data_store
+    import joblib
+    import mlflow.sklearn
+
+    path_for = model_store.optimized_model_path if optimized else model_store.model_path
+    client = _client(tracking_uri)
+    mlflow.set_tracking_uri(tracking_uri)
+    mlflow.set_registry_uri(tracking_uri)
+    mlflow.set_experiment(EXPERIMENT_NAME)
+    try:
+        columns = data_store.store_columns()
+    except FileNotFoundError:
+        columns = []
+
+    registered = {}
+    for target in TARGETS:
+        path = path_for(target)
+        if not os.path.exists(path):
+            continue
+        model = joblib.load(path)
+        with mlflow.start_run(run_name=f'{target}_{"optimized" if optimized else "base"}'):
+            mlflow.log_params({'target': target, 'model_type': type(model).__name__,
+                               'artifact_hash': model_store.artifact_hash(path)})
+            features = list(getattr(model, 'feature_names_in_', []))
+            if features and all(f in columns for f in features + [target]):
+                df = data_store.load_columns(features + [target])
+                mlflow.log_metric('accuracy', float(model.score(df[features], df[target])))
+            info = mlflow.sklearn.log_model(model, 'model', registered_model_name=registered_model_name(target))
+        version = info.registered_model_version
+        if stage and stage != 'None':
+            client.transition_model_version_stage(registered_model_name(target), version, stage,
+                                                  archive_existing_versions=True)
+        registered[target] = int(version)
+    clear_cache()
+    return registered
+
+
+@click.group()
+def main():
+    """Inspect and seed the MLflow model registry."""
+
+
+@main.command('register')
+@click.option('--tracking-uri', default=DEFAULT_TRACKING_URI, show_default=True)
+@click.option('--stage', default='Production', show_default=True, type=click.Choice(STAGES))
+@click.option('--optimized', is_flag=True, help='Register the optimized models instead of the base ones.')
+def register_command(tracking_uri, stage, optimized):
+    """Register the trained models as new versions."""
+    registered = register_models(tracking_uri, stage, optimized)
+    if not registered:
+        raise click.ClickException("No trained models found")
+    for target, version in registered.items():
+        click.echo(f"{registered_model_name(target)} v{version} -> {stage}")
+
+
+@main.command('show')
+@click.option('--tracking-uri', default=DEFAULT_TRACKING_URI, show_default=True)
+def show_command(tracking_uri):
+    """List registered condition model versions."""
+    table = registry_table(tracking_uri)
+    click.echo(table.drop(columns=['Source']).to_string(index=False) if len(table) else "No registered models")
+
+
+if __name__ == '__main__':
+    main()
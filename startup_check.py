@@ -0,0 +1,99 @@
+"""
+Startup Import Budget for the Hydraulic System Monitoring Dashboard
+
+Measures, in fresh interpreters, how long the dashboard's top-level imports
+take beyond Streamlit itself, and fails when they exceed the budget. Heavy
+libraries are meant to be imported lazily by the pages that use them, so
+the Home page starts and reruns without paying for them.
+
+Usage:
+    python startup_check.py
+    python startup_check.py --budget-ms 100 --repeat 5
+"""
+
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+import click
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_dashboard.py')
+
+# Import time the dashboard may add on top of `import streamlit`
+DEFAULT_BUDGET_MS = 150
+
+# Libraries that must never be loaded just to start the dashboard (unless Streamlit loads them itself)
+LAZY_ONLY = ['mlflow', 'sklearn', 'seaborn', 'matplotlib', 'plotly', 'joblib', 'scipy']
+
+
+def top_level_imports(path=DASHBOARD):
+    """Source of every module-level import statement in the dashboard"""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def measure_imports(code, cwd):
+    """
+    Import `code` in a fresh interpreter with -X importtime.
+
+    Returns (total microseconds, {module: cumulative microseconds}) for the
+    modules imported directly by `code`.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=cwd, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        fields = line[len('import time:'):].split('|')
+        if not line.startswith('import time:') or len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        # Nested imports are indented further; only count the outermost ones
+        if fields[2].startswith(' ') and not fields[2].startswith('  '):
+            modules[fields[2].strip()] = int(fields[1])
+    total = sum(modules.values())
+    return total, modules
+
+
+def loaded_modules(code, cwd):
+    """Top-level package names loaded after running `code`"""
+    probe = f"{code}\nimport sys\nprint(' '.join(sorted({{m.split('.')[0] for m in sys.modules}})))"
+    result = subprocess.run([sys.executable, '-c', probe], cwd=cwd, capture_output=True,
+                            text=True, check=True)
+    return set(result.stdout.split())
+
+
+@click.command()
+@click.option('--budget-ms', default=DEFAULT_BUDGET_MS, show_default=True,
+              help='Allowed import time on top of `import streamlit`.')
+@click.option('--repeat', default=3, show_default=True, help='Fresh interpreters per measurement.')
+def main(budget_ms, repeat):
+    """Check the dashboard's startup import cost against the budget."""
+    cwd = os.path.dirname(DASHBOARD)
+    code = '\n'.join(top_level_imports())
+
+    baseline = statistics.median(measure_imports('import streamlit', cwd)[0] for _ in range(repeat))
+    runs = [measure_imports(code, cwd) for _ in range(repeat)]
+    total = statistics.median(run[0] for run in runs)
+    extra_ms = max(0.0, (total - baseline) / 1000)
+
+    click.echo(f"import streamlit:           {baseline / 1000:8.1f} ms")
+    click.echo(f"dashboard top-level imports: {total / 1000:8.1f} ms")
+    for name, micros in sorted(runs[-1][1].items(), key=lambda item: -item[1]):
+        click.echo(f"    {name:<24} {micros / 1000:8.1f} ms")
+
+    eager = sorted((set(LAZY_ONLY) & loaded_modules(code, cwd)) - loaded_modules('import streamlit', cwd))
+    failures = []
+    if extra_ms > budget_ms:
+        failures.append(f"dashboard adds {extra_ms:.1f} ms over streamlit (budget {budget_ms} ms)")
+    if eager:
+        failures.append(f"heavy libraries imported at startup: {', '.join(eager)}")
+
+    if failures:
+        raise click.ClickException('; '.join(failures))
+    click.echo(f"OK: dashboard adds {extra_ms:.1f} ms over streamlit (budget {budget_ms} ms)")
+
+
+if __name__ == '__main__':
+    main()
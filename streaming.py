@@ -0,0 +1,393 @@
+"""
+Live Streaming Inference for Hydraulic System Monitoring
+
+Scores cycles as they arrive from the rig instead of a static CSV:
+1. Cycles arrive as JSON lines, from files dropped into a watched directory
+   or over a local TCP socket (a stand-in for the rig)
+2. Arrivals are micro-batched: a batch is scored when it is full or when its
+   oldest cycle has waited the latency budget, whichever comes first
+3. Each batch goes through feature extraction once and through every TARGETS model
+4. Predictions and per-cycle end-to-end latency are appended to a SQLite
+   table (.cache/live/live.sqlite) that the Live Monitoring page polls
+5. Malformed cycles (bad JSON, missing sensors, wrong sample counts) are
+   reported and skipped; the server keeps scoring the rest
+
+A cycle message is one line: {"cycle": 17, "PS1": [...6000 samples...], "FS1": [...], ...}
+
+Usage:
+    python streaming.py serve --watch data/incoming
+    python streaming.py serve --port 8765
+    python streaming.py replay --store data/cycles.parquet --port 8765 --rate 5
+"""
+
+import glob
+import json
+import os
+import queue
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+
+import click
+import numpy as np
+import pandas as pd
+
+import model_store
+from config import CACHE_DIR, TARGETS
+from features import extract_features, parse_feature
+from ingestion import CYCLE_SECONDS, CYCLE_STORE, SENSOR_RATES, iter_cycle_batches, resample, store_rates
+from multi_target import MultiTargetPredictor, load_models
+
+LIVE_DIR = os.path.join(CACHE_DIR, 'live')
+LIVE_DB = os.path.join(LIVE_DIR, 'live.sqlite')
+
+# Micro-batching: flush at this many cycles, or once the oldest cycle has waited this long
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_MAX_LATENCY_MS = 250
+
+# Arrived-but-unscored cycles held in memory; sources block when it is full
+MAX_PENDING_CYCLES = 1024
+
+# Scored cycles kept in the live table (oldest are pruned first)
+MAX_LIVE_CYCLES = 5000
+
+DEFAULT_PORT = 8765
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS live_predictions (
+    cycle INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    prediction TEXT NOT NULL,
+    confidence REAL,
+    received_at REAL NOT NULL,
+    scored_at REAL NOT NULL,
+    latency_ms REAL NOT NULL,
+    batch_size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS live_predictions_scored ON live_predictions (scored_at);
+"""
+
+
+def _connect(db_path):
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute('PRAGMA journal_mode=WAL')
+    return connection
+
+
+def parse_cycle(line):
+    """(cycle id, {sensor: samples}) from one JSON cycle message"""
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise ValueError("A cycle message must be a JSON object")
+    cycle = int(message.pop('cycle'))
+    signals = {sensor: np.asarray(values, dtype=np.float32) for sensor, values in message.items()
+               if sensor in SENSOR_RATES}
+    return cycle, signals
+
+
+def encode_cycle(cycle, signals):
+    """One JSON cycle message (the inverse of parse_cycle)"""
+    message = {'cycle': int(cycle)}
+    message.update({sensor: np.asarray(values).tolist() for sensor, values in signals.items()})
+    return json.dumps(message)
+
+
+class LiveScorer:
+    """
+    Every TARGETS model, scoring batches of raw cycles.
+
+    Features are extracted once per batch for the union of the models'
+    feature_names_in_, then a MultiTargetPredictor scores every target.
+    """
+
+    def __init__(self, targets=TARGETS, align_hz=None):
+        self.align_hz = align_hz
+        self.rates = {sensor: align_hz or rate for sensor, rate in SENSOR_RATES.items()}
+        models = load_models(targets)
+        if not models:
+            raise FileNotFoundError(f"No trained models found in {model_store.MODEL_DIR}")
+        for target, model in models.items():
+            names = list(getattr(model, 'feature_names_in_', []))
+            unknown = [name for name in names if parse_feature(name, self.rates) is None]
+            if not names or unknown:
+                raise ValueError(f"Model for {target} does not use raw-signal features "
+                                 f"(e.g. {unknown[:3] or 'no feature_names_in_'})")
+        self.predictor = MultiTargetPredictor(models)
+        self.feature_names = self.predictor.feature_names
+        self.sensors = sorted({parse_feature(name, self.rates)[0] for name in self.feature_names})
+
+    def check(self, cycle, cycle_signals):
+        """Raise ValueError unless the cycle has every needed sensor at its native sample count"""
+        for sensor in self.sensors:
+            expected = SENSOR_RATES[sensor] * CYCLE_SECONDS
+            values = cycle_signals.get(sensor)
+            if values is None or len(values) != expected:
+                got = 'none' if values is None else len(values)
+                raise ValueError(f"Cycle {cycle}: {sensor} needs {expected} samples, got {got}")
+
+    def _signals(self, cycles):
+        """Stack per-cycle signals into (cycles x samples) arrays at the scoring rates"""
+        for cycle, cycle_signals in cycles:
+            self.check(cycle, cycle_signals)
+        return {sensor: resample(np.stack([cycle_signals[sensor] for _, cycle_signals in cycles]),
+                                 SENSOR_RATES[sensor], self.rates[sensor])
+                for sensor in self.sensors}
+
+    def score(self, cycles):
+        """
+        Predict every target for `cycles`, a list of (cycle id, signals).
+
+        Returns {target: (predictions, confidences or None)}.
+        """
+        features = extract_features(self._signals(cycles), self.rates, self.feature_names)
+        predicted = self.predictor.predict(features)
+        return {target: (predicted[target].to_numpy(),
+                         predicted[f'{target}_confidence'].to_numpy()
+                         if f'{target}_confidence' in predicted else None)
+                for target in self.predictor.models}
+
+
+class LiveStore:
+    """Append-only table of live predictions, pruned to the newest MAX_LIVE_CYCLES cycles"""
+
+    def __init__(self, db_path=LIVE_DB):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with _connect(db_path) as connection:
+            connection.executescript(SCHEMA)
+
+    def write(self, cycles, received, results, scored_at):
+        rows = []
+        for target, (predictions, confidences) in results.items():
+            for i, (cycle, _) in enumerate(cycles):
+                rows.append((cycle, target, str(predictions[i]),
+                             None if confidences is None else float(confidences[i]),
+                             received[i], scored_at, (scored_at - received[i]) * 1000, len(cycles)))
+        with _connect(self.db_path) as connection:
+            connection.executemany('INSERT INTO live_predictions VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            connection.execute('DELETE FROM live_predictions WHERE rowid <= '
+                               '(SELECT MAX(rowid) FROM live_predictions) - ?',
+                               (MAX_LIVE_CYCLES * len(results),))
+
+
+def recent_predictions(db_path=LIVE_DB, limit=500):
+    """Predictions for the newest `limit` scored cycles, oldest first (empty if nothing streamed yet)"""
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=['cycle', 'target', 'prediction', 'confidence', 'received_at',
+                                     'scored_at', 'latency_ms', 'batch_size'])
+    with _connect(db_path) as connection:
+        frame = pd.read_sql_query(
+            'SELECT * FROM live_predictions WHERE cycle IN ('
+            'SELECT cycle FROM live_predictions GROUP BY cycle ORDER BY MAX(scored_at) DESC LIMIT ?) '
+            'ORDER BY scored_at, cycle', connection, params=(limit,))
+    return frame
+
+
+# Sources: each pushes (arrival time, JSON line) onto the pending queue
+
+def watch_directory(directory, pending, stop, poll_seconds=0.1):
+    """
+    Feed `*.jsonl` files dropped into `directory`, in name order.
+
+    Producers should write to another name and rename into place, so a file
+    is only read once complete. Read files are moved to `processed/`.
+    """
+    processed = os.path.join(directory, 'processed')
+    os.makedirs(processed, exist_ok=True)
+    while not stop.is_set():
+        paths = sorted(glob.glob(os.path.join(directory, '*.jsonl')))
+        for path in paths:
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        pending.put((time.time(), line))
+            os.replace(path, os.path.join(processed, os.path.basename(path)))
+        if not paths:
+            stop.wait(poll_seconds)
+
+
+class _CycleHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.server.pending.put((time.time(), line))
+
+
+class CycleServer(socketserver.ThreadingTCPServer):
+    """Local TCP endpoint accepting newline-delimited cycle messages"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, pending):
+        super().__init__(address, _CycleHandler)
+        self.pending = pending
+
+
+def micro_batches(pending, stop, batch_size=DEFAULT_BATCH_SIZE, max_latency_ms=DEFAULT_MAX_LATENCY_MS):
+    """
+    Group arrivals into batches of at most `batch_size`.
+
+    A batch is released as soon as it is full or its oldest arrival has
+    waited `max_latency_ms`, which bounds the queueing part of the latency.
+    """
+    max_wait = max_latency_ms / 1000
+    while not stop.is_set():
+        try:
+            batch = [pending.get(timeout=0.1)]
+        except queue.Empty:
+            continue
+        deadline = batch[0][0] + max_wait
+        while len(batch) < batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        yield batch
+
+
+def serve(watch=None, port=None, batch_size=DEFAULT_BATCH_SIZE, max_latency_ms=DEFAULT_MAX_LATENCY_MS,
+          align_hz=None, db_path=LIVE_DB, on_batch=None, on_error=None, stop=None):
+    """
+    Score cycles from the watched directory and/or socket until `stop` is set.
+
+    `on_batch` is called with (batch size, slowest latency in ms) after each
+    batch, `on_error` with a message for each cycle that could not be scored.
+    """
+    scorer = LiveScorer(align_hz=align_hz)
+    store = LiveStore(db_path)
+    pending = queue.Queue(maxsize=MAX_PENDING_CYCLES)
+    stop = stop or threading.Event()
+
+    threads = []
+    server = None
+    if watch:
+        threads.append(threading.Thread(target=watch_directory, args=(watch, pending, stop), daemon=True))
+    if port:
+        server = CycleServer(('127.0.0.1', port), pending)
+        threads.append(threading.Thread(target=server.serve_forever, daemon=True))
+    if not threads:
+        raise ValueError("Nothing to serve: give a directory to watch and/or a port")
+    for thread in threads:
+        thread.start()
+
+    try:
+        for batch in micro_batches(pending, stop, batch_size, max_latency_ms):
+            received, cycles = [], []
+            for arrived, line in batch:
+                try:
+                    cycle = parse_cycle(line)
+                    scorer.check(*cycle)
+                except (ValueError, KeyError, TypeError) as e:
+                    if on_error is not None:
+                        on_error(f"Skipped cycle: {e}")
+                    continue
+                received.append(arrived)
+                cycles.append(cycle)
+            if not cycles:
+                continue
+            try:
+                results = scorer.score(cycles)
+            except Exception as e:
+                if on_error is not None:
+                    on_error(f"Skipped {len(cycles)} cycles: scoring failed: {type(e).__name__}: {e}")
+                continue
+            scored_at = time.time()
+            store.write(cycles, received, results, scored_at)
+            if on_batch is not None:
+                on_batch(len(cycles), (scored_at - min(received)) * 1000)
+    finally:
+        stop.set()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+def replay_cycles(store=CYCLE_STORE, limit=None):
+    """
+    (cycle id, signals) for each cycle of an ingestion store, at native sensor rates.
+
+    Stores ingested with --align-hz are resampled back to the native rates,
+    like the rig would send them.
+    """
+    rates = store_rates(store)
+    sent = 0
+    for cycles, signals, _ in iter_cycle_batches(store):
+        signals = {sensor: resample(values, rates[sensor], SENSOR_RATES[sensor])
+                   for sensor, values in signals.items()}
+        for i, cycle in enumerate(cycles):
+            if limit is not None and sent >= limit:
+                return
+            yield cycle, {sensor: values[i] for sensor, values in signals.items()}
+            sent += 1
+
+
+@click.group()
+def main():
+    """Live streaming inference over arriving hydraulic cycles."""
+
+
+@main.command('serve')
+@click.option('--watch', default=None, help='Directory to watch for *.jsonl cycle files.')
+@click.option('--port', default=None, type=int, help=f'Local TCP port to accept cycles on (e.g. {DEFAULT_PORT}).')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help='Largest micro-batch.')
+@click.option('--max-latency-ms', default=DEFAULT_MAX_LATENCY_MS, show_default=True,
+              help='Longest a cycle waits for its batch to fill.')
+@click.option('--align-hz', default=None, type=int,
+              help='Resample every sensor to this rate, matching an aligned ingestion store.')
+def serve_command(watch, port, batch_size, max_latency_ms, align_hz):
+    """Score arriving cycles with every TARGETS model."""
+    if not watch and not port:
+        raise click.UsageError("Give --watch and/or --port")
+    click.echo(f"Scoring cycles from {' and '.join(filter(None, [watch, port and f'127.0.0.1:{port}']))}")
+
+    def report(size, latency_ms):
+        click.echo(f"Scored {size:4d} cycles, slowest end-to-end latency {latency_ms:7.1f} ms")
+
+    def report_error(message):
+        click.echo(message, err=True)
+
+    try:
+        serve(watch, port, batch_size, max_latency_ms, align_hz, on_batch=report, on_error=report_error)
+    except KeyboardInterrupt:
+        click.echo("Stopped")
+
+
+@main.command('replay')
+@click.option('--store', default=CYCLE_STORE, show_default=True, help='Ingestion store to replay.')
+@click.option('--port', default=None, type=int, help='Send cycles to this local port.')
+@click.option('--to-dir', default=None, help='Or drop them as *.jsonl files into this directory.')
+@click.option('--rate', default=10.0, show_default=True, help='Cycles per second (0 = as fast as possible).')
+@click.option('--limit', default=None, type=int, help='Stop after this many cycles.')
+def replay_command(store, port, to_dir, rate, limit):
+    """Emulate the rig by replaying an ingestion store."""
+    if bool(port) == bool(to_dir):
+        raise click.UsageError("Give exactly one of --port and --to-dir")
+    interval = 1.0 / rate if rate > 0 else 0.0
+    connection = socket.create_connection(('127.0.0.1', port)) if port else None
+    sent = 0
+    try:
+        for cycle, signals in replay_cycles(store, limit):
+            line = encode_cycle(cycle, signals) + '\n'
+            if connection is not None:
+                connection.sendall(line.encode())
+            else:
+                path = os.path.join(to_dir, f'cycle-{cycle:08d}.jsonl')
+                with open(f'{path}.tmp', 'w') as f:
+                    f.write(line)
+                os.replace(f'{path}.tmp', path)
+            sent += 1
+            time.sleep(interval)
+    finally:
+        if connection is not None:
+            connection.close()
+    click.echo(f"Replayed {sent} cycles")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,22 +9,14 @@ A comprehensive dashboard to showcase:
 """
 
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import joblib
 import os
-import json
-from datetime import datetime
-import mlflow
-import mlflow.sklearn
-from sklearn.metrics import accuracy_score, f1_score, classification_report, confusion_matrix
-import seaborn as sns
-import matplotlib.pyplot as plt
-import io
-import base64
+import time
+
+import profiler
+from config import TARGETS
+
+# Heavy dependencies (pandas, plotly, sklearn, mlflow, ...) are imported inside
+# the pages and loaders that use them, so the Home page starts and reruns fast.
 
 # Page configuration
 st.set_page_config(
@@ -35,432 +27,180 @@ st.set_page_config(
 )
 
 # Professional Enterprise-Grade CSS Design
-st.markdown("""
-<style>
-    /* Import Professional Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=SF+Pro+Display:wght@300;400;500;600;700;800&family=SF+Mono:wght@400;500;600&display=swap');
-    
-    /* Enterprise Color System */
-    :root {
-        /* Primary Brand Colors */
-        --primary-50: #f0f9ff;
-        --primary-100: #e0f2fe;
-        --primary-200: #bae6fd;
-        --primary-300: #7dd3fc;
-        --primary-400: #38bdf8;
-        --primary-500: #0ea5e9;
-        --primary-600: #0284c7;
-        --primary-700: #0369a1;
-        --primary-800: #075985;
-        --primary-900: #0c4a6e;
-        
-        /* Neutral Colors */
-        --gray-50: #f8fafc;
-        --gray-100: #f1f5f9;
-        --gray-200: #e2e8f0;
-        --gray-300: #cbd5e1;
-        --gray-400: #94a3b8;
-        --gray-500: #64748b;
-        --gray-600: #475569;
-        --gray-700: #334155;
-        --gray-800: #1e293b;
-        --gray-900: #0f172a;
-        
-        /* Semantic Colors */
-        --success-500: #10b981;
-        --success-100: #d1fae5;
-        --warning-500: #f59e0b;
-        --warning-100: #fef3c7;
-        --error-500: #ef4444;
-        --error-100: #fee2e2;
-        
-        /* Typography */
-        --font-primary: 'SF Pro Display', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-        --font-mono: 'SF Mono', 'Monaco', 'Inconsolata', 'Roboto Mono', monospace;
-        
-        /* Spacing System */
-        --space-1: 0.25rem;
-        --space-2: 0.5rem;
-        --space-3: 0.75rem;
-        --space-4: 1rem;
-        --space-5: 1.25rem;
-        --space-6: 1.5rem;
-        --space-8: 2rem;
-        --space-10: 2.5rem;
-        --space-12: 3rem;
-        --space-16: 4rem;
-        
-        /* Border Radius */
-        --radius-sm: 0.375rem;
-        --radius-md: 0.5rem;
-        --radius-lg: 0.75rem;
-        --radius-xl: 1rem;
-        --radius-2xl: 1.5rem;
-        
-        /* Shadows */
-        --shadow-xs: 0 1px 2px 0 rgba(0, 0, 0, 0.05);
-        --shadow-sm: 0 1px 3px 0 rgba(0, 0, 0, 0.1), 0 1px 2px 0 rgba(0, 0, 0, 0.06);
-        --shadow-md: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-        --shadow-lg: 0 10px 15px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
-        --shadow-xl: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
-        --shadow-2xl: 0 25px 50px -12px rgba(0, 0, 0, 0.25);
-    }
-    
-    /* Global Application Styles */
-    .stApp {
-        background: var(--gray-50);
-        font-family: var(--font-primary);
-        line-height: 1.6;
-        color: var(--gray-800);
-    }
-    
-    /* Hide Streamlit branding for professional look */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    .stDeployButton {display: none;}
-    
-    /* Professional Layout */
-    .main .block-container {
-        padding: var(--space-8) var(--space-6);
-        max-width: 1400px;
-        margin: 0 auto;
-    }
-    
-    /* Sidebar Professional Styling */
-    .css-1d391kg {
-        background: var(--gray-900);
-        border-right: 1px solid var(--gray-200);
-    }
-    
-    .css-1d391kg .css-1v0mbdj {
-        color: var(--gray-100);
-    }
-    
-    .css-1d391kg .stSelectbox > div > div {
-        background: var(--gray-800);
-        border: 1px solid var(--gray-600);
-        color: var(--gray-100);
-    }
-    
-    /* Professional Header */
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: 800;
-        color: var(--gray-900);
-        text-align: center;
-        margin-bottom: var(--space-12);
-        letter-spacing: -0.025em;
-        font-family: var(--font-primary);
-        position: relative;
-    }
-    
-    .main-header::after {
-        content: '';
-        position: absolute;
-        bottom: -var(--space-4);
-        left: 50%;
-        transform: translateX(-50%);
-        width: 80px;
-        height: 4px;
-        background: linear-gradient(90deg, var(--primary-500), var(--primary-600));
-        border-radius: var(--radius-sm);
-    }
-    
-    /* Professional Section Headers */
-    .section-header {
-        font-size: 1.5rem;
-        font-weight: 700;
-        color: var(--gray-800);
-        margin: var(--space-12) 0 var(--space-8) 0;
-        font-family: var(--font-primary);
-        letter-spacing: -0.01em;
-        position: relative;
-        padding-left: var(--space-6);
-    }
-    
-    .section-header::before {
-        content: '';
-        position: absolute;
-        left: 0;
-        top: 50%;
-        transform: translateY(-50%);
-        width: 4px;
-        height: 24px;
-        background: var(--primary-500);
-        border-radius: var(--radius-sm);
-    }
-    
-    /* Professional Metric Cards */
-    .metric-card {
-        background: var(--gray-50);
-        padding: var(--space-8);
-        border-radius: var(--radius-xl);
-        border: 1px solid var(--gray-200);
-        box-shadow: var(--shadow-sm);
-        transition: all 0.2s ease;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .metric-card:hover {
-        box-shadow: var(--shadow-lg);
-        border-color: var(--primary-200);
-        transform: translateY(-2px);
-    }
-    
-    .metric-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 3px;
-        background: var(--primary-500);
-    }
-    
-    .metric-card h3 {
-        font-size: 0.75rem;
-        font-weight: 600;
-        color: var(--gray-500);
-        margin: 0 0 var(--space-3) 0;
-        text-transform: uppercase;
-        letter-spacing: 0.05em;
-        font-family: var(--font-primary);
-    }
-    
-    .metric-card h2 {
-        font-size: 2.25rem;
-        font-weight: 800;
-        color: var(--gray-900);
-        margin: 0;
-        font-family: var(--font-primary);
-        line-height: 1.1;
-    }
-    
-    .metric-card p {
-        font-size: 0.875rem;
-        color: var(--gray-600);
-        margin: var(--space-2) 0 0 0;
-        font-weight: 500;
-    }
-    
-    .success-metric::before {
-        background: var(--success-500);
-    }
-    
-    .warning-metric::before {
-        background: var(--warning-500);
-    }
-    
-    .info-metric::before {
-        background: var(--primary-500);
-    }
-    
-    /* Professional Info Boxes */
-    .info-box {
-        background: var(--gray-50);
-        padding: var(--space-8);
-        border-radius: var(--radius-xl);
-        border: 1px solid var(--gray-200);
-        box-shadow: var(--shadow-sm);
-        margin: var(--space-6) 0;
-        transition: all 0.2s ease;
-    }
-    
-    .info-box:hover {
-        box-shadow: var(--shadow-md);
-        border-color: var(--primary-200);
-    }
-    
-    .info-box h3 {
-        color: var(--gray-800);
-        font-size: 1.125rem;
-        font-weight: 700;
-        margin: 0 0 var(--space-4) 0;
-        font-family: var(--font-primary);
-    }
-    
-    .info-box h4 {
-        color: var(--gray-800);
-        font-size: 1rem;
-        font-weight: 600;
-        margin: var(--space-6) 0 var(--space-3) 0;
-        font-family: var(--font-primary);
-    }
-    
-    .info-box p {
-        color: var(--gray-600);
-        line-height: 1.6;
-        margin: var(--space-3) 0;
-        font-size: 0.875rem;
-    }
-    
-    .info-box ul {
-        color: var(--gray-600);
-        line-height: 1.6;
-        font-size: 0.875rem;
-    }
-    
-    /* Professional Sensor Cards */
-    .sensor-card {
-        background: var(--gray-50);
-        padding: var(--space-6);
-        border-radius: var(--radius-lg);
-        border: 1px solid var(--gray-200);
-        box-shadow: var(--shadow-sm);
-        margin: var(--space-3) 0;
-        text-align: center;
-        transition: all 0.2s ease;
-    }
-    
-    .sensor-card:hover {
-        box-shadow: var(--shadow-md);
-        border-color: var(--primary-200);
-        transform: translateY(-1px);
-    }
-    
-    .sensor-card h3 {
-        font-size: 1rem;
-        font-weight: 700;
-        color: var(--gray-800);
-        margin: 0 0 var(--space-3) 0;
-        font-family: var(--font-primary);
-    }
-    
-    .sensor-card p {
-        font-size: 0.875rem;
-        color: var(--gray-600);
-        margin: var(--space-2) 0;
-        line-height: 1.5;
-        font-weight: 500;
-    }
-    
-    /* Professional Tab Styling */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: var(--space-1);
-        background: var(--gray-100);
-        border-radius: var(--radius-lg);
-        padding: var(--space-2);
-        border: 1px solid var(--gray-200);
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        height: 44px;
-        white-space: pre-wrap;
-        background: transparent;
-        border-radius: var(--radius-md);
-        padding: 0 var(--space-4);
-        font-weight: 600;
-        color: var(--gray-600);
-        transition: all 0.2s ease;
-        font-family: var(--font-primary);
-        font-size: 0.875rem;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background: var(--gray-50);
-        color: var(--primary-600);
-        box-shadow: var(--shadow-sm);
-        border: 1px solid var(--primary-200);
-    }
-    
-    /* Professional Button Styling */
-    .stButton > button {
-        background: var(--primary-600);
-        color: white;
-        border: none;
-        border-radius: var(--radius-md);
-        font-weight: 600;
-        transition: all 0.2s ease;
-        box-shadow: var(--shadow-sm);
-        font-family: var(--font-primary);
-        font-size: 0.875rem;
-        padding: var(--space-3) var(--space-6);
-    }
-    
-    .stButton > button:hover {
-        background: var(--primary-700);
-        box-shadow: var(--shadow-md);
-        transform: translateY(-1px);
-    }
-    
-    /* Professional Selectbox Styling */
-    .stSelectbox > div > div {
-        background: var(--gray-50);
-        border: 1px solid var(--gray-300);
-        border-radius: var(--radius-md);
-        transition: all 0.2s ease;
-    }
-    
-    .stSelectbox > div > div:hover {
-        border-color: var(--primary-300);
-        box-shadow: var(--shadow-sm);
-    }
-    
-    /* Professional Scrollbar */
-    ::-webkit-scrollbar {
-        width: 6px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: var(--gray-100);
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: var(--gray-400);
-        border-radius: var(--radius-sm);
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: var(--gray-500);
-    }
-</style>
-""", unsafe_allow_html=True)
+@profiler.cache(st.cache_resource)
+def load_css():
+    """Dashboard stylesheet, read from disk once per server process"""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'styles', 'dashboard.css')) as f:
+        return f"<style>\n{f.read()}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # Title
 st.markdown('<h1 class="main-header">🔧 Hydraulic System Monitoring Dashboard</h1>', unsafe_allow_html=True)
 
-# Sidebar
-st.sidebar.title("🎛️ Navigation")
-page = st.sidebar.selectbox(
-    "Choose a page",
-    ["🏠 Home", "📊 Overview", "🎯 Model Performance", "⚡ Optimization Results", "🔍 Model Analysis", "🚀 Deployment"]
-)
-
-# Load data function
-@st.cache_data
-def load_data():
-    """Load the hydraulic system dataset"""
+# Dataset fingerprint function
+def dataset_fingerprint():
+    """Fingerprint of the hydraulic system dataset, or None if it is missing"""
+    import data_store
+    
     try:
-        df = pd.read_csv('full_df.csv')
-        return df
+        return data_store.source_fingerprint()
     except FileNotFoundError:
-        st.error("Dataset 'full_df.csv' not found. Please ensure the file is in the current directory.")
         return None
 
+# Load data function
+@profiler.cache(st.cache_resource)
+def load_data(fingerprint, columns=None):
+    """
+    Load the hydraulic system dataset from the columnar store, projected to `columns`.
+
+    Cached as a resource so every session shares the same read-only,
+    memory-mapped frame instead of receiving its own copy.
+    """
+    if fingerprint is None:
+        st.error("Dataset not found. Please add full_df.csv (or a partitioned dataset/ directory) to the current directory.")
+        return None
+    import data_store
+    
+    return data_store.load_columns(columns)
+
+# Dataset columns function
+@profiler.cache(st.cache_data)
+def load_columns(fingerprint):
+    """List dataset columns from the store schema without reading any data"""
+    if fingerprint is None:
+        return []
+    import data_store
+    
+    return data_store.store_columns()
+
+# Dataset profile function
+@profiler.cache(st.cache_data)
+def load_dataset_profile(fingerprint):
+    """Shape, column statistics and target classes of the dataset, from its profile sidecar"""
+    if fingerprint is None:
+        st.error("Dataset not found. Please add full_df.csv (or a partitioned dataset/ directory) to the current directory.")
+        return None
+    import dataset_profile
+    
+    return dataset_profile.cached_profile()
+
+# Feature ranking function
+@profiler.cache(st.cache_data)
+def load_feature_ranking(fingerprint, target, columns):
+    """Rank `columns` against `target` (Pearson, ANOVA F, mutual information), cached per target"""
+    import data_store
+    import feature_ranking
+    
+    columns = [c for c in columns if c != target]
+    df = data_store.load_columns(columns + [target])
+    return feature_ranking.cached_ranking(df[columns], df[target], target, fingerprint)
+
+# Model cache function
+@profiler.cache(st.cache_resource)
+def get_model_cache():
+    """Loaded models shared by every session, within the MODEL_CACHE_MB budget"""
+    import model_store
+    from config import MODEL_CACHE_MB
+    
+    return model_store.ModelCache(MODEL_CACHE_MB * 1024 ** 2)
+
 # Load model function
-@st.cache_resource
 def load_model(target):
-    """Load trained model for a specific target"""
-    model_path = f'models/best_model_{target.lower()}.pkl'
-    if os.path.exists(model_path):
-        return joblib.load(model_path)
-    return None
+    """Load trained model for a specific target (reloaded when the artifact changes)"""
+    import model_store
+    
+    return get_model_cache().get(model_store.model_path(target), 'base')
 
 # Load optimized model function
-@st.cache_resource
 def load_optimized_model(target):
-    """Load optimized model for a specific target"""
-    model_path = f'optimized_models/optimized_model_{target.lower()}.pkl'
-    if os.path.exists(model_path):
-        return joblib.load(model_path)
-    return None
+    """Load optimized model for a specific target (reloaded when the artifact changes)"""
+    import model_store
+    
+    return get_model_cache().get(model_store.optimized_model_path(target), 'optimized')
 
-# TARGETS
-TARGETS = ['Cooler_Cond', 'Valve_Cond', 'Pump_Leak', 'Accumulator_Press']
+# Feature importance function
+@profiler.cache(st.cache_data)
+def load_feature_importance(target, model_hash, fingerprint, columns):
+    """Cached or native importances of the model for `target`; None when permutation importance is needed"""
+    import importance
+    
+    return importance.quick_importance(load_model(target), columns, model_hash, fingerprint)
+
+# Measured metrics function
+@profiler.cache(st.cache_data, ttl=30)
+def load_latest_metrics(target=None, variant=None, kinds=None):
+    """Latest recorded model metrics, re-read from the metrics store every 30 seconds"""
+    import metrics_store
+    
+    return metrics_store.MetricsStore().latest(target, kind=kinds, variant=variant)
+
+# Benchmark history function
+@profiler.cache(st.cache_data, ttl=30)
+def load_benchmark_history(target=None):
+    """Recorded benchmark metrics, re-read from the metrics store every 30 seconds"""
+    import benchmark
+    
+    return benchmark.benchmark_history(target)
+
+# Correlation index function
+@profiler.cache(st.cache_resource)
+def load_correlation_index(path):
+    """Memory-mapped correlation index, opened once per server process"""
+    import correlation_index
+    
+    return correlation_index.load(path)
+
+# Job queue function
+@profiler.cache(st.cache_resource)
+def get_job_queue():
+    """Background job queue shared by every session of this server process"""
+    import jobs
+    
+    return jobs.JobQueue()
 
-if page == "🏠 Home":
+# Job result function
+@profiler.cache(st.cache_resource)
+def load_job_result(job_id):
+    """Result of a finished job; results never change once written"""
+    return get_job_queue().result(job_id)
+
+# Background job polling
+JOB_POLL_SECONDS = 1.5
+
+def request_poll():
+    """Rerun the page after it renders, to pick up background job progress"""
+    st.session_state['poll_jobs'] = True
+
+def background_job(kind, **params):
+    """
+    (status, outcome) of a background job, submitting it if no identical job exists.
+
+    The outcome is the job's result once it succeeded, its error text if it
+    failed, and the job record while it is queued or running.
+    """
+    import jobs
+    
+    queue = get_job_queue()
+    with profiler.stage(f'job:{kind}', kind='job') as span:
+        job = queue.status(queue.find_or_submit(kind, **params))
+        span['status'] = job['status']
+    if job['status'] == 'succeeded':
+        return job['status'], load_job_result(job['id'])
+    if job['status'] in jobs.ACTIVE_STATUSES:
+        request_poll()
+        return job['status'], job
+    return job['status'], job['error'] or job['status']
+
+# Plotly chart function
+def plotly_chart(fig, **kwargs):
+    """st.plotly_chart, timed as the 'plotly_chart' stage (figure serialization dominates it)"""
+    with profiler.stage('plotly_chart'):
+        st.plotly_chart(fig, **kwargs)
+
+# Home page
+def render_home():
+    """Home page: system architecture, sensors and condition targets"""
     st.markdown('<h2 class="section-header">🏭 Hydraulic System Architecture</h2>', unsafe_allow_html=True)
     
     # Display hydraulic system image
@@ -612,19 +352,115 @@ if page == "🏠 Home":
     </div>
     """, unsafe_allow_html=True)
 
-elif page == "📊 Overview":
+
+# Correlation explorer
+def render_correlation_explorer(index):
+    """Clustered correlation heatmap plus top-pair, neighbour and cluster queries against `index`"""
+    import plotly.express as px
+    import downsampling
+    
+    view = "Clustered blocks"
+    if index.block_size > 1:
+        view = st.radio("Reduce wide matrix by", ["Clustered blocks", "Top-k features"], horizontal=True,
+                        key='corr_view')
+    if view == "Top-k features":
+        k = st.slider("Features", 10, downsampling.DEFAULT_MAX_CELLS, 50, key='corr_top_k')
+        with profiler.stage('correlation_query'):
+            features = index.top_features(k)
+        fig = px.imshow(index.submatrix(features),
+                        title=f"{len(features)} most strongly correlated features (hierarchically clustered)",
+                        color_continuous_scale='RdBu_r', zmin=-1, zmax=1, aspect='auto')
+        plotly_chart(fig, use_container_width=True)
+        st.caption(f"{len(features)} of {len(index):,} features, ranked by their strongest correlation "
+                   "with any other feature.")
+    else:
+        overview, blocks = index.overview()
+        fig = px.imshow(overview, 
+                      title="Feature Correlation Matrix (hierarchically clustered)",
+                      color_continuous_scale='RdBu_r',
+                      zmin=-1, zmax=1,
+                      aspect='auto')
+        plotly_chart(fig, use_container_width=True)
+    
+    if view == "Clustered blocks" and index.block_size > 1:
+        st.caption(f"{len(index):,} features in clustered order, shown as {len(blocks)} × {len(blocks)} blocks; "
+                   "each cell is the strongest correlation in its block.")
+        # Drill down into one block at full resolution
+        with st.expander("🔍 Drill down into a block"):
+            col1, col2 = st.columns(2)
+            with col1:
+                row_block = st.selectbox("Rows", list(blocks))
+            with col2:
+                col_block = st.selectbox("Columns", list(blocks))
+            fig = px.imshow(index.submatrix(blocks[row_block], blocks[col_block]),
+                            color_continuous_scale='RdBu_r', zmin=-1, zmax=1, aspect='auto')
+            plotly_chart(fig, use_container_width=True)
+    
+    tab1, tab2, tab3 = st.tabs(["🔝 Top Pairs", "🧭 Neighbours", "🧩 Clusters"])
+    
+    with tab1:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            k = st.slider("Pairs", 5, 200, 20, key='corr_pairs_k')
+        with col2:
+            min_abs = st.slider("Minimum |r|", 0.0, 1.0, 0.0, step=0.05, key='corr_pairs_min')
+        with col3:
+            sign = st.selectbox("Direction", ["Any", "Positive", "Negative"], key='corr_pairs_sign')
+        with profiler.stage('correlation_query'):
+            pairs = index.top_pairs(k, min_abs, None if sign == "Any" else sign.lower())
+        st.dataframe(pairs, use_container_width=True)
+    
+    with tab2:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            feature = st.selectbox("Feature", index.columns, key='corr_neighbour_feature')
+        with col2:
+            k = st.slider("Neighbours", 5, 50, 15, key='corr_neighbour_k')
+        with profiler.stage('correlation_query'):
+            neighbours = index.neighbours(feature, k)
+        fig = px.bar(neighbours, x='Correlation', y='Feature', orientation='h', range_x=[-1, 1],
+                     title=f'Features most correlated with {feature}')
+        fig.update_yaxes(autorange='reversed')
+        plotly_chart(fig, use_container_width=True)
+    
+    with tab3:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            feature = st.selectbox("Feature", index.columns, key='corr_cluster_feature')
+        with col2:
+            min_abs = st.slider("Cluster |r| ≥", 0.3, 0.99, 0.8, step=0.01, key='corr_cluster_min')
+        with profiler.stage('correlation_query'):
+            sizes = index.clusters(min_abs).value_counts()
+            members = index.cluster_members(feature, min_abs)
+        st.caption(f"{len(sizes):,} clusters at average |r| ≥ {min_abs:.2f}; {(sizes > 1).sum():,} have more "
+                   f"than one feature. {feature}'s cluster has {len(members)}.")
+        matrix = index.submatrix(members)
+        if len(members) > downsampling.DEFAULT_MAX_CELLS:
+            matrix = downsampling.block_aggregate(matrix)[0]
+        fig = px.imshow(matrix, color_continuous_scale='RdBu_r', zmin=-1, zmax=1, aspect='auto',
+                        title=f"Cluster of {feature}")
+        plotly_chart(fig, use_container_width=True)
+
+# Overview page
+def render_overview():
+    """Overview page: dataset summary, target distribution and feature correlation"""
+    import pandas as pd
+    import plotly.express as px
+    
     st.markdown('<h2 class="section-header">📊 System Overview</h2>', unsafe_allow_html=True)
     
-    # Load data
-    df = load_data()
-    if df is not None:
+    # Dataset profile: computed once per dataset version, so no data is read here
+    fingerprint = dataset_fingerprint()
+    profile = load_dataset_profile(fingerprint)
+    if profile is not None:
+        numeric_cols = profile['numeric_columns']
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
             st.markdown(f"""
             <div class="metric-card success-metric">
             <h3>📊 Total Samples</h3>
-            <h2>{len(df):,}</h2>
+            <h2>{profile['rows']:,}</h2>
             <p>Hydraulic cycles</p>
             </div>
             """, unsafe_allow_html=True)
@@ -633,7 +469,7 @@ elif page == "📊 Overview":
             st.markdown(f"""
             <div class="metric-card info-metric">
             <h3>🔧 Features</h3>
-            <h2>{df.select_dtypes(include=[np.number]).shape[1]}</h2>
+            <h2>{len(numeric_cols)}</h2>
             <p>Sensor measurements</p>
             </div>
             """, unsafe_allow_html=True)
@@ -648,11 +484,12 @@ elif page == "📊 Overview":
             """, unsafe_allow_html=True)
         
         with col4:
-            st.markdown("""
-            <div class="metric-card success-metric">
+            missing = profile['missing_values']
+            st.markdown(f"""
+            <div class="metric-card {'success-metric' if missing == 0 else 'warning-metric'}">
             <h3>✅ Data Quality</h3>
-            <h2>100%</h2>
-            <p>No missing values</p>
+            <h2>{profile['data_quality']:.1%}</h2>
+            <p>{"No missing values" if missing == 0 else f"{missing:,} missing values"}</p>
             </div>
             """, unsafe_allow_html=True)
         
@@ -661,61 +498,78 @@ elif page == "📊 Overview":
         col1, col2 = st.columns(2)
         
         with col1:
-            st.write("**Dataset Shape:**", df.shape)
-            st.write("**Memory Usage:**", f"{df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
-            st.write("**Missing Values:**", df.isnull().sum().sum())
+            st.write("**Dataset Shape:**", (profile['rows'], len(profile['columns'])))
+            st.write("**Memory Usage:**", f"{profile['memory_bytes'] / 1024**2:.2f} MB")
+            st.write("**Missing Values:**", missing)
         
         with col2:
             st.write("**Data Types:**")
-            st.write(df.dtypes.value_counts())
+            st.write(pd.Series(profile['dtype_counts'], name='count'))
+        
+        with st.expander("📐 Column Statistics"):
+            st.dataframe(pd.DataFrame(profile['columns']).drop(columns='classes', errors='ignore')
+                         .set_index('name'), use_container_width=True)
         
         # Target distribution
         st.subheader("🎯 Target Distribution")
         target_data = []
         for target in TARGETS:
-            if target in df.columns:
-                unique_vals = df[target].value_counts()
-                for val, count in unique_vals.items():
-                    target_data.append({
-                        'Target': target,
-                        'Class': str(val),
-                        'Count': count,
-                        'Percentage': (count / len(df)) * 100
-                    })
+            for entry in profile['targets'].get(target, []):
+                target_data.append({
+                    'Target': target,
+                    'Class': str(entry['value']),
+                    'Count': entry['count'],
+                    'Percentage': (entry['count'] / profile['rows']) * 100
+                })
         
         if target_data:
             target_df = pd.DataFrame(target_data)
             fig = px.bar(target_df, x='Target', y='Count', color='Class', 
                         title='Distribution of Target Classes',
                         hover_data=['Percentage'])
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
         
-        # Feature correlation heatmap
+        # Feature correlation explorer, answered from a precomputed clustered index
         st.subheader("🔥 Feature Correlation")
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
         if len(numeric_cols) > 1:
-            corr_matrix = df[numeric_cols].corr()
+            corr_status, corr_outcome = background_job('correlation_index', fingerprint=fingerprint,
+                                                       columns=list(numeric_cols))
             
-            # Create heatmap
-            fig = px.imshow(corr_matrix, 
-                          title="Feature Correlation Matrix",
-                          color_continuous_scale='RdBu_r',
-                          aspect='auto')
-            st.plotly_chart(fig, use_container_width=True)
+            if corr_status == 'succeeded':
+                render_correlation_explorer(load_correlation_index(corr_outcome))
+            elif corr_status == 'failed':
+                st.error(f"❌ Correlation computation failed: {corr_outcome.strip().splitlines()[0]}")
+                if st.button("🔁 Retry Correlation"):
+                    get_job_queue().submit('correlation_index', fingerprint=fingerprint,
+                                           columns=list(numeric_cols))
+                    st.rerun()
+            else:
+                st.info("⏳ Computing and clustering the correlation matrix in the background...")
 
-elif page == "🎯 Model Performance":
-    st.header("🎯 Model Performance Analysis")
+
+# Model Performance page
+def render_model_performance():
+    """Model Performance page: metrics per target"""
+    import pandas as pd
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
     
-    # Model performance data (from your training results)
-    performance_data = {
-        'Target': ['Cooler_Cond', 'Valve_Cond', 'Pump_Leak', 'Accumulator_Press'],
-        'Accuracy': [1.0000, 0.9887, 0.9932, 1.0000],
-        'F1_Macro': [1.0000, 0.9851, 0.9909, 1.0000],
-        'CV_Mean': [0.9983, 0.9909, 0.9960, 0.9938],
-        'Status': ['Perfect', 'Excellent', 'Excellent', 'Perfect']
-    }
+    st.header("🎯 Model Performance Analysis")
     
-    perf_df = pd.DataFrame(performance_data)
+    # Latest measured metrics of each target's model; evaluation runs win over scoring passes
+    # Benchmark runs share the 'base' variant but record no accuracy
+    latest = load_latest_metrics(variant='base', kinds=('evaluation', 'scoring'))
+    if latest.empty:
+        st.info("No model metrics have been recorded yet. Measure the trained models with:")
+        st.code("python metrics_store.py evaluate --cv 5", language="bash")
+        return
+    latest = latest.assign(_rank=(latest['Kind'] != 'evaluation'))
+    latest = latest.sort_values(['_rank', 'Recorded_At'], ascending=[True, False]).drop_duplicates('Target')
+    perf_df = latest.reindex(columns=['Target', 'accuracy', 'f1_macro', 'cv_mean', 'Kind', 'Recorded_At'])
+    perf_df.columns = ['Target', 'Accuracy', 'F1_Macro', 'CV_Mean', 'Source', 'Recorded_At']
+    perf_df['Status'] = pd.cut(perf_df['Accuracy'], [0, 0.95, 0.98, 1, 2], right=False,
+                               labels=['Needs attention', 'Good', 'Excellent', 'Perfect']).astype(str)
+    perf_df = perf_df.sort_values('Target', ignore_index=True)
     
     # Performance metrics
     st.subheader("📈 Performance Metrics")
@@ -731,11 +585,14 @@ elif page == "🎯 Model Performance":
     
     with col3:
         avg_cv = perf_df['CV_Mean'].mean()
-        st.metric("Average CV Score", f"{avg_cv:.4f}", delta=f"{avg_cv-0.95:.4f}")
+        if pd.notna(avg_cv):
+            st.metric("Average CV Score", f"{avg_cv:.4f}", delta=f"{avg_cv-0.95:.4f}")
+        else:
+            st.metric("Average CV Score", "n/a", help="Run `python metrics_store.py evaluate` to cross-validate")
     
     with col4:
         perfect_models = len(perf_df[perf_df['Accuracy'] == 1.0])
-        st.metric("Perfect Models", f"{perfect_models}/4", delta=f"{perfect_models-2}")
+        st.metric("Perfect Models", f"{perfect_models}/{len(perf_df)}", delta=f"{perfect_models-2}")
     
     # Performance comparison chart
     st.subheader("📊 Model Performance Comparison")
@@ -767,7 +624,7 @@ elif page == "🎯 Model Performance":
     )
     
     fig.update_layout(height=400, showlegend=False, title_text="Performance Metrics by Target")
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig, use_container_width=True)
     
     # Detailed performance table
     st.subheader("📋 Detailed Performance Table")
@@ -798,15 +655,23 @@ elif page == "🎯 Model Performance":
         polar=dict(
             radialaxis=dict(
                 visible=True,
-                range=[95, 100]
+                range=[min(95, int(radar_data[['Accuracy', 'F1_Macro', 'CV_Mean']].min().min())), 100]
             )),
         showlegend=True,
         title="Performance Radar Chart"
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig, use_container_width=True)
 
-elif page == "⚡ Optimization Results":
+
+# Optimization Results page
+def render_optimization():
+    """Optimization Results page: strategies and background tuning runs"""
+    import json
+    import pandas as pd
+    import plotly.express as px
+    import jobs
+    
     st.header("⚡ Model Optimization Results")
     
     st.info("🚀 This section shows the results of advanced optimization techniques including hyperparameter tuning, feature selection, and ensemble methods.")
@@ -858,30 +723,47 @@ elif page == "⚡ Optimization Results":
         cv_folds = st.slider("CV Folds", 3, 10, 5)
     
     if st.button("🎯 Start Optimization", type="primary"):
-        with st.spinner("Running optimization... This may take several minutes."):
-            # Here you would run the optimization script
-            st.success("Optimization completed! Check the results below.")
-            
-            # Simulated optimization results
-            st.subheader("📊 Optimization Results")
-            
-            # Create sample results
-            optimization_results = {
-                'Model': ['RandomForest', 'GradientBoosting', 'ExtraTrees', 'Ensemble'],
-                'CV_Score': [0.9983, 0.9965, 0.9978, 0.9991],
-                'Test_Accuracy': [1.0000, 0.9950, 0.9980, 1.0000],
-                'Improvement': ['+0.0%', '+0.5%', '+0.2%', '+0.1%']
-            }
-            
-            opt_df = pd.DataFrame(optimization_results)
+        st.session_state['optimization_job'] = get_job_queue().submit(
+            'optimization', target=target_opt, strategy=strategy, cv_folds=cv_folds)
+    
+    # Optimization runs as a background job, so reruns and other sessions never block on it
+    optimization_job = st.session_state.get('optimization_job')
+    job = get_job_queue().status(optimization_job) if optimization_job else None
+    if job is not None:
+        job_params = json.loads(job['params'])
+        st.subheader("📊 Optimization Results")
+        
+        # Trial results streamed by the job as each search completes
+        trial_rows = [payload for _, payload in get_job_queue().events(job['id'])]
+        if trial_rows:
+            opt_df = pd.DataFrame(trial_rows)[['Model', 'Strategy', 'CV_Score', 'Test_Accuracy',
+                                               'Improvement', 'Fit_Time']]
             st.dataframe(opt_df, use_container_width=True)
             
             # Optimization comparison chart
             fig = px.bar(opt_df, x='Model', y='CV_Score', 
-                        title=f'Optimization Results for {target_opt}',
+                        title=f"Optimization Results for {job_params['target']}",
                         color='CV_Score',
                         color_continuous_scale='Viridis')
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
+        
+        if job['status'] in jobs.ACTIVE_STATUSES:
+            st.progress(job['progress'], text=f"Running optimization for {job_params['target']}... "
+                                               f"{job['message'] or job['status']}")
+            if st.button("⏹️ Cancel Optimization"):
+                get_job_queue().cancel(job['id'])
+            request_poll()
+        elif job['status'] == 'succeeded':
+            # The model cache picks up the new optimized artifact by its content hash
+            summary = load_job_result(job['id'])
+            st.success(f"Optimization completed! Best model: {summary['winner']['Model']} "
+                       f"(CV {summary['winner']['CV_Score']:.4f}), saved to {summary['path']}")
+        elif job['status'] == 'cancelled':
+            st.warning("⏹️ Optimization cancelled.")
+        else:
+            st.error(f"❌ Optimization failed: {job['error'].strip().splitlines()[0]}")
+            with st.expander("🔍 Debug Information"):
+                st.code(job['error'])
     
     # Optimization tips
     st.subheader("💡 Optimization Tips")
@@ -898,22 +780,42 @@ elif page == "⚡ Optimization Results":
     for tip in tips:
         st.markdown(tip)
 
-elif page == "🔍 Model Analysis":
+
+# Model Analysis page
+def render_model_analysis():
+    """Model Analysis page: predictions, importance and feature-target ranking for one target"""
+    import numpy as np
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    import model_store
+    
     st.header("🔍 Deep Model Analysis")
     
     # Select target for analysis
     target_analysis = st.selectbox("Select Target for Analysis", TARGETS)
     
-    # Load data
-    df = load_data()
+    # Load only the columns this page needs from the columnar store
+    fingerprint = dataset_fingerprint()
+    dataset_columns = load_columns(fingerprint)
+    
+    # For prediction, we need to match the exact features the model was trained with
+    # First, try to load the model to see what features it expects
+    model = load_model(target_analysis)
+    if model is not None and hasattr(model, 'feature_names_in_'):
+        needed_columns = [f for f in model.feature_names_in_ if f in dataset_columns]
+        if target_analysis in dataset_columns and target_analysis not in needed_columns:
+            needed_columns.append(target_analysis)
+        df = load_data(fingerprint, tuple(needed_columns))
+    else:
+        df = load_data(fingerprint)
+    
     if df is not None and target_analysis in df.columns:
         
         # Prepare data
         y = df[target_analysis]
         
-        # For prediction, we need to match the exact features the model was trained with
-        # First, try to load the model to see what features it expects
-        model = load_model(target_analysis)
         if model is not None and hasattr(model, 'feature_names_in_'):
             # Use the exact features the model was trained with
             expected_features = list(model.feature_names_in_)
@@ -921,7 +823,8 @@ elif page == "🔍 Model Analysis":
             
             if len(available_features) == len(expected_features):
                 # All expected features are available
-                X = df[expected_features].select_dtypes(include=[np.number])
+                with profiler.stage('select_dtypes'):
+                    X = df[expected_features].select_dtypes(include=[np.number])
             else:
                 # Some features are missing, show warning and use available ones
                 missing_features = [f for f in expected_features if f not in df.columns]
@@ -934,11 +837,13 @@ elif page == "🔍 Model Analysis":
                     st.info("This suggests the model was trained incorrectly. The target variable should not be used as a feature.")
                     st.stop()
                 
-                X = df[available_features].select_dtypes(include=[np.number])
+                with profiler.stage('select_dtypes'):
+                    X = df[available_features].select_dtypes(include=[np.number])
         else:
             # Fallback: remove all targets from features, including the current target
             targets_to_remove = [t for t in TARGETS if t in df.columns]
-            X = df.drop(columns=targets_to_remove).select_dtypes(include=[np.number])
+            with profiler.stage('select_dtypes'):
+                X = df.drop(columns=targets_to_remove).select_dtypes(include=[np.number])
         
         # Data distribution
         st.subheader("📊 Data Distribution Analysis")
@@ -950,18 +855,34 @@ elif page == "🔍 Model Analysis":
             target_counts = y.value_counts()
             fig = px.pie(values=target_counts.values, names=target_counts.index,
                         title=f'{target_analysis} Distribution')
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
         
         with col2:
-            # Feature importance (simulated)
-            feature_importance = pd.DataFrame({
-                'Feature': X.columns[:10],  # Top 10 features
-                'Importance': np.random.random(10)
-            }).sort_values('Importance', ascending=True)
-            
-            fig = px.bar(feature_importance, x='Importance', y='Feature',
-                        orientation='h', title='Top 10 Feature Importance')
-            st.plotly_chart(fig, use_container_width=True)
+            # Feature importance from the trained model
+            if model is not None:
+                model_hash = model_store.artifact_hash(model_store.model_path(target_analysis))
+                feature_importance = load_feature_importance(target_analysis, model_hash,
+                                                             fingerprint, tuple(X.columns))
+                if feature_importance is None:
+                    # No native importances: permutation importance runs in a shared background job
+                    importance_status, importance_outcome = background_job(
+                        'importance', target=target_analysis, model_hash=model_hash,
+                        fingerprint=fingerprint, columns=list(X.columns))
+                    if importance_status == 'succeeded':
+                        feature_importance = importance_outcome
+                    elif importance_status == 'failed':
+                        st.warning(f"⚠️ Feature importance unavailable: {importance_outcome.strip().splitlines()[0]}")
+                    else:
+                        st.info("⏳ Computing permutation importance in the background...")
+                
+                if feature_importance is not None:
+                    top_importance = feature_importance.head(10).sort_values('Importance', ascending=True)
+                    method = feature_importance['Method'].iloc[0]
+                    fig = px.bar(top_importance, x='Importance', y='Feature',
+                                orientation='h', title=f'Top 10 Feature Importance ({method})')
+                    plotly_chart(fig, use_container_width=True)
+            else:
+                st.info("ℹ️ No trained model found for this target, so feature importance is unavailable.")
         
         # Model predictions analysis
         st.subheader("🎯 Model Predictions Analysis")
@@ -972,11 +893,14 @@ elif page == "🔍 Model Analysis":
             st.info(f"📊 Features available: {X.shape[1]} features")
             st.info(f"🎯 Target: {target_analysis}")
             
-            try:
-                # Make predictions
-                y_pred = model.predict(X)
-            except ValueError as e:
-                st.error(f"Model prediction error: {str(e)}")
+            # Score the dataset in a shared background job (cached per model artifact and dataset fingerprint)
+            model_hash = model_store.artifact_hash(model_store.model_path(target_analysis))
+            prediction_status, prediction_outcome = background_job(
+                'predictions', target=target_analysis, model_hash=model_hash,
+                fingerprint=fingerprint, columns=list(X.columns))
+            
+            if prediction_status == 'failed':
+                st.error(f"Model prediction error: {prediction_outcome.strip().splitlines()[0]}")
                 st.info("This might be due to feature mismatch. The model was trained with different features than what's available now.")
                 
                 # Show available features
@@ -986,56 +910,68 @@ elif page == "🔍 Model Analysis":
                         st.write("Model expects features:", list(model.feature_names_in_))
                     else:
                         st.write("Model doesn't have feature names information")
+                    st.code(prediction_outcome)
+                if st.button("🔁 Retry Prediction"):
+                    get_job_queue().submit('predictions', target=target_analysis, model_hash=model_hash,
+                                           fingerprint=fingerprint, columns=list(X.columns))
+                    st.rerun()
                 st.stop()
             
-            # Confusion matrix
-            cm = confusion_matrix(y, y_pred)
-            
-            # Create confusion matrix heatmap
-            fig = px.imshow(cm, 
-                          text_auto=True,
-                          aspect="auto",
-                          title=f'Confusion Matrix - {target_analysis}',
-                          color_continuous_scale='Blues')
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Classification report
-            report = classification_report(y, y_pred, output_dict=True)
-            report_df = pd.DataFrame(report).transpose()
-            
-            st.subheader("📋 Classification Report")
-            st.dataframe(report_df, use_container_width=True)
+            if prediction_status != 'succeeded':
+                st.info("⏳ Scoring the dataset in the background. Results will appear here when ready.")
+            else:
+                predictions, prediction_report = prediction_outcome
+                
+                # Confusion matrix
+                cm = np.array(prediction_report['confusion_matrix'])
+                class_labels = [str(label) for label in prediction_report['labels']]
+                
+                # Create confusion matrix heatmap
+                fig = px.imshow(cm, 
+                              x=class_labels,
+                              y=class_labels,
+                              labels=dict(x="Predicted", y="Actual"),
+                              text_auto=True,
+                              aspect="auto",
+                              title=f'Confusion Matrix - {target_analysis}',
+                              color_continuous_scale='Blues')
+                plotly_chart(fig, use_container_width=True)
+                
+                # Classification report
+                st.subheader("📋 Classification Report")
+                with profiler.stage('classification_report'):
+                    report_df = pd.DataFrame(prediction_report['report']).transpose()
+                    st.dataframe(report_df, use_container_width=True)
         
         # Feature correlation with target
         st.subheader("🔗 Feature-Target Correlation")
         
-        # Calculate correlation with target
-        correlations = []
-        for col in X.columns:
-            if X[col].dtype in ['int64', 'float64']:
-                corr = X[col].corr(y.astype('category').cat.codes)
-                correlations.append({'Feature': col, 'Correlation': abs(corr)})
-        
-        if correlations:
-            corr_df = pd.DataFrame(correlations).sort_values('Correlation', ascending=False).head(15)
+        # Score all features against the target in one vectorized pass
+        if X.shape[1] > 0:
+            corr_df = load_feature_ranking(fingerprint, target_analysis, tuple(X.columns)).head(15)
             
             fig = px.bar(corr_df, x='Correlation', y='Feature',
-                        orientation='h', title='Top 15 Features by Correlation with Target')
-            st.plotly_chart(fig, use_container_width=True)
+                        orientation='h', title='Top 15 Features by Correlation with Target',
+                        hover_data=['Pearson', 'F_Score', 'Mutual_Info'])
+            plotly_chart(fig, use_container_width=True)
     
     # Model comparison
     st.subheader("⚖️ Model Comparison")
     
-    # Simulated model comparison data
-    model_comparison = {
-        'Model': ['RandomForest', 'GradientBoosting', 'SVM', 'LogisticRegression', 'XGBoost'],
-        'Accuracy': [0.9983, 0.9965, 0.9920, 0.9850, 0.9978],
-        'F1_Score': [0.9980, 0.9960, 0.9915, 0.9840, 0.9975],
-        'Training_Time': [2.5, 5.2, 1.8, 0.5, 3.1],
-        'Prediction_Time': [0.01, 0.02, 0.05, 0.001, 0.015]
-    }
-    
-    comp_df = pd.DataFrame(model_comparison)
+    # Measured metrics of every model evaluated or tried for this target
+    comp_df = load_latest_metrics(target_analysis)
+    comp_df = comp_df[comp_df.reindex(columns=['accuracy', 'train_seconds']).notna().all(axis=1)]
+    if comp_df.empty:
+        st.info(f"No model comparison recorded for {target_analysis} yet. Run "
+                "`python metrics_store.py evaluate` or an optimization run to measure models.")
+        return
+    comp_df = pd.DataFrame({
+        'Model': comp_df['Model'] + ' (' + comp_df['Variant'] + ')',
+        'Accuracy': comp_df['accuracy'],
+        'F1_Score': comp_df['f1_macro'],
+        'Training_Time': comp_df['train_seconds'],
+        'Prediction_Time': comp_df['predict_seconds'],
+    })
     
     # Model comparison chart
     fig = make_subplots(
@@ -1059,9 +995,148 @@ elif page == "🔍 Model Analysis":
         )
     
     fig.update_layout(height=600, showlegend=False, title_text="Model Comparison")
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart(fig, use_container_width=True)
+
+
+# Benchmarks page
+def render_benchmarks():
+    """Benchmarks page: measured inference latency, throughput and memory per model variant"""
+    import pandas as pd
+    import plotly.express as px
+    import benchmark
+    
+    st.header("⏱️ Inference Benchmarks")
+    
+    history = load_benchmark_history()
+    if history.empty:
+        st.info("No benchmarks have been recorded yet. Measure the model artifacts with:")
+        st.code("python benchmark.py run", language="bash")
+        return
+    
+    # Regressions across all targets: latest run vs the median of the runs before it
+    tolerance = st.sidebar.slider("Regression tolerance", 0.05, 1.0, benchmark.DEFAULT_TOLERANCE, step=0.05,
+                                  format="%.2f")
+    found = benchmark.regressions(history, tolerance)
+    if found.empty:
+        st.success(f"✅ No regressions beyond {tolerance:.0%} against the previous "
+                   f"{benchmark.BASELINE_RUNS} runs")
+    else:
+        st.error(f"⚠️ {len(found)} benchmark metrics regressed by more than {tolerance:.0%}")
+        st.dataframe(found.style.format({'Baseline': '{:.4g}', 'Latest': '{:.4g}', 'Change': '{:+.0%}'}),
+                     use_container_width=True)
+    
+    target = st.selectbox("Select Target", [t for t in TARGETS if t in set(history['target'])])
+    history = history[history['target'] == target]
+    latest = benchmark.latest_results(history).set_index('variant')
+    
+    # Latest results per variant
+    st.subheader("📋 Latest Results")
+    cols = st.columns(len(latest))
+    for col, (variant, row) in zip(cols, latest.iterrows()):
+        with col:
+            st.metric(f"{variant} — latency p50", f"{row['latency_p50_ms']:.2f} ms")
+            st.metric("Load time", f"{row['load_seconds'] * 1000:.0f} ms")
+            if 'peak_rss_mb' in row and pd.notna(row['peak_rss_mb']):
+                st.metric("Peak RSS", f"{row['peak_rss_mb']:.0f} MB")
+    st.dataframe(latest.drop(columns='target'), use_container_width=True)
+    
+    # Throughput by batch size
+    st.subheader("🚀 Throughput by Batch Size")
+    throughput = history[history['metric'].str.startswith('throughput_')]
+    throughput = throughput.sort_values('recorded_at').groupby(['variant', 'metric']).tail(1)
+    throughput = throughput.assign(batch_size=throughput['metric'].str[len('throughput_'):].astype(int))
+    fig = px.line(throughput.sort_values('batch_size'), x='batch_size', y='value', color='variant',
+                  markers=True, log_x=True, log_y=True, labels={'value': 'rows/s', 'batch_size': 'Batch size'},
+                  title=f'Prediction throughput for {target} (latest run)')
+    plotly_chart(fig, use_container_width=True)
+    
+    # Metric history over runs
+    st.subheader("📈 History")
+    metric = st.selectbox("Metric", sorted(history['metric'].unique()),
+                          index=sorted(history['metric'].unique()).index('latency_p50_ms'))
+    fig = px.line(history[history['metric'] == metric], x='recorded_at', y='value', color='variant',
+                  markers=True, labels={'value': metric, 'recorded_at': 'Run'},
+                  title=f'{metric} for {target} over benchmark runs')
+    plotly_chart(fig, use_container_width=True)
+
+
+# Live Monitoring page
+LIVE_STALE_SECONDS = 10
 
-elif page == "🚀 Deployment":
+def render_live_monitoring():
+    """Live Monitoring page: condition estimates from the streaming scorer, as cycles arrive"""
+    import pandas as pd
+    import plotly.express as px
+    import downsampling
+    import streaming
+    
+    st.header("📡 Live Condition Monitoring")
+    
+    live = streaming.recent_predictions(limit=st.sidebar.slider("Cycles shown", 50, 2000, 500, step=50))
+    if live.empty:
+        st.info("No cycles have been scored yet. Start the streaming scorer and feed it cycles:")
+        st.code("python streaming.py serve --port 8765\n"
+                "python streaming.py replay --store data/cycles.parquet --port 8765 --rate 5", language="bash")
+        return
+    
+    last_scored = live['scored_at'].max()
+    streaming_now = time.time() - last_scored < LIVE_STALE_SECONDS
+    if streaming_now:
+        st.success(f"🟢 Streaming — last cycle scored {time.time() - last_scored:.1f}s ago")
+    else:
+        st.warning(f"🟡 Stream idle — last cycle scored at {pd.to_datetime(last_scored, unit='s'):%Y-%m-%d %H:%M:%S} UTC")
+    auto_refresh = st.sidebar.checkbox("Auto refresh", value=True)
+    if auto_refresh and streaming_now:
+        request_poll()
+    
+    # Latest condition estimate per target
+    latest = live.sort_values('scored_at').groupby('target').tail(1).set_index('target')
+    latest = latest.loc[[t for t in TARGETS if t in latest.index]]
+    cols = st.columns(len(latest))
+    for col, (target, row) in zip(cols, latest.iterrows()):
+        with col:
+            confidence = f"{row['confidence']:.1%} confidence" if pd.notna(row['confidence']) else ""
+            st.metric(target, row['prediction'], confidence, delta_color="off")
+    
+    # Latency and throughput over the shown cycles
+    per_cycle = live.drop_duplicates('cycle', keep='last')
+    elapsed = per_cycle['scored_at'].max() - per_cycle['received_at'].min()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Cycles Scored", f"{len(per_cycle):,}")
+    with col2:
+        st.metric("Latency p50", f"{per_cycle['latency_ms'].median():.0f} ms")
+    with col3:
+        st.metric("Latency p95", f"{per_cycle['latency_ms'].quantile(0.95):.0f} ms")
+    with col4:
+        st.metric("Throughput", f"{len(per_cycle) / elapsed:.1f} cycles/s" if elapsed > 0 else "—")
+    
+    # Condition estimates over recent cycles
+    st.subheader("📈 Condition Estimates")
+    history = live.copy()
+    history['prediction'] = pd.to_numeric(history['prediction'], errors='coerce')
+    history = downsampling.downsample_series(history, 'cycle', 'prediction', group='target')
+    fig = px.line(history, x='cycle', y='prediction', facet_row='target', markers=True,
+                  title='Predicted condition per cycle')
+    fig.update_yaxes(matches=None, title=None)
+    fig.update_layout(height=200 * history['target'].nunique())
+    plotly_chart(fig, use_container_width=True)
+    
+    st.subheader("⏱️ End-to-End Latency")
+    # Min-max buckets keep every latency spike
+    fig = px.scatter(downsampling.downsample_series(per_cycle, 'cycle', 'latency_ms', method='minmax'),
+                     x='cycle', y='latency_ms', color='batch_size',
+                     title='Arrival-to-prediction latency per cycle (ms)')
+    plotly_chart(fig, use_container_width=True)
+
+# Deployment page
+def render_deployment():
+    """Deployment page: MLflow registry and prediction interface"""
+    from datetime import datetime
+    import pandas as pd
+    import prediction_service
+    import registry
+    
     st.header("🚀 Model Deployment")
     
     st.info("🚀 Deploy your optimized models for production use with MLflow Model Registry.")
@@ -1072,15 +1147,18 @@ elif page == "🚀 Deployment":
     col1, col2 = st.columns(2)
     
     with col1:
-        mlflow_uri = st.text_input("MLflow Tracking URI", value="http://localhost:5000")
+        mlflow_uri = st.text_input("MLflow Tracking URI", value=registry.DEFAULT_TRACKING_URI)
         
-        if st.button("🔍 Connect to MLflow"):
-            try:
-                mlflow.set_tracking_uri(mlflow_uri)
-                experiments = mlflow.search_experiments()
-                st.success(f"✅ Connected! Found {len(experiments)} experiments.")
-            except Exception as e:
-                st.error(f"❌ Connection failed: {e}")
+        if st.button("🔄 Refresh Registry"):
+            registry.clear_cache()
+        
+        try:
+            summary = registry.experiment_summary(mlflow_uri)
+            st.success(f"✅ Connected! Found {summary['experiments']} experiments and {summary['runs']} runs.")
+            registry_df = registry.registry_table(mlflow_uri)
+        except Exception as e:
+            st.error(f"❌ Connection failed: {e}")
+            registry_df = None
     
     with col2:
         st.markdown("""
@@ -1094,26 +1172,34 @@ elif page == "🚀 Deployment":
     # Model registry
     st.subheader("📦 Model Registry")
     
-    # Simulated model registry data
-    registry_data = {
-        'Model_Name': [
-            'hydraulic_condition_model_Cooler_Cond',
-            'hydraulic_condition_model_Valve_Cond', 
-            'hydraulic_condition_model_Pump_Leak',
-            'hydraulic_condition_model_Accumulator_Press'
-        ],
-        'Version': ['v1', 'v1', 'v1', 'v1'],
-        'Stage': ['Production', 'Production', 'Production', 'Production'],
-        'Accuracy': [1.0000, 0.9887, 0.9932, 1.0000],
-        'Last_Updated': ['2025-10-15', '2025-10-15', '2025-10-15', '2025-10-15']
-    }
-    
-    registry_df = pd.DataFrame(registry_data)
+    if registry_df is not None and registry_df.empty:
+        st.info("No condition models are registered yet. Register the trained models with:")
+        st.code(f"python registry.py register --tracking-uri {mlflow_uri} --stage Production", language="bash")
     
     col1, col2 = st.columns(2)
     
     with col1:
-        st.dataframe(registry_df, use_container_width=True)
+        if registry_df is not None and not registry_df.empty:
+            st.dataframe(registry_df.drop(columns=['Source', 'Run_ID']), use_container_width=True, hide_index=True)
+            
+            # Versions serving a stage, loaded through the shared model cache
+            stage = st.selectbox("Serving stage", registry.STAGES)
+            serving = registry.resolve_versions(stage, mlflow_uri)
+            if serving.empty:
+                st.warning(f"⚠️ No model version is in stage {stage}.")
+            else:
+                paths = registry.model_paths(stage, mlflow_uri)
+                serving_rows = []
+                for target, row in serving.iterrows():
+                    model = get_model_cache().get(paths[target], f'registry:{stage}') if target in paths else None
+                    serving_rows.append({
+                        'Target': target,
+                        'Version': row['Version'],
+                        'Model': type(model).__name__ if model is not None else 'unavailable',
+                        'Features': len(getattr(model, 'feature_names_in_', [])),
+                        'Accuracy': row['Accuracy'],
+                    })
+                st.dataframe(pd.DataFrame(serving_rows), use_container_width=True, hide_index=True)
     
     with col2:
         # Model deployment options
@@ -1125,20 +1211,20 @@ elif page == "🚀 Deployment":
         )
         
         if deployment_option == "Local REST API":
-            st.code("""
-# Start MLflow model serving
-mlflow models serve -m "models:/hydraulic_condition_model_Cooler_Cond/1" -p 5001
+            st.code(f"""
+# Serve the registry's Production versions
+python prediction_service.py --stage Production --tracking-uri {mlflow_uri} --port 8600
 
 # Test prediction
-curl -X POST http://localhost:5001/invocations \\
+curl -X POST http://localhost:8600/predict/Cooler_Cond \\
   -H "Content-Type: application/json" \\
-  -d '{"data": [[1.2, 3.4, 5.6, ...]]}'
+  -d '{{"instances": [{{"<feature>": 1.2, ...}}]}}'
             """)
         
         elif deployment_option == "Docker Container":
             st.code("""
 # Build Docker image
-mlflow models build-docker -m "models:/hydraulic_condition_model_Cooler_Cond/1" -n hydraulic-model
+mlflow models build-docker -m "models:/hydraulic_condition_model_Cooler_Cond/Production" -n hydraulic-model
 
 # Run container
 docker run -p 5001:8080 hydraulic-model
@@ -1147,58 +1233,84 @@ docker run -p 5001:8080 hydraulic-model
     # Model serving interface
     st.subheader("🎯 Model Prediction Interface")
     
-    # Select model
-    selected_model = st.selectbox("Select Model", registry_df['Model_Name'])
+    service_url = st.text_input("Prediction Service URL", value=prediction_service.DEFAULT_URL)
+    selected_target = st.selectbox("Select Target", TARGETS)
     
-    # Input form
-    st.markdown("**Input Features:**")
-    
-    # Create input form based on model
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        feature1 = st.number_input("Feature 1", value=1.0, step=0.1)
-        feature2 = st.number_input("Feature 2", value=2.0, step=0.1)
-        feature3 = st.number_input("Feature 3", value=3.0, step=0.1)
-    
-    with col2:
-        feature4 = st.number_input("Feature 4", value=4.0, step=0.1)
-        feature5 = st.number_input("Feature 5", value=5.0, step=0.1)
-        feature6 = st.number_input("Feature 6", value=6.0, step=0.1)
-    
-    with col3:
-        feature7 = st.number_input("Feature 7", value=7.0, step=0.1)
-        feature8 = st.number_input("Feature 8", value=8.0, step=0.1)
-        feature9 = st.number_input("Feature 9", value=9.0, step=0.1)
-    
-    if st.button("🔮 Make Prediction", type="primary"):
-        # Simulate prediction
-        input_data = [feature1, feature2, feature3, feature4, feature5, feature6, feature7, feature8, feature9]
-        
-        # Mock prediction
-        prediction = np.random.choice(['Normal', 'Warning', 'Critical'], p=[0.7, 0.2, 0.1])
-        confidence = np.random.uniform(0.85, 0.99)
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.success(f"🎯 **Prediction**: {prediction}")
-        
-        with col2:
-            st.info(f"📊 **Confidence**: {confidence:.2%}")
+    try:
+        feature_names = prediction_service.model_features(selected_target, service_url, timeout=2)
+    except (ConnectionError, RuntimeError) as e:
+        st.warning(f"⚠️ {e}")
+        st.code("python prediction_service.py --port 8600", language="bash")
+        feature_names = None
+    
+    if feature_names:
+        # Start from a real cycle of the dataset; every value can be edited before predicting
+        st.markdown(f"**Input Features** ({len(feature_names)} expected by the model):")
+        fingerprint = dataset_fingerprint()
+        dataset_columns = load_columns(fingerprint)
+        available = [f for f in feature_names if f in dataset_columns]
+        df = load_data(fingerprint, tuple(available)) if available else None
+        # An empty dataset has no cycle to prefill from (number_input needs max_value >= 0)
+        if df is not None and len(df):
+            cycle = st.number_input("Prefill from dataset cycle", min_value=0, max_value=len(df) - 1, value=0)
+            row = df.iloc[[int(cycle)]].reindex(columns=feature_names, fill_value=0.0)
+        else:
+            row = pd.DataFrame([[0.0] * len(feature_names)], columns=feature_names)
         
-        # Prediction details
-        st.subheader("📋 Prediction Details")
+        edited = st.data_editor(row.T.rename(columns={row.index[0]: 'Value'}), use_container_width=True,
+                                height=300)
+        send_arrow = st.checkbox("Send as Arrow stream", value=False)
         
-        prediction_details = {
-            'Model': selected_model,
-            'Input_Features': len(input_data),
-            'Prediction': prediction,
-            'Confidence': f"{confidence:.2%}",
-            'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        if st.button("🔮 Make Prediction", type="primary"):
+            instance = edited.T.reset_index(drop=True).astype(float)
+            try:
+                with profiler.stage('predict'):
+                    response = prediction_service.request_predictions(selected_target, instance, service_url,
+                                                                      arrow=send_arrow)
+            except (ConnectionError, RuntimeError) as e:
+                st.error(f"❌ Prediction failed: {e}")
+            else:
+                prediction = response['predictions'][0]
+                confidence = response['confidence'][0] if response['confidence'] else None
+                
+                col1, col2, col3 = st.columns(3)
+                
+                with col1:
+                    st.success(f"🎯 **Prediction**: {prediction}")
+                
+                with col2:
+                    st.info(f"📊 **Confidence**: {confidence:.2%}" if confidence is not None
+                            else "📊 **Confidence**: n/a")
+                
+                with col3:
+                    st.info(f"⏱️ **Latency**: {response['latency_ms']:.1f} ms")
+                
+                # Prediction details
+                st.subheader("📋 Prediction Details")
+                
+                prediction_details = {
+                    'Target': selected_target,
+                    'Model': response['model'],
+                    'Input_Features': len(feature_names),
+                    'Prediction': prediction,
+                    'Confidence': f"{confidence:.2%}" if confidence is not None else None,
+                    'Batched_Requests': response['batched_requests'],
+                    'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
+                
+                st.json(prediction_details)
         
-        st.json(prediction_details)
+        # Service latency percentiles
+        try:
+            service = prediction_service.service_metrics(service_url, timeout=2)
+        except (ConnectionError, RuntimeError):
+            service = None
+        if service:
+            latency_df = pd.DataFrame([{'Target': target, 'Requests': m['requests'],
+                                        'p50 (ms)': m['p50_ms'], 'p99 (ms)': m['p99_ms']}
+                                       for target, m in service['targets'].items()])
+            st.markdown("**Service Latency:**")
+            st.dataframe(latency_df, use_container_width=True, hide_index=True)
     
     # Deployment checklist
     st.subheader("✅ Deployment Checklist")
@@ -1217,6 +1329,65 @@ docker run -p 5001:8080 hydraulic-model
     for item in checklist_items:
         st.markdown(item)
 
+# Page routing: only the selected page's code and imports run on each rerun
+PAGES = {
+    "🏠 Home": render_home,
+    "📊 Overview": render_overview,
+    "🎯 Model Performance": render_model_performance,
+    "⚡ Optimization Results": render_optimization,
+    "🔍 Model Analysis": render_model_analysis,
+    "⏱️ Benchmarks": render_benchmarks,
+    "📡 Live Monitoring": render_live_monitoring,
+    "🚀 Deployment": render_deployment,
+}
+
+# Sidebar
+st.sidebar.title("🎛️ Navigation")
+page = st.sidebar.selectbox("Choose a page", list(PAGES))
+
+with profiler.render(page) as trace:
+    PAGES[page]()
+
+# Model cache counters
+def render_model_cache_stats():
+    """Sidebar summary of the shared model cache"""
+    stats = get_model_cache().stats()
+    with st.sidebar.expander("🧠 Model Cache"):
+        hit_rate = f"{stats['hit_rate']:.0%}" if stats['hit_rate'] is not None else "—"
+        st.markdown(f"**Hit rate:** {hit_rate} ({stats['hits']} hits / {stats['misses']} misses)")
+        st.markdown(f"**Load time:** {stats['load_seconds']:.2f}s total")
+        st.markdown(f"**Reloads:** {stats['reloads']} · **Evictions:** {stats['evictions']}")
+        st.markdown(f"**Memory:** {stats['bytes'] / 1024**2:.1f} / {stats['max_bytes'] / 1024**2:.0f} MB")
+        for entry in stats['entries']:
+            st.caption(f"{entry['variant']}: {os.path.basename(entry['path'])} @ {entry['hash'][:8]} "
+                       f"({entry['bytes'] / 1024**2:.1f} MB, {entry['load_seconds'] * 1000:.0f} ms)")
+
+render_model_cache_stats()
+
+# Render profile
+def render_profile(trace):
+    """Collapsible timing breakdown of this page render, with the trace as a download"""
+    with st.expander(f"⏱️ Render profile — {trace.duration * 1000:.0f} ms"):
+        rows = ["| Stage | Calls | Total (ms) | Self (ms) | Share | Cache hits / misses |",
+                "|---|---:|---:|---:|---:|---|"]
+        for row in trace.summary():
+            cache = f"{row['Hits']} / {row['Misses']}" if row['Kind'] == 'cache' else ""
+            rows.append(f"| {row['Stage']} | {row['Calls']} | {row['Total_ms']:.1f} | {row['Self_ms']:.1f} "
+                        f"| {row['Share']:.0%} | {cache} |")
+        if len(rows) > 2:
+            st.markdown('\n'.join(rows))
+        else:
+            st.caption("No instrumented stages ran on this page.")
+        counters = profiler.cache_counters()
+        if counters:
+            st.caption("Loader cache since server start: " + " · ".join(
+                f"{name} {c['hits']}/{c['hits'] + c['misses']} hits" for name, c in sorted(counters.items())))
+        st.download_button("📥 Export trace (Chrome trace format)", trace.to_chrome_trace(),
+                           file_name=f"render-trace-{time.strftime('%Y%m%d-%H%M%S')}.json",
+                           mime="application/json")
+
+render_profile(trace)
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -1225,3 +1396,8 @@ st.markdown("""
     <p>📊 Real-time monitoring • 🎯 Model optimization • 🚀 Production deployment</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Poll background jobs: rerun shortly so pages pick up job progress
+if st.session_state.pop('poll_jobs', False):
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
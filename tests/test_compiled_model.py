@@ -0,0 +1,83 @@
+"""Parity of compiled tree models with the scikit-learn originals"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+import compiled_model
+
+ESTIMATORS = {
+    'decision_tree': lambda: DecisionTreeClassifier(max_depth=6, random_state=0),
+    'random_forest': lambda: RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0),
+    'extra_trees': lambda: ExtraTreesClassifier(n_estimators=15, max_depth=6, random_state=0),
+    'gradient_boosting': lambda: GradientBoostingClassifier(n_estimators=10, max_depth=3, random_state=0),
+}
+
+# Estimators that route NaN inputs down learned directions instead of rejecting them
+NAN_CAPABLE = ['decision_tree', 'random_forest']
+
+
+def make_data(n_classes, rows=400, features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, features)).astype(np.float32),
+                     columns=[f'f{i}' for i in range(features)])
+    score = X['f0'] + 0.5 * X['f1'] - X['f2'] * X['f3']
+    y = np.digitize(score, np.quantile(score, np.linspace(0, 1, n_classes + 1)[1:-1]))
+    return X, np.array([100, 20, 3, 7])[y]
+
+
+def assert_same_predictions(model, compiled, X):
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize('n_classes', [2, 3])
+@pytest.mark.parametrize('name', list(ESTIMATORS))
+def test_parity(name, n_classes):
+    X, y = make_data(n_classes)
+    model = ESTIMATORS[name]().fit(X, y)
+    compiled = compiled_model.compile_model(model)
+    assert_same_predictions(model, compiled, X)
+    assert_same_predictions(model, compiled, make_data(n_classes, seed=1)[0])
+
+
+@pytest.mark.parametrize('name', NAN_CAPABLE)
+@pytest.mark.parametrize('fit_with_missing', [False, True])
+def test_missing_values_follow_the_split_direction(name, fit_with_missing):
+    X, y = make_data(3)
+    fit_X = compiled_model.with_missing(X, seed=2) if fit_with_missing else X
+    model = ESTIMATORS[name]().fit(fit_X, y)
+    compiled = compiled_model.compile_model(model)
+    assert compiled.allow_missing
+    assert_same_predictions(model, compiled, compiled_model.with_missing(X, seed=3))
+    compiled_model.check_parity(model, compiled, X)
+
+
+@pytest.mark.parametrize('name', sorted(set(ESTIMATORS) - set(NAN_CAPABLE)))
+def test_missing_values_rejected_like_the_original(name):
+    X, y = make_data(3)
+    model = ESTIMATORS[name]().fit(X, y)
+    compiled = compiled_model.compile_model(model)
+    missing = compiled_model.with_missing(X)
+    with pytest.raises(ValueError):
+        model.predict(missing)
+    with pytest.raises(ValueError):
+        compiled.predict(missing)
+
+
+def test_saved_artifact_round_trip(tmp_path):
+    X, y = make_data(3)
+    model = ESTIMATORS['random_forest']().fit(X, y)
+    compiled = compiled_model.compile_model(model, source={'path': 'model.pkl', 'hash': 'abc'})
+    path = str(tmp_path / 'model.compiled')
+
+    compiled.save(path)
+    assert compiled_model.source_hash(path) is None  # parity never checked
+
+    compiled.parity_rows = len(X)
+    compiled.save(path)
+    loaded = compiled_model.load(path)
+    assert compiled_model.source_hash(path) == 'abc'
+    assert_same_predictions(model, loaded, compiled_model.with_missing(X))
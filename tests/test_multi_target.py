@@ -0,0 +1,65 @@
+"""Parity of shared-matrix multi-target predictions with each model's own predict"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from multi_target import MultiTargetPredictor
+
+
+def make_data(rows=400, features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    # Wide value ranges so float32 rounding of the inputs is visible to a scaler
+    X = pd.DataFrame(rng.normal(size=(rows, features)) * 1e4 + 1e6,
+                     columns=[f'f{i}' for i in range(features)])
+    score = X['f0'] - X['f1'] + 0.5 * X['f2']
+    return X, (score > score.median()).astype(int).to_numpy()
+
+
+def forest():
+    return RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0)
+
+
+# name -> (factory, dtype the shared matrix should use)
+MODELS = {
+    'random_forest': (forest, np.float32),
+    'tree_pipeline': (lambda: Pipeline([('model', GradientBoostingClassifier(n_estimators=10,
+                                                                             random_state=0))]), np.float32),
+    'scaled_pipeline': (lambda: Pipeline([('scale', StandardScaler()), ('model', forest())]), np.float64),
+    'mixed_voting': (lambda: VotingClassifier([('forest', forest()), ('linear', LogisticRegression())],
+                                              voting='soft'), np.float64),
+}
+
+
+@pytest.mark.parametrize('name', list(MODELS))
+def test_predictions_match_float64_predict(name):
+    factory, dtype = MODELS[name]
+    X, y = make_data()
+    model = factory().fit(X, y)
+    predictor = MultiTargetPredictor({'Cooler_Cond': model}, threads=1)
+    try:
+        assert predictor.dtype == dtype
+        result = predictor.predict(X)
+    finally:
+        predictor.close()
+    np.testing.assert_array_equal(result['Cooler_Cond'], model.predict(X))
+    np.testing.assert_allclose(result['Cooler_Cond_confidence'], model.predict_proba(X).max(axis=1),
+                               rtol=0, atol=1e-9)
+
+
+def test_one_float64_model_keeps_the_shared_matrix_float64():
+    X, y = make_data()
+    trees = forest().fit(X, y)
+    scaled = MODELS['scaled_pipeline'][0]().fit(X, y)
+    predictor = MultiTargetPredictor({'Cooler_Cond': trees, 'Valve_Cond': scaled}, threads=2)
+    try:
+        assert predictor.dtype == np.float64
+        result = predictor.predict(X)
+    finally:
+        predictor.close()
+    np.testing.assert_array_equal(result['Cooler_Cond'], trees.predict(X))
+    np.testing.assert_array_equal(result['Valve_Cond'], scaled.predict(X))